@@ -0,0 +1,85 @@
+"""booking series
+
+Recurring appointment series (booking_series) and bookings.series_id
+linking each occurrence to its series.
+
+Revision ID: 059f39c1dc5c
+Revises: 7fcdf70f8a4d
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "059f39c1dc5c"
+down_revision = "7fcdf70f8a4d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "booking_series" not in tables:
+        op.create_table(
+            "booking_series",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column(
+                "workspace_id",
+                sa.String(),
+                sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "service_id",
+                sa.String(),
+                sa.ForeignKey("services.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+            sa.Column(
+                "contact_id",
+                sa.String(),
+                sa.ForeignKey("contacts.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("rrule", sa.String(), nullable=False),
+            sa.Column("timezone", sa.String()),
+            sa.Column("first_start_time", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("notes", sa.Text()),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+        )
+        op.create_index(
+            "ix_booking_series_workspace_id", "booking_series", ["workspace_id"]
+        )
+
+    columns = {column["name"] for column in inspector.get_columns("bookings")}
+    if "series_id" not in columns:
+        # Batch mode so SQLite can take the foreign key (by copying the table)
+        with op.batch_alter_table("bookings") as batch:
+            batch.add_column(
+                sa.Column(
+                    "series_id",
+                    sa.String(),
+                    sa.ForeignKey(
+                        "booking_series.id",
+                        ondelete="SET NULL",
+                        name="fk_bookings_series_id",
+                    ),
+                    nullable=True,
+                )
+            )
+
+    if "ix_bookings_series_id" not in {
+        index["name"] for index in inspector.get_indexes("bookings")
+    }:
+        op.create_index("ix_bookings_series_id", "bookings", ["series_id"])
+
+
+def downgrade():
+    op.drop_index("ix_bookings_series_id", table_name="bookings")
+    with op.batch_alter_table("bookings") as batch:
+        batch.drop_column("series_id")
+    op.drop_table("booking_series")
@@ -0,0 +1,39 @@
+"""workspace cache versions
+
+Per-workspace change counters behind the ETags of cached read endpoints.
+
+Revision ID: 3d4f8775d7df
+Revises: 059f39c1dc5c
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "3d4f8775d7df"
+down_revision = "059f39c1dc5c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "workspace_cache_versions" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "workspace_cache_versions",
+        sa.Column(
+            "workspace_id",
+            sa.String(),
+            sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("entity", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+    )
+
+
+def downgrade():
+    op.drop_table("workspace_cache_versions")
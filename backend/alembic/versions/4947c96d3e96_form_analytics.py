@@ -0,0 +1,55 @@
+"""form analytics
+
+Running per-form submission totals (form_stats) and per-option counts of
+choice fields (form_field_counts); the startup form stats backfill fills
+them for existing submissions.
+
+Revision ID: 4947c96d3e96
+Revises: 8f9133d2cd04
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "4947c96d3e96"
+down_revision = "8f9133d2cd04"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if "form_stats" not in tables:
+        op.create_table(
+            "form_stats",
+            sa.Column(
+                "form_id",
+                sa.String(),
+                sa.ForeignKey("forms.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("sent_count", sa.Integer(), nullable=False),
+            sa.Column("completed_count", sa.Integer(), nullable=False),
+            sa.Column("completion_seconds", sa.Float(), nullable=False),
+        )
+
+    if "form_field_counts" not in tables:
+        op.create_table(
+            "form_field_counts",
+            sa.Column(
+                "form_id",
+                sa.String(),
+                sa.ForeignKey("forms.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("field_id", sa.String(), primary_key=True),
+            sa.Column("value", sa.String(), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+        )
+
+
+def downgrade():
+    op.drop_table("form_field_counts")
+    op.drop_table("form_stats")
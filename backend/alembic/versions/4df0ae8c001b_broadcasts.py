@@ -0,0 +1,88 @@
+"""broadcasts
+
+Segment broadcasts and their progress (broadcasts), messages.broadcast_id
+linking each recipient's message to its broadcast, and the index the
+senders use to pick up queued messages.
+
+Revision ID: 4df0ae8c001b
+Revises: 55ad52f33d9a
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "4df0ae8c001b"
+down_revision = "55ad52f33d9a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "broadcasts" not in inspector.get_table_names():
+        op.create_table(
+            "broadcasts",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column(
+                "workspace_id",
+                sa.String(),
+                sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "created_by_id",
+                sa.String(),
+                sa.ForeignKey("users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+            sa.Column("channel", sa.String(), nullable=False),
+            sa.Column("subject", sa.String()),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("segment", sa.JSON()),
+            sa.Column("status", sa.String()),
+            sa.Column("total_recipients", sa.Integer()),
+            sa.Column("sent_count", sa.Integer()),
+            sa.Column("failed_count", sa.Integer()),
+            sa.Column("skipped_count", sa.Integer()),
+            sa.Column("error", sa.Text()),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.create_index("ix_broadcasts_workspace_id", "broadcasts", ["workspace_id"])
+
+    columns = {column["name"] for column in inspector.get_columns("messages")}
+    if "broadcast_id" not in columns:
+        # Batch mode so SQLite can take the foreign key (by copying the table)
+        with op.batch_alter_table("messages") as batch:
+            batch.add_column(
+                sa.Column(
+                    "broadcast_id",
+                    sa.String(),
+                    sa.ForeignKey(
+                        "broadcasts.id",
+                        ondelete="SET NULL",
+                        name="fk_messages_broadcast_id",
+                    ),
+                    nullable=True,
+                )
+            )
+
+    if "ix_messages_broadcast_status" not in {
+        index["name"] for index in inspector.get_indexes("messages")
+    }:
+        op.create_index(
+            "ix_messages_broadcast_status", "messages", ["broadcast_id", "status", "id"]
+        )
+
+
+def downgrade():
+    op.drop_index("ix_messages_broadcast_status", table_name="messages")
+    with op.batch_alter_table("messages") as batch:
+        batch.drop_column("broadcast_id")
+    op.drop_table("broadcasts")
@@ -0,0 +1,55 @@
+"""contact field values
+
+contact_field_values mirrors Contact.custom_fields one row per field, so
+segment conditions on custom fields run in SQL; the startup contact
+maintenance job fills it for existing contacts.
+
+Revision ID: 55ad52f33d9a
+Revises: 9547f09460af
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "55ad52f33d9a"
+down_revision = "9547f09460af"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "contact_field_values" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "contact_field_values",
+        sa.Column(
+            "contact_id",
+            sa.String(),
+            sa.ForeignKey("contacts.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("field", sa.String(), primary_key=True),
+        sa.Column(
+            "workspace_id",
+            sa.String(),
+            sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("value_text", sa.String(), nullable=True),
+        sa.Column("value_number", sa.Float(), nullable=True),
+    )
+    op.create_index(
+        "ix_contact_field_values_text",
+        "contact_field_values",
+        ["workspace_id", "field", "value_text"],
+    )
+    op.create_index(
+        "ix_contact_field_values_number",
+        "contact_field_values",
+        ["workspace_id", "field", "value_number"],
+    )
+
+
+def downgrade():
+    op.drop_table("contact_field_values")
@@ -0,0 +1,64 @@
+"""inbound events
+
+Queue of verified inbound email/SMS webhook deliveries (inbound_events),
+unique per provider message so retried deliveries are stored once.
+
+Revision ID: 692770c58995
+Revises: 846209be15a1
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "692770c58995"
+down_revision = "846209be15a1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "inbound_events" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "inbound_events",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column(
+            "workspace_id",
+            sa.String(),
+            sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "integration_id",
+            sa.String(),
+            sa.ForeignKey("integrations.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("external_id", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String()),
+        sa.Column("attempts", sa.Integer()),
+        sa.Column("error", sa.Text()),
+        sa.Column(
+            "received_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index(
+        "uq_inbound_events_provider_external",
+        "inbound_events",
+        ["provider", "external_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_inbound_events_status_received",
+        "inbound_events",
+        ["status", "received_at"],
+    )
+
+
+def downgrade():
+    op.drop_table("inbound_events")
@@ -0,0 +1,88 @@
+"""form_submissions.workspace_id
+
+Denormalize the owning workspace onto form submissions, backfilled from
+their form, with (workspace_id, completed_at) / (workspace_id, sent_at)
+indexes for workspace-wide listings and dashboard counts. Stops (without
+touching anything) when submissions point at forms that no longer exist.
+
+Revision ID: 7c2e91d4a5b3
+Revises: 4947c96d3e96
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "7c2e91d4a5b3"
+down_revision = "4947c96d3e96"
+branch_labels = None
+depends_on = None
+
+# Rows updated per backfill statement
+BATCH_SIZE = 10000
+
+INDEXES = {
+    "ix_form_submissions_workspace_completed": ["workspace_id", "completed_at"],
+    "ix_form_submissions_workspace_sent": ["workspace_id", "sent_at"],
+}
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {
+        column["name"]: column for column in inspector.get_columns("form_submissions")
+    }
+
+    # Only possible where foreign keys weren't enforced (SQLite); leave
+    # deciding what to do with them to a person
+    orphans = bind.execute(
+        sa.text(
+            "SELECT COUNT(*) FROM form_submissions "
+            "WHERE form_id NOT IN (SELECT id FROM forms)"
+        )
+    ).scalar()
+    if orphans:
+        raise RuntimeError(
+            f"{orphans} form submissions reference forms that no longer exist; "
+            "delete or reassign them (form_id NOT IN (SELECT id FROM forms)) "
+            "and run the upgrade again"
+        )
+
+    if "workspace_id" not in columns:
+        op.add_column(
+            "form_submissions", sa.Column("workspace_id", sa.String(), nullable=True)
+        )
+
+    backfill = sa.text(
+        "UPDATE form_submissions SET workspace_id = "
+        "(SELECT forms.workspace_id FROM forms "
+        "WHERE forms.id = form_submissions.form_id) "
+        "WHERE id IN "
+        "(SELECT id FROM form_submissions WHERE workspace_id IS NULL LIMIT :batch)"
+    )
+    while bind.execute(backfill, {"batch": BATCH_SIZE}).rowcount:
+        pass
+
+    # Tables created by create_all after the model change are already NOT NULL
+    if "workspace_id" not in columns or columns["workspace_id"]["nullable"]:
+        with op.batch_alter_table("form_submissions") as batch:
+            batch.alter_column(
+                "workspace_id", existing_type=sa.String(), nullable=False
+            )
+            batch.create_foreign_key(
+                "fk_form_submissions_workspace_id", "workspaces",
+                ["workspace_id"], ["id"], ondelete="CASCADE"
+            )
+
+    existing = {index["name"] for index in inspector.get_indexes("form_submissions")}
+    for name, index_columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "form_submissions", index_columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="form_submissions")
+    with op.batch_alter_table("form_submissions") as batch:
+        batch.drop_column("workspace_id")
@@ -0,0 +1,186 @@
+"""staff and room resources
+
+Resources, the services they can deliver (service_resources), the
+resources each booking holds (booking_resources) and
+bookings.resource_scheduled. On PostgreSQL, bookings_no_overlap is
+rebuilt to leave resource-scheduled bookings out, and
+booking_resources_no_overlap keeps a resource from being held twice at
+once (both skipped, with the overlaps logged, while old overlaps remain).
+
+Revision ID: 7fcdf70f8a4d
+Revises: 4c8a5b60a5b9
+Create Date: 2026-10-19 00:00:00
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "7fcdf70f8a4d"
+down_revision = "4c8a5b60a5b9"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Enum member names, as SQLAlchemy stores them
+ACTIVE = "'CONFIRMED', 'PENDING', 'RESCHEDULED'"
+
+# name -> (table, EXCLUDE clause, query for overlapping pairs that would make it fail)
+CONSTRAINTS = {
+    "bookings_no_overlap": (
+        "bookings",
+        "EXCLUDE USING gist "
+        "(service_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+        f"WHERE (status IN ({ACTIVE}) AND NOT resource_scheduled)",
+        "SELECT a.id, b.id FROM bookings a JOIN bookings b "
+        "ON a.service_id = b.service_id AND a.id < b.id "
+        "AND tstzrange(a.start_time, a.end_time, '[)') "
+        "&& tstzrange(b.start_time, b.end_time, '[)') "
+        f"WHERE a.status IN ({ACTIVE}) AND NOT a.resource_scheduled "
+        f"AND b.status IN ({ACTIVE}) AND NOT b.resource_scheduled LIMIT 20",
+    ),
+    "booking_resources_no_overlap": (
+        "booking_resources",
+        "EXCLUDE USING gist "
+        "(resource_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+        "WHERE (is_active)",
+        "SELECT a.booking_id, b.booking_id FROM booking_resources a "
+        "JOIN booking_resources b ON a.resource_id = b.resource_id AND a.id < b.id "
+        "AND tstzrange(a.start_time, a.end_time, '[)') "
+        "&& tstzrange(b.start_time, b.end_time, '[)') "
+        "WHERE a.is_active AND b.is_active LIMIT 20",
+    ),
+}
+
+
+def _exclusion_constraints(bind):
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    # The previous revision's version doesn't know about resource scheduling
+    op.execute("ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_overlap")
+    for name, (table, exclude, overlaps_sql) in CONSTRAINTS.items():
+        overlaps = bind.execute(sa.text(overlaps_sql)).all()
+        if overlaps:
+            logger.warning(
+                f"Not adding {name}: overlapping rows "
+                + ", ".join(f"{a}/{b}" for a, b in overlaps)
+            )
+            continue
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {exclude}")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "resources" not in tables:
+        op.create_table(
+            "resources",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column(
+                "workspace_id",
+                sa.String(),
+                sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column(
+                "resource_type",
+                sa.Enum("STAFF", "ROOM", name="resourcetype"),
+                nullable=False,
+            ),
+            sa.Column(
+                "user_id",
+                sa.String(),
+                sa.ForeignKey("users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+            sa.Column("is_active", sa.Boolean()),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index("ix_resources_workspace_id", "resources", ["workspace_id"])
+
+    if "service_resources" not in tables:
+        op.create_table(
+            "service_resources",
+            sa.Column(
+                "service_id",
+                sa.String(),
+                sa.ForeignKey("services.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column(
+                "resource_id",
+                sa.String(),
+                sa.ForeignKey("resources.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+        )
+
+    if "booking_resources" not in tables:
+        op.create_table(
+            "booking_resources",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column(
+                "booking_id",
+                sa.String(),
+                sa.ForeignKey("bookings.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "resource_id",
+                sa.String(),
+                sa.ForeignKey("resources.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("end_time", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("is_active", sa.Boolean()),
+        )
+        op.create_index(
+            "ix_booking_resources_booking_id", "booking_resources", ["booking_id"]
+        )
+        op.create_index(
+            "ix_booking_resources_resource_time",
+            "booking_resources",
+            ["resource_id", "start_time"],
+        )
+
+    columns = {column["name"] for column in inspector.get_columns("bookings")}
+    if "resource_scheduled" not in columns:
+        op.add_column(
+            "bookings",
+            sa.Column(
+                "resource_scheduled",
+                sa.Boolean(),
+                server_default=sa.false(),
+                nullable=False,
+            ),
+        )
+
+    if bind.dialect.name == "postgresql":
+        _exclusion_constraints(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        # Resource-scheduled bookings may share a slot, so the previous
+        # revision's constraint can't simply be put back; it is left off
+        op.execute(
+            "ALTER TABLE booking_resources "
+            "DROP CONSTRAINT IF EXISTS booking_resources_no_overlap"
+        )
+        op.execute("ALTER TABLE bookings DROP CONSTRAINT IF EXISTS bookings_no_overlap")
+
+    with op.batch_alter_table("bookings") as batch:
+        batch.drop_column("resource_scheduled")
+    op.drop_table("booking_resources")
+    op.drop_table("service_resources")
+    op.drop_table("resources")
+    sa.Enum(name="resourcetype").drop(bind, checkfirst=True)
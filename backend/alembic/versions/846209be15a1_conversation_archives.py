@@ -0,0 +1,73 @@
+"""conversation archives
+
+Compressed message archives of closed conversations
+(conversation_archives), plus the indexes the archive mover scans by:
+closed conversations by age and a conversation's messages by time.
+
+Revision ID: 846209be15a1
+Revises: 4df0ae8c001b
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "846209be15a1"
+down_revision = "4df0ae8c001b"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_conversations_status_last_message": (
+        "conversations",
+        ["status", "last_message_at"],
+    ),
+    "ix_messages_conversation_created": (
+        "messages",
+        ["conversation_id", "created_at"],
+    ),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "conversation_archives" not in inspector.get_table_names():
+        op.create_table(
+            "conversation_archives",
+            sa.Column(
+                "conversation_id",
+                sa.String(),
+                sa.ForeignKey("conversations.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column(
+                "workspace_id",
+                sa.String(),
+                sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("codec", sa.String(), nullable=False),
+            sa.Column("payload", sa.LargeBinary(), nullable=False),
+            sa.Column("message_count", sa.Integer()),
+            sa.Column("last_message", sa.JSON(), nullable=True),
+            sa.Column(
+                "archived_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+        )
+        op.create_index(
+            "ix_conversation_archives_workspace_id",
+            "conversation_archives",
+            ["workspace_id"],
+        )
+
+    for name, (table, columns) in INDEXES.items():
+        if name not in {index["name"] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
+    op.drop_table("conversation_archives")
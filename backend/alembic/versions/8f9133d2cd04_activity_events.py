@@ -0,0 +1,50 @@
+"""activity events
+
+Denormalised activity feed (activity_events), written alongside the
+records it describes and read newest-first per workspace.
+
+Revision ID: 8f9133d2cd04
+Revises: bf964a11e7ab
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "8f9133d2cd04"
+down_revision = "bf964a11e7ab"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "activity_events" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "activity_events",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column(
+            "workspace_id",
+            sa.String(),
+            sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("entity_id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("url", sa.String(), nullable=True),
+        sa.Column("data", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_activity_events_workspace_created",
+        "activity_events",
+        ["workspace_id", "created_at", "id"],
+    )
+
+
+def downgrade():
+    op.drop_table("activity_events")
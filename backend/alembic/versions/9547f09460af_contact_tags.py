@@ -0,0 +1,59 @@
+"""contact tags and listing index
+
+contact_tags mirrors Contact.tags one row per tag, so tag filters run in
+SQL; the startup contact maintenance job fills it for existing contacts.
+ix_contacts_workspace_created serves the newest-first contact listing.
+
+Revision ID: 9547f09460af
+Revises: 9e3a57c1d2b8
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "9547f09460af"
+down_revision = "9e3a57c1d2b8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "contact_tags" not in inspector.get_table_names():
+        op.create_table(
+            "contact_tags",
+            sa.Column(
+                "contact_id",
+                sa.String(),
+                sa.ForeignKey("contacts.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("tag", sa.String(), primary_key=True),
+            sa.Column(
+                "workspace_id",
+                sa.String(),
+                sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+        )
+        op.create_index(
+            "ix_contact_tags_workspace_tag",
+            "contact_tags",
+            ["workspace_id", "tag", "contact_id"],
+        )
+
+    if "ix_contacts_workspace_created" not in {
+        index["name"] for index in inspector.get_indexes("contacts")
+    }:
+        op.create_index(
+            "ix_contacts_workspace_created",
+            "contacts",
+            ["workspace_id", "created_at", "id"],
+        )
+
+
+def downgrade():
+    op.drop_index("ix_contacts_workspace_created", table_name="contacts")
+    op.drop_table("contact_tags")
@@ -0,0 +1,213 @@
+"""contacts.normalized_email / normalized_phone
+
+Add the normalized match keys to contacts, fill them in, merge contacts that
+end up sharing a key within a workspace, then create the unique indexes that
+keep them unique. Mirrors merge_duplicate_contacts(): the oldest contact
+survives and bookings, series, conversations and form submissions move to it.
+
+Revision ID: 9e3a57c1d2b8
+Revises: 3d4f8775d7df
+Create Date: 2026-10-19 00:00:00
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.contacts import merge_tags
+from app.utils.helpers import normalize_email, normalize_phone
+
+revision = "9e3a57c1d2b8"
+down_revision = "3d4f8775d7df"
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Contacts normalized per statement batch
+BATCH_SIZE = 1000
+
+# Tables whose contact_id follows a contact into the one it is merged into
+CONTACT_REFERENCES = ("bookings", "booking_series", "conversations", "form_submissions")
+
+# Derived per-contact rows, rebuilt by the startup contact maintenance job
+CONTACT_INDEX_TABLES = ("contact_tags", "contact_field_values")
+
+UNIQUE_INDEXES = {
+    "uq_contacts_workspace_email": ["workspace_id", "normalized_email"],
+    "uq_contacts_workspace_phone": ["workspace_id", "normalized_phone"],
+}
+
+contacts = sa.table(
+    "contacts",
+    sa.column("id", sa.String),
+    sa.column("workspace_id", sa.String),
+    sa.column("email", sa.String),
+    sa.column("phone", sa.String),
+    sa.column("normalized_email", sa.String),
+    sa.column("normalized_phone", sa.String),
+    sa.column("tags", sa.JSON),
+    sa.column("custom_fields", sa.JSON),
+    sa.column("unsubscribed", sa.Boolean),
+    sa.column("last_contacted", sa.DateTime),
+    sa.column("created_at", sa.DateTime),
+)
+
+
+def _backfill(bind):
+    """Fill the keys of every contact, walking by id so unparseable values aren't revisited"""
+    update = (
+        sa.update(contacts)
+        .where(contacts.c.id == sa.bindparam("_id"))
+        .values(
+            normalized_email=sa.bindparam("_email"),
+            normalized_phone=sa.bindparam("_phone"),
+        )
+    )
+    last_id = ""
+    while True:
+        rows = bind.execute(
+            sa.select(contacts.c.id, contacts.c.email, contacts.c.phone)
+            .where(
+                contacts.c.id > last_id,
+                sa.or_(contacts.c.email != None, contacts.c.phone != None),
+            )
+            .order_by(contacts.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            update,
+            [
+                {
+                    "_id": row.id,
+                    "_email": normalize_email(row.email),
+                    "_phone": normalize_phone(row.phone),
+                }
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def _duplicate_groups(bind):
+    """Sets of contact ids sharing an email or phone key (transitively)"""
+    parent = {}
+
+    def find(contact_id):
+        while parent.setdefault(contact_id, contact_id) != contact_id:
+            contact_id = parent[contact_id]
+        return contact_id
+
+    for column in (contacts.c.normalized_email, contacts.c.normalized_phone):
+        keys = (
+            sa.select(contacts.c.workspace_id, column)
+            .where(column != None)
+            .group_by(contacts.c.workspace_id, column)
+            .having(sa.func.count(contacts.c.id) > 1)
+            .subquery()
+        )
+        rows = bind.execute(
+            sa.select(contacts.c.workspace_id, column, contacts.c.id)
+            .join(
+                keys,
+                sa.and_(
+                    keys.c.workspace_id == contacts.c.workspace_id,
+                    keys.c[column.name] == column,
+                ),
+            )
+            .order_by(contacts.c.workspace_id, column)
+        ).all()
+        first = {}
+        for workspace_id, key, contact_id in rows:
+            root = first.setdefault((workspace_id, key), contact_id)
+            parent[find(contact_id)] = find(root)
+
+    groups = {}
+    for contact_id in list(parent):
+        groups.setdefault(find(contact_id), []).append(contact_id)
+    return [ids for ids in groups.values() if len(ids) > 1]
+
+
+def _merge(bind, ids, references, index_tables):
+    members = bind.execute(sa.select(contacts).where(contacts.c.id.in_(ids))).all()
+    members.sort(key=lambda c: (c.created_at is None, c.created_at or 0, c.id))
+    survivor, duplicates = members[0], members[1:]
+    duplicate_ids = [c.id for c in duplicates]
+
+    values = {
+        "tags": merge_tags(survivor.tags, *(c.tags for c in duplicates)),
+        "custom_fields": {},
+        "unsubscribed": any(c.unsubscribed for c in members),
+        "last_contacted": max(
+            (c.last_contacted for c in members if c.last_contacted), default=None
+        ),
+    }
+    # Earlier contacts win, the survivor over everyone
+    for contact in reversed(members):
+        values["custom_fields"].update(contact.custom_fields or {})
+    for key, raw in (("normalized_email", "email"), ("normalized_phone", "phone")):
+        if not getattr(survivor, key):
+            donor = next((c for c in duplicates if getattr(c, key)), None)
+            if donor is not None:
+                values[key], values[raw] = getattr(donor, key), getattr(donor, raw)
+
+    for table in references:
+        bind.execute(
+            sa.text(
+                f"UPDATE {table} SET contact_id = :survivor "
+                f"WHERE contact_id IN :duplicates"
+            ).bindparams(sa.bindparam("duplicates", expanding=True)),
+            {"survivor": survivor.id, "duplicates": duplicate_ids},
+        )
+    for table in index_tables:
+        bind.execute(
+            sa.text(f"DELETE FROM {table} WHERE contact_id IN :ids").bindparams(
+                sa.bindparam("ids", expanding=True)
+            ),
+            {"ids": [survivor.id, *duplicate_ids]},
+        )
+    bind.execute(sa.delete(contacts).where(contacts.c.id.in_(duplicate_ids)))
+    bind.execute(
+        sa.update(contacts).where(contacts.c.id == survivor.id).values(**values)
+    )
+    logger.info(
+        f"Merged contacts {', '.join(duplicate_ids)} into {survivor.id}"
+    )
+    return len(duplicates)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    columns = {column["name"] for column in inspector.get_columns("contacts")}
+
+    for name in ("normalized_email", "normalized_phone"):
+        if name not in columns:
+            op.add_column("contacts", sa.Column(name, sa.String(), nullable=True))
+
+    _backfill(bind)
+
+    references = [table for table in CONTACT_REFERENCES if table in tables]
+    index_tables = [table for table in CONTACT_INDEX_TABLES if table in tables]
+    merged = sum(
+        _merge(bind, ids, references, index_tables) for ids in _duplicate_groups(bind)
+    )
+    if merged:
+        logger.info(f"Merged {merged} duplicate contacts")
+
+    existing = {index["name"] for index in inspector.get_indexes("contacts")}
+    for name, index_columns in UNIQUE_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "contacts", index_columns, unique=True)
+
+
+def downgrade():
+    for name in UNIQUE_INDEXES:
+        op.drop_index(name, table_name="contacts")
+    with op.batch_alter_table("contacts") as batch:
+        batch.drop_column("normalized_phone")
+        batch.drop_column("normalized_email")
@@ -0,0 +1,104 @@
+"""service supplies and inventory reservations
+
+Bill of materials per service (service_supplies), the reservation ledger
+of stock held by upcoming bookings (inventory_reservations) and each
+item's reserved total (inventory_items.reserved_quantity). Tables the app
+already created at startup are left as they are.
+
+Revision ID: bc83b643e724
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "bc83b643e724"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "service_supplies" not in tables:
+        op.create_table(
+            "service_supplies",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column(
+                "service_id",
+                sa.String(),
+                sa.ForeignKey("services.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "inventory_id",
+                sa.String(),
+                sa.ForeignKey("inventory_items.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("quantity_per_booking", sa.Integer(), nullable=False),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.UniqueConstraint("service_id", "inventory_id", name="uq_service_supply"),
+        )
+        op.create_index(
+            "ix_service_supplies_service_id", "service_supplies", ["service_id"]
+        )
+
+    if "inventory_reservations" not in tables:
+        op.create_table(
+            "inventory_reservations",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column(
+                "inventory_id",
+                sa.String(),
+                sa.ForeignKey("inventory_items.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "booking_id",
+                sa.String(),
+                sa.ForeignKey("bookings.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("start_time", sa.DateTime(timezone=True), nullable=False),
+            sa.Column(
+                "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+            ),
+            sa.Column("updated_at", sa.DateTime(timezone=True)),
+            sa.UniqueConstraint(
+                "booking_id", "inventory_id", name="uq_inventory_reservation"
+            ),
+        )
+        op.create_index(
+            "ix_inventory_reservations_inventory_id",
+            "inventory_reservations",
+            ["inventory_id"],
+        )
+        op.create_index(
+            "ix_inventory_reservations_booking_id",
+            "inventory_reservations",
+            ["booking_id"],
+        )
+
+    columns = {column["name"] for column in inspector.get_columns("inventory_items")}
+    if "reserved_quantity" not in columns:
+        op.add_column(
+            "inventory_items",
+            sa.Column(
+                "reserved_quantity", sa.Integer(), server_default="0", nullable=False
+            ),
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("inventory_items") as batch:
+        batch.drop_column("reserved_quantity")
+    op.drop_table("inventory_reservations")
+    op.drop_table("service_supplies")
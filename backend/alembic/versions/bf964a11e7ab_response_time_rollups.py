@@ -0,0 +1,56 @@
+"""response time rollups
+
+Daily first-response latency histograms (response_time_rollups) and
+conversations.awaiting_since, the time of the oldest unanswered inbound
+message. Conversations already waiting start their clock at their last
+message.
+
+Revision ID: bf964a11e7ab
+Revises: 692770c58995
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "bf964a11e7ab"
+down_revision = "692770c58995"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "response_time_rollups" not in inspector.get_table_names():
+        op.create_table(
+            "response_time_rollups",
+            sa.Column(
+                "workspace_id",
+                sa.String(),
+                sa.ForeignKey("workspaces.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("user_id", sa.String(), primary_key=True),
+            sa.Column("bucket", sa.Integer(), primary_key=True),
+            sa.Column("count", sa.Integer(), nullable=False),
+            sa.Column("total_seconds", sa.Float(), nullable=False),
+        )
+
+    columns = {column["name"] for column in inspector.get_columns("conversations")}
+    if "awaiting_since" not in columns:
+        op.add_column(
+            "conversations",
+            sa.Column("awaiting_since", sa.DateTime(timezone=True), nullable=True),
+        )
+        op.execute(
+            "UPDATE conversations SET awaiting_since = last_message_at "
+            "WHERE awaiting_reply = true AND awaiting_since IS NULL"
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("conversations") as batch:
+        batch.drop_column("awaiting_since")
+    op.drop_table("response_time_rollups")
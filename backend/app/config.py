@@ -43,6 +43,13 @@ class Settings(BaseSettings):
     # Email (Optional)
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY", "")
     
+    # Message archival: messages of closed conversations idle this long move to conversation_archives
+    MESSAGE_ARCHIVE_AFTER_DAYS: int = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", "90"))
+    MESSAGE_ARCHIVE_INTERVAL_MINUTES: int = int(os.getenv("MESSAGE_ARCHIVE_INTERVAL_MINUTES", "60"))
+    
+    # Reservations of bookings that ended without being completed are released this often
+    RESERVATION_RELEASE_INTERVAL_MINUTES: int = int(os.getenv("RESERVATION_RELEASE_INTERVAL_MINUTES", "15"))
+    
     model_config = SettingsConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
@@ -1,13 +1,24 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from datetime import datetime
 
 from app.config import engine, Base, settings
+from app.services.slot_locks import install_booking_constraints
+from app.services.contacts import run_contact_maintenance_job
+from app.services.broadcasts import resume_broadcasts
+from app.services.archive import run_archive_job
+from app.services.inbound import drain_inbound_events, INBOUND_POLL_SECONDS
+from app.services.reservations import run_reservation_release_job
+from app.services.jobs import run_periodic
+from app.services.activity import run_activity_backfill_job
+from app.services.form_analytics import run_form_stats_backfill_job
+from app.utils.serialization import FastJSONResponse
 from app.routes import (
     auth, password, onboarding, dashboard, inbox, 
-    bookings, inventory, forms, public
+    bookings, inventory, forms, public, resources, contacts, webhooks
 )
 
 logging.basicConfig(level=logging.INFO)
@@ -17,11 +28,36 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     logger.info("Creating database tables...")
     Base.metadata.create_all(bind=engine)
+    install_booking_constraints(engine)
+    # Build submission totals for forms created before form analytics existed.
+    # Before serving: a submission counted meanwhile would leave a partial
+    # form_stats row that the backfill then skips
+    run_form_stats_backfill_job()
+    # Backfill contact keys/tags and merge duplicates off the event loop
+    asyncio.get_running_loop().run_in_executor(None, run_contact_maintenance_job)
+    # Pick up broadcasts a previous process didn't finish sending
+    asyncio.get_running_loop().run_in_executor(None, resume_broadcasts)
+    # Seed the activity feed from recent rows the first time it runs
+    asyncio.get_running_loop().run_in_executor(None, run_activity_backfill_job)
+    # Move old messages of closed conversations to the archive periodically
+    archive_task = asyncio.create_task(
+        run_periodic(run_archive_job, settings.MESSAGE_ARCHIVE_INTERVAL_MINUTES * 60)
+    )
+    # Ingest inbound email/SMS the webhook triggers didn't get to
+    inbound_task = asyncio.create_task(run_periodic(drain_inbound_events, INBOUND_POLL_SECONDS))
+    # Free stock still held by bookings that ended without being completed
+    release_task = asyncio.create_task(
+        run_periodic(run_reservation_release_job, settings.RESERVATION_RELEASE_INTERVAL_MINUTES * 60)
+    )
     logger.info(f"CareOps Platform v{settings.VERSION} started")
     yield
+    archive_task.cancel()
+    inbound_task.cancel()
+    release_task.cancel()
     logger.info("Shutting down")
 
-app = FastAPI(title="CareOps", version=settings.VERSION, lifespan=lifespan)
+# orjson-rendered JSON for every route (stdlib fallback only for dev setups without orjson)
+app = FastAPI(title="CareOps", version=settings.VERSION, lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # ✅ CRITICAL CORS FIX - Allow ALL origins
 app.add_middleware(
@@ -42,6 +78,9 @@ app.include_router(bookings.router, prefix="/api/bookings", tags=["Bookings"])
 app.include_router(inventory.router, prefix="/api/inventory", tags=["Inventory"])
 app.include_router(forms.router, prefix="/api/forms", tags=["Forms"])
 app.include_router(public.router, prefix="/api/public", tags=["Public"])
+app.include_router(resources.router, prefix="/api/resources", tags=["Resources"])
+app.include_router(contacts.router, prefix="/api/contacts", tags=["Contacts"])
+app.include_router(webhooks.router, prefix="/api/webhooks", tags=["Webhooks"])
 
 @app.get("/")
 async def root():
@@ -4,18 +4,26 @@ from sqlalchemy.sql import func
 
 from app.models.user import User, UserRole
 from app.models.workspace import Workspace, Service
-from app.models.contact import Contact, Conversation, Message
-from app.models.booking import Booking, BookingStatus
-from app.models.form import Form, FormSubmission
-from app.models.inventory import InventoryItem, InventoryUsage
-from app.models.integration import Integration, IntegrationType, IntegrationProvider
+from app.models.contact import Contact, ContactTag, ContactFieldValue, Conversation, Message, ConversationArchive, Broadcast
+from app.models.booking import Booking, BookingStatus, BookingSeries
+from app.models.form import Form, FormSubmission, FormStats, FormFieldCount
+from app.models.inventory import InventoryItem, InventoryUsage, ServiceSupply, InventoryReservation
+from app.models.integration import Integration, IntegrationType, IntegrationProvider, InboundEvent
+from app.models.resource import Resource, ResourceType, BookingResource
+from app.models.cache_version import WorkspaceCacheVersion
+from app.models.response_time import ResponseTimeRollup
+from app.models.activity import ActivityEvent
 
 __all__ = [
     "User", "UserRole",
     "Workspace", "Service",
-    "Contact", "Conversation", "Message",
-    "Booking", "BookingStatus",
-    "Form", "FormSubmission",
-    "InventoryItem", "InventoryUsage",
-    "Integration", "IntegrationType", "IntegrationProvider"
+    "Contact", "ContactTag", "ContactFieldValue", "Conversation", "Message", "ConversationArchive", "Broadcast",
+    "Booking", "BookingStatus", "BookingSeries",
+    "Form", "FormSubmission", "FormStats", "FormFieldCount",
+    "InventoryItem", "InventoryUsage", "ServiceSupply", "InventoryReservation",
+    "Integration", "IntegrationType", "IntegrationProvider", "InboundEvent",
+    "Resource", "ResourceType", "BookingResource",
+    "WorkspaceCacheVersion",
+    "ResponseTimeRollup",
+    "ActivityEvent"
 ]
\ No newline at end of file
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, Index
+from datetime import datetime
+import uuid
+
+from app.config import Base
+
+class ActivityEvent(Base):
+    """Append-only dashboard feed entry, with display fields copied in at write time"""
+    __tablename__ = "activity_events"
+    __table_args__ = (
+        Index("ix_activity_events_workspace_created", "workspace_id", "created_at", "id"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+    
+    type = Column(String, nullable=False)  # booking, message, form_submission, broadcast
+    action = Column(String, nullable=False)  # created, received, sent, completed, queued, <booking status>
+    entity_id = Column(String, nullable=False)
+    
+    title = Column(String, nullable=False)
+    description = Column(Text)
+    status = Column(String, nullable=True)
+    url = Column(String, nullable=True)
+    data = Column(JSON, default=dict)  # extra feed fields, e.g. direction / automated for messages
+    
+    # Written from Python (not server_default) so cursor comparisons round-trip exactly
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            **(self.data or {}),
+            "id": self.id,
+            "type": self.type,
+            "action": self.action,
+            "entity_id": self.entity_id,
+            "title": self.title,
+            "description": self.description,
+            "status": self.status,
+            "url": self.url,
+            "timestamp": self.created_at.isoformat() if self.created_at else None
+        }
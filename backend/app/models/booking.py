@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, Enum
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, Enum, false
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -14,6 +14,40 @@ class BookingStatus(str, enum.Enum):
     NO_SHOW = "no_show"
     RESCHEDULED = "rescheduled"
 
+class BookingSeries(Base):
+    """Recurring appointments created together from one RRULE"""
+    __tablename__ = "booking_series"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
+    service_id = Column(String, ForeignKey("services.id", ondelete="SET NULL"), nullable=True)
+    contact_id = Column(String, ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False)
+    
+    rrule = Column(String, nullable=False)  # e.g. FREQ=WEEKLY;INTERVAL=2;COUNT=26
+    timezone = Column(String, default="UTC")  # wall clock the rule is expanded in
+    first_start_time = Column(DateTime(timezone=True), nullable=False)
+    notes = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    service = relationship("Service")
+    contact = relationship("Contact")
+    bookings = relationship("Booking", back_populates="series", order_by="Booking.start_time")
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "workspace_id": self.workspace_id,
+            "service_id": self.service_id,
+            "contact_id": self.contact_id,
+            "rrule": self.rrule,
+            "timezone": self.timezone,
+            "first_start_time": self.first_start_time.isoformat() if self.first_start_time else None,
+            "notes": self.notes,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
 class Booking(Base):
     __tablename__ = "bookings"
     
@@ -21,6 +55,7 @@ class Booking(Base):
     workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
     service_id = Column(String, ForeignKey("services.id", ondelete="SET NULL"), nullable=True)
     contact_id = Column(String, ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False)
+    series_id = Column(String, ForeignKey("booking_series.id", ondelete="SET NULL"), nullable=True, index=True)
     
     # Time
     start_time = Column(DateTime(timezone=True), nullable=False)
@@ -39,6 +74,9 @@ class Booking(Base):
     confirmation_sent = Column(Boolean, default=False)
     reminder_sent = Column(Boolean, default=False)
     
+    # Scheduled against staff/room resources instead of the service calendar
+    resource_scheduled = Column(Boolean, default=False, server_default=false(), nullable=False)
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -46,8 +84,10 @@ class Booking(Base):
     workspace = relationship("Workspace", back_populates="bookings")
     service = relationship("Service", back_populates="bookings")
     contact = relationship("Contact", back_populates="bookings")
+    series = relationship("BookingSeries", back_populates="bookings")
     form_submissions = relationship("FormSubmission", back_populates="booking")
     inventory_usage = relationship("InventoryUsage", back_populates="booking")
+    resources = relationship("BookingResource", back_populates="booking", cascade="all, delete-orphan")
     
     def to_dict(self):
         return {
@@ -55,6 +95,7 @@ class Booking(Base):
             "workspace_id": self.workspace_id,
             "service_id": self.service_id,
             "contact_id": self.contact_id,
+            "series_id": self.series_id,
             "start_time": self.start_time.isoformat() if self.start_time else None,
             "end_time": self.end_time.isoformat() if self.end_time else None,
             "timezone": self.timezone,
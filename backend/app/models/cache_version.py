@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.config import Base
+
+class WorkspaceCacheVersion(Base):
+    """Per-workspace change counter for one kind of entity (services, forms, ...)"""
+    __tablename__ = "workspace_cache_versions"
+    
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), primary_key=True)
+    entity = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def to_dict(self):
+        return {
+            "workspace_id": self.workspace_id,
+            "entity": self.entity,
+            "version": self.version,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
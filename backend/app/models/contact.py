@@ -1,12 +1,20 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Float, Text, JSON, Index, LargeBinary
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 import uuid
 
 from app.config import Base
+from app.utils.helpers import normalize_email, normalize_phone
 
 class Contact(Base):
     __tablename__ = "contacts"
+    __table_args__ = (
+        # One contact per email / phone within a workspace (NULLs don't collide)
+        Index("uq_contacts_workspace_email", "workspace_id", "normalized_email", unique=True),
+        Index("uq_contacts_workspace_phone", "workspace_id", "normalized_phone", unique=True),
+        # Newest-first listing pages on (created_at, id)
+        Index("ix_contacts_workspace_created", "workspace_id", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
@@ -15,6 +23,10 @@ class Contact(Base):
     email = Column(String, nullable=True, index=True)
     phone = Column(String, nullable=True, index=True)
     
+    # Matching keys, kept in sync with email/phone (lowercased / E.164)
+    normalized_email = Column(String, nullable=True)
+    normalized_phone = Column(String, nullable=True)
+    
     # Metadata
     source = Column(String)  # contact_form, booking, manual, import
     tags = Column(JSON, default=list)
@@ -34,6 +46,16 @@ class Contact(Base):
     conversations = relationship("Conversation", back_populates="contact")
     form_submissions = relationship("FormSubmission", back_populates="contact")
     
+    @validates("email")
+    def _normalize_email(self, key, value):
+        self.normalized_email = normalize_email(value)
+        return value
+    
+    @validates("phone")
+    def _normalize_phone(self, key, value):
+        self.normalized_phone = normalize_phone(value)
+        return value
+    
     def to_dict(self):
         return {
             "id": self.id,
@@ -49,8 +71,38 @@ class Contact(Base):
             "last_contacted": self.last_contacted.isoformat() if self.last_contacted else None
         }
 
+class ContactTag(Base):
+    """One row per (contact, tag); mirrors Contact.tags so tags can be filtered in SQL"""
+    __tablename__ = "contact_tags"
+    __table_args__ = (
+        Index("ix_contact_tags_workspace_tag", "workspace_id", "tag", "contact_id"),
+    )
+    
+    contact_id = Column(String, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+
+class ContactFieldValue(Base):
+    """One row per (contact, custom field); mirrors Contact.custom_fields for segment queries"""
+    __tablename__ = "contact_field_values"
+    __table_args__ = (
+        Index("ix_contact_field_values_text", "workspace_id", "field", "value_text"),
+        Index("ix_contact_field_values_number", "workspace_id", "field", "value_number"),
+    )
+    
+    contact_id = Column(String, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    field = Column(String, primary_key=True)  # lowercased key
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+    
+    value_text = Column(String, nullable=True)  # lowercased, for equality / contains
+    value_number = Column(Float, nullable=True)  # set when the value is numeric
+
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # The archive mover scans closed conversations by age
+        Index("ix_conversations_status_last_message", "status", "last_message_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
@@ -64,6 +116,7 @@ class Conversation(Base):
     last_message_at = Column(DateTime(timezone=True), nullable=True)
     last_message_direction = Column(String)  # inbound, outbound
     awaiting_reply = Column(Boolean, default=False)
+    awaiting_since = Column(DateTime(timezone=True), nullable=True)  # oldest unanswered inbound message
     assigned_to_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -92,14 +145,20 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Broadcast workers pick up queued messages in id order
+        Index("ix_messages_broadcast_status", "broadcast_id", "status", "id"),
+        Index("ix_messages_conversation_created", "conversation_id", "created_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=False)
+    broadcast_id = Column(String, ForeignKey("broadcasts.id", ondelete="SET NULL"), nullable=True)
     
     content = Column(Text, nullable=False)
     channel = Column(String)  # email, sms, form, api
     direction = Column(String)  # inbound, outbound
-    status = Column(String, default="sent")  # sent, delivered, read, failed
+    status = Column(String, default="sent")  # queued, sent, delivered, read, failed
     
     # Metadata - RENAMED from 'metadata' to 'message_metadata'
     automated = Column(Boolean, default=False)
@@ -119,6 +178,69 @@ class Message(Base):
             "direction": self.direction,
             "status": self.status,
             "automated": self.automated,
-            "message_metadata": self.message_metadata,  # ← CHANGED
+            "broadcast_id": self.broadcast_id,
+            "message_metadata": self.message_message_metadata,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
+
+class ConversationArchive(Base):
+    """Compressed JSON of a conversation's archived messages, moved out of messages"""
+    __tablename__ = "conversation_archives"
+    
+    conversation_id = Column(String, ForeignKey("conversations.id", ondelete="CASCADE"), primary_key=True)
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    codec = Column(String, nullable=False)  # zstd, zlib
+    payload = Column(LargeBinary, nullable=False)  # list of Message.to_dict()
+    message_count = Column(Integer, default=0)
+    last_message = Column(JSON, nullable=True)  # newest archived message, for previews
+    
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class Broadcast(Base):
+    """One message sent to every reachable contact of a segment"""
+    __tablename__ = "broadcasts"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_by_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    
+    channel = Column(String, nullable=False)  # email, sms
+    subject = Column(String)
+    content = Column(Text, nullable=False)
+    segment = Column(JSON, default=dict)
+    
+    # Progress
+    status = Column(String, default="queued")  # queued, sending, completed, failed
+    total_recipients = Column(Integer, default=0)
+    sent_count = Column(Integer, default=0)
+    failed_count = Column(Integer, default=0)
+    skipped_count = Column(Integer, default=0)  # matched but unsubscribed / no address
+    error = Column(Text)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=True)  # set by the sender after every batch
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def to_dict(self):
+        done = (self.sent_count or 0) + (self.failed_count or 0)
+        return {
+            "id": self.id,
+            "channel": self.channel,
+            "subject": self.subject,
+            "content": self.content,
+            "segment": self.segment,
+            "status": self.status,
+            "total_recipients": self.total_recipients,
+            "sent_count": self.sent_count,
+            "failed_count": self.failed_count,
+            "skipped_count": self.skipped_count,
+            "progress": round(done / self.total_recipients, 4) if self.total_recipients else 1.0,
+            "error": self.error,
+            "created_by_id": self.created_by_id,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None
+        }
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, JSON
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Float, Text, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -52,8 +52,15 @@ class Form(Base):
 
 class FormSubmission(Base):
     __tablename__ = "form_submissions"
+    __table_args__ = (
+        # Workspace-wide listings and dashboard counts without joining forms / bookings
+        Index("ix_form_submissions_workspace_completed", "workspace_id", "completed_at"),
+        Index("ix_form_submissions_workspace_sent", "workspace_id", "sent_at"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Copy of form.workspace_id
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
     form_id = Column(String, ForeignKey("forms.id", ondelete="CASCADE"), nullable=False)
     booking_id = Column(String, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=True)
     contact_id = Column(String, ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False)
@@ -72,6 +79,7 @@ class FormSubmission(Base):
     def to_dict(self):
         return {
             "id": self.id,
+            "workspace_id": self.workspace_id,
             "form_id": self.form_id,
             "booking_id": self.booking_id,
             "contact_id": self.contact_id,
@@ -79,4 +87,24 @@ class FormSubmission(Base):
             "data": self.data,
             "sent_at": self.sent_at.isoformat() if self.sent_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None
-        }
\ No newline at end of file
+        }
+
+class FormStats(Base):
+    """Running totals of a form's submissions, kept up to date as they are sent and completed"""
+    __tablename__ = "form_stats"
+    
+    form_id = Column(String, ForeignKey("forms.id", ondelete="CASCADE"), primary_key=True)
+    
+    sent_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+    completion_seconds = Column(Float, nullable=False, default=0.0)  # sum of completed_at - sent_at
+
+class FormFieldCount(Base):
+    """How often each option of a choice field (select, radio, checkbox) was picked"""
+    __tablename__ = "form_field_counts"
+    
+    form_id = Column(String, ForeignKey("forms.id", ondelete="CASCADE"), primary_key=True)
+    field_id = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    
+    count = Column(Integer, nullable=False, default=0)
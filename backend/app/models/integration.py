@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Enum, Integer, Integer # ← ADDED Integer
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Enum, Integer, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import enum
@@ -60,3 +60,28 @@ class Integration(Base):
             "last_error": self.last_error,
             "created_at": self.created_at.isoformat() if self.created_at else None
         }
+
+class InboundEvent(Base):
+    """A provider webhook payload (inbound email / SMS) waiting to become a Message"""
+    __tablename__ = "inbound_events"
+    __table_args__ = (
+        # Providers retry deliveries; the same provider message is only queued once
+        Index("uq_inbound_events_provider_external", "provider", "external_id", unique=True),
+        Index("ix_inbound_events_status_received", "status", "received_at"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+    integration_id = Column(String, ForeignKey("integrations.id", ondelete="SET NULL"), nullable=True)
+    
+    provider = Column(String, nullable=False)  # sendgrid, twilio
+    channel = Column(String, nullable=False)  # email, sms
+    external_id = Column(String, nullable=True)  # Message-ID / MessageSid
+    payload = Column(JSON, nullable=False)
+    
+    status = Column(String, default="pending")  # pending, processed, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text)
+    
+    received_at = Column(DateTime(timezone=True), server_default=func.now())
+    processed_at = Column(DateTime(timezone=True), nullable=True)
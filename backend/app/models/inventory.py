@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Integer, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 import uuid
 
 from app.config import Base
@@ -16,6 +17,7 @@ class InventoryItem(Base):
     description = Column(Text)
     
     quantity = Column(Integer, default=0)
+    reserved_quantity = Column(Integer, default=0, server_default="0", nullable=False)  # held by upcoming bookings
     threshold = Column(Integer, default=5)
     unit = Column(String, default="pieces")
     
@@ -30,10 +32,21 @@ class InventoryItem(Base):
     # Relationships
     workspace = relationship("Workspace", back_populates="inventory_items")
     usage_history = relationship("InventoryUsage", back_populates="item", cascade="all, delete-orphan")
+    reservations = relationship("InventoryReservation", back_populates="item", cascade="all, delete-orphan")
+    service_supplies = relationship("ServiceSupply", back_populates="item", cascade="all, delete-orphan")
+    
+    @hybrid_property
+    def projected_quantity(self):
+        """Stock left once upcoming confirmed bookings have consumed their supplies"""
+        return (self.quantity or 0) - (self.reserved_quantity or 0)
+    
+    @projected_quantity.expression
+    def projected_quantity(cls):
+        return func.coalesce(cls.quantity, 0) - func.coalesce(cls.reserved_quantity, 0)
     
     @property
     def is_low_stock(self):
-        return self.quantity <= self.threshold
+        return self.projected_quantity <= self.threshold
     
     def to_dict(self):
         return {
@@ -42,6 +55,8 @@ class InventoryItem(Base):
             "sku": self.sku,
             "description": self.description,
             "quantity": self.quantity,
+            "reserved_quantity": self.reserved_quantity,
+            "projected_quantity": self.projected_quantity,
             "threshold": self.threshold,
             "unit": self.unit,
             "is_low_stock": self.is_low_stock,
@@ -76,4 +91,64 @@ class InventoryUsage(Base):
             "quantity_used": self.quantity_used,
             "notes": self.notes,
             "created_at": self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+class ServiceSupply(Base):
+    """Bill of materials: inventory consumed by one booking of a service"""
+    __tablename__ = "service_supplies"
+    __table_args__ = (
+        UniqueConstraint("service_id", "inventory_id", name="uq_service_supply"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    service_id = Column(String, ForeignKey("services.id", ondelete="CASCADE"), nullable=False, index=True)
+    inventory_id = Column(String, ForeignKey("inventory_items.id", ondelete="CASCADE"), nullable=False)
+    
+    quantity_per_booking = Column(Integer, nullable=False, default=1)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    service = relationship("Service")
+    item = relationship("InventoryItem", back_populates="service_supplies")
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "service_id": self.service_id,
+            "inventory_id": self.inventory_id,
+            "quantity_per_booking": self.quantity_per_booking,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+class InventoryReservation(Base):
+    """Ledger row: stock held for a booking that has not consumed it yet"""
+    __tablename__ = "inventory_reservations"
+    __table_args__ = (
+        UniqueConstraint("booking_id", "inventory_id", name="uq_inventory_reservation"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    inventory_id = Column(String, ForeignKey("inventory_items.id", ondelete="CASCADE"), nullable=False, index=True)
+    booking_id = Column(String, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    quantity = Column(Integer, nullable=False)
+    start_time = Column(DateTime(timezone=True), nullable=False)  # copy of booking start, for projections
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    item = relationship("InventoryItem", back_populates="reservations")
+    booking = relationship("Booking")
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "inventory_id": self.inventory_id,
+            "booking_id": self.booking_id,
+            "quantity": self.quantity,
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
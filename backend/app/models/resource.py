@@ -0,0 +1,79 @@
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Enum, Table, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+import enum
+import uuid
+
+from app.config import Base
+
+class ResourceType(str, enum.Enum):
+    STAFF = "staff"
+    ROOM = "room"
+
+# Resources a service can be delivered with. A booking needs one free
+# resource of each type linked to its service.
+service_resources = Table(
+    "service_resources",
+    Base.metadata,
+    Column("service_id", String, ForeignKey("services.id", ondelete="CASCADE"), primary_key=True),
+    Column("resource_id", String, ForeignKey("resources.id", ondelete="CASCADE"), primary_key=True),
+)
+
+class Resource(Base):
+    __tablename__ = "resources"
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
+    
+    name = Column(String, nullable=False)
+    resource_type = Column(Enum(ResourceType), nullable=False)
+    user_id = Column(String, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)  # staff member, if any
+    
+    is_active = Column(Boolean, default=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    services = relationship("Service", secondary=service_resources, back_populates="resources")
+    user = relationship("User")
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "workspace_id": self.workspace_id,
+            "name": self.name,
+            "resource_type": self.resource_type.value if self.resource_type else None,
+            "user_id": self.user_id,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+class BookingResource(Base):
+    """Resource held by a booking; times are copied from the booking"""
+    __tablename__ = "booking_resources"
+    __table_args__ = (
+        Index("ix_booking_resources_resource_time", "resource_id", "start_time"),
+    )
+    
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    booking_id = Column(String, ForeignKey("bookings.id", ondelete="CASCADE"), nullable=False, index=True)
+    resource_id = Column(String, ForeignKey("resources.id", ondelete="CASCADE"), nullable=False)
+    
+    start_time = Column(DateTime(timezone=True), nullable=False)
+    end_time = Column(DateTime(timezone=True), nullable=False)
+    is_active = Column(Boolean, default=True)  # False once the booking no longer occupies the slot
+    
+    # Relationships
+    booking = relationship("Booking", back_populates="resources")
+    resource = relationship("Resource")
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "booking_id": self.booking_id,
+            "resource_id": self.resource_id,
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "is_active": self.is_active
+        }
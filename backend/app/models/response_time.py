@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Integer, Float, Date, ForeignKey
+
+from app.config import Base
+
+class ResponseTimeRollup(Base):
+    """First-response latencies of one workspace/day/responder, counted per latency bucket"""
+    __tablename__ = "response_time_rollups"
+    
+    workspace_id = Column(String, ForeignKey("workspaces.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC day of the response
+    user_id = Column(String, primary_key=True, default="")  # "" when no user replied
+    bucket = Column(Integer, primary_key=True)  # index into response_times.BUCKET_BOUNDS
+    
+    count = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Float, nullable=False, default=0.0)
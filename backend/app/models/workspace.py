@@ -108,6 +108,7 @@ class Service(Base):
     bookings = relationship("Booking", back_populates="service")
     forms = relationship("Form", back_populates="service")
     availabilities = relationship("Availability", back_populates="service", cascade="all, delete-orphan")  # ADD THIS LINE
+    resources = relationship("Resource", secondary="service_resources", back_populates="services")
     
     def to_dict(self):
         return {
@@ -7,6 +7,9 @@ from app.routes import bookings
 from app.routes import inventory
 from app.routes import forms
 from app.routes import public
+from app.routes import resources
+from app.routes import contacts
+from app.routes import webhooks
 
 __all__ = [
     "auth",
@@ -17,5 +20,8 @@ __all__ = [
     "bookings",
     "inventory",
     "forms",
-    "public"
+    "public",
+    "resources",
+    "contacts",
+    "webhooks"
 ]
\ No newline at end of file
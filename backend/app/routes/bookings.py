@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
+from sqlalchemy.orm import Session, selectinload, load_only
 from sqlalchemy import and_, or_
 from datetime import datetime, timedelta
 from typing import Optional, List
@@ -8,10 +8,20 @@ from pydantic import BaseModel, validator
 from app.config import get_db
 from app.dependencies import get_current_workspace, get_current_user
 from app.models.workspace import Workspace, Service
-from app.models.booking import Booking, BookingStatus
+from app.models.booking import Booking, BookingStatus, BookingSeries
 from app.models.contact import Contact
 from app.models.user import User  
 from app.services.automation import AutomationService
+from app.services.reservations import sync_booking_reservations, sync_bookings_reservations
+from app.services.slot_locks import (
+    reserve_slot, reserve_series_slots, commit_booking, SlotUnavailableError, ACTIVE_STATUSES
+)
+from app.services.resource_calendar import sync_booking_resources, sync_bookings_resources, to_naive_utc
+from app.services.recurrence import expand_rrule, RecurrenceError
+from app.services.availability import open_slots, get_compiled_rules, local_today
+from app.services.activity import record_activity, booking_event
+from app.services.exports import stream_query, stream_records, export_response, EXPORT_FORMATS
+from app.utils.serialization import FastJSONResponse, rows_to_dicts, parse_fields
 
 router = APIRouter()
 
@@ -25,6 +35,7 @@ class BookingReschedule(BaseModel):
     
     @validator('start_time')
     def validate_start_time(cls, v):
+        v = to_naive_utc(v)  # stored and compared as UTC
         if v < datetime.utcnow():
             raise ValueError('Start time must be in the future')
         return v
@@ -34,13 +45,124 @@ class BookingCreate(BaseModel):
     contact_id: str
     start_time: datetime
     notes: Optional[str] = None
+    resource_ids: Optional[List[str]] = None  # preferred staff/rooms
     
     @validator('start_time')
     def validate_start_time(cls, v):
+        v = to_naive_utc(v)  # stored and compared as UTC
         if v < datetime.utcnow():
             raise ValueError('Start time must be in the future')
         return v
 
+class BookingSeriesCreate(BaseModel):
+    service_id: str
+    contact_id: str
+    start_time: datetime  # first session
+    rrule: str  # e.g. FREQ=WEEKLY;COUNT=52
+    notes: Optional[str] = None
+    resource_ids: Optional[List[str]] = None  # preferred staff/rooms
+    skip_conflicts: bool = False  # book the free sessions instead of failing
+    
+    @validator('start_time')
+    def validate_start_time(cls, v):
+        v = to_naive_utc(v)  # stored and compared as UTC
+        if v < datetime.utcnow():
+            raise ValueError('Start time must be in the future')
+        return v
+
+class BookingBulkFilter(BaseModel):
+    status: Optional[str] = None
+    service_id: Optional[str] = None
+    contact_id: Optional[str] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class BookingBulkAction(BaseModel):
+    action: str  # confirm, cancel, no_show, complete
+    booking_ids: Optional[List[str]] = None
+    filter: Optional[BookingBulkFilter] = None
+    reason: Optional[str] = None  # cancellation reason
+
+# action -> (target status, statuses it may be applied to)
+BULK_TRANSITIONS = {
+    "confirm": (BookingStatus.CONFIRMED, (BookingStatus.PENDING, BookingStatus.RESCHEDULED)),
+    "cancel": (BookingStatus.CANCELLED, (BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.RESCHEDULED)),
+    "no_show": (BookingStatus.NO_SHOW, (BookingStatus.CONFIRMED, BookingStatus.RESCHEDULED)),
+    "complete": (BookingStatus.COMPLETED, (BookingStatus.CONFIRMED, BookingStatus.RESCHEDULED, BookingStatus.NO_SHOW)),
+}
+
+MAX_BULK_BOOKINGS = 1000
+
+# Related rows a booking read can embed with ?expand=, each loaded in one extra query
+BOOKING_EXPANSIONS = {
+    "contact": Booking.contact,
+    "service": Booking.service,
+}
+
+# What Booking.to_dict() exposes, for list reads that skip the ORM objects;
+# ?fields= picks a subset of these
+BOOKING_COLUMNS = {column.key: column for column in (
+    Booking.id, Booking.workspace_id, Booking.service_id, Booking.contact_id, Booking.series_id,
+    Booking.start_time, Booking.end_time, Booking.timezone, Booking.status, Booking.notes,
+    Booking.confirmation_sent, Booking.reminder_sent, Booking.created_at, Booking.updated_at
+)}
+
+# Export columns: the booking plus who and what it is for
+BOOKING_EXPORT_COLUMNS = {
+    "id": Booking.id,
+    "start_time": Booking.start_time,
+    "end_time": Booking.end_time,
+    "timezone": Booking.timezone,
+    "status": Booking.status,
+    "service_id": Booking.service_id,
+    "service_name": Service.name.label("service_name"),
+    "contact_id": Booking.contact_id,
+    "contact_name": Contact.name.label("contact_name"),
+    "contact_email": Contact.email.label("contact_email"),
+    "contact_phone": Contact.phone.label("contact_phone"),
+    "series_id": Booking.series_id,
+    "notes": Booking.notes,
+    "cancelled_at": Booking.cancelled_at,
+    "cancellation_reason": Booking.cancellation_reason,
+    "created_at": Booking.created_at,
+}
+
+def parse_expand(expand: Optional[str]) -> List[str]:
+    names = [name.strip() for name in (expand or "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in BOOKING_EXPANSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot expand: {', '.join(unknown)} (allowed: {', '.join(BOOKING_EXPANSIONS)})"
+        )
+    return list(dict.fromkeys(names))
+
+def expand_options(expand: List[str]) -> list:
+    """selectinload options for the expansions, so a page of bookings costs one query per relation"""
+    return [selectinload(BOOKING_EXPANSIONS[name]) for name in expand]
+
+def booking_payload(booking: Booking, expand: List[str], fields: Optional[List[str]] = None) -> dict:
+    """Booking.to_dict() (or just `fields` of it) plus the compact form of each expanded relation"""
+    result = {name: getattr(booking, name) for name in fields} if fields else booking.to_dict()
+    if "contact" in expand:
+        contact = booking.contact
+        result["contact"] = {
+            "id": contact.id,
+            "name": contact.name,
+            "email": contact.email,
+            "phone": contact.phone
+        } if contact else None
+    if "service" in expand:
+        service = booking.service
+        result["service"] = {
+            "id": service.id,
+            "name": service.name,
+            "duration": service.duration,
+            "price": service.price,
+            "location_type": service.location_type
+        } if service else None
+    return result
+
 # Routes
 @router.get("")
 async def get_bookings(
@@ -52,10 +174,18 @@ async def get_bookings(
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    expand: Optional[str] = None,
+    fields: Optional[str] = None
 ):
-    """Get bookings with filters"""
+    """Get bookings with filters.
     
+    expand=contact,service embeds those records; fields=start_time,status,...
+    returns only those columns (plus id).
+    """
+    
+    expanded = parse_expand(expand)
+    selected = parse_fields(fields, BOOKING_COLUMNS)
     query = db.query(Booking).filter(
         Booking.workspace_id == workspace.id
     )
@@ -97,22 +227,78 @@ async def get_bookings(
             )
     
     total = query.count()
-    bookings = query.order_by(Booking.start_time.desc()).offset(offset).limit(limit).all()
-    
-    return {
+    query = query.order_by(Booking.start_time.desc()).offset(offset).limit(limit)
+    if expanded:
+        if selected:
+            # The relations' foreign keys are needed to load them, even when not returned
+            needed = set(selected) | {f"{name}_id" for name in expanded}
+            query = query.options(load_only(*(BOOKING_COLUMNS[name] for name in needed)))
+        bookings = [booking_payload(b, expanded, selected) for b in query.options(*expand_options(expanded))]
+    else:
+        # Plain rows of the to_dict() columns, encoded once by the response
+        columns = [BOOKING_COLUMNS[name] for name in selected] if selected else BOOKING_COLUMNS.values()
+        bookings = rows_to_dicts(query.with_entities(*columns))
+    
+    return FastJSONResponse({
         "total": total,
-        "bookings": [b.to_dict() for b in bookings]
-    }
+        "bookings": bookings
+    })
+
+@router.get("/export")
+async def export_bookings(
+    workspace: Workspace = Depends(get_current_workspace),
+    format: str = Query("csv", pattern=EXPORT_FORMATS),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    service_id: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+):
+    """Stream every matching booking, with contact and service names, as CSV or NDJSON"""
+    
+    booking_status = None
+    if status_filter:
+        try:
+            booking_status = BookingStatus(status_filter.lower())
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid status: {status_filter}"
+            )
+    workspace_id = workspace.id
+    
+    def build_query(db: Session):
+        query = db.query(
+            *BOOKING_EXPORT_COLUMNS.values()
+        ).outerjoin(Contact, Booking.contact_id == Contact.id).outerjoin(
+            Service, Booking.service_id == Service.id
+        ).filter(Booking.workspace_id == workspace_id)
+        if booking_status:
+            query = query.filter(Booking.status == booking_status)
+        if service_id:
+            query = query.filter(Booking.service_id == service_id)
+        if start_date:
+            query = query.filter(Booking.start_time >= start_date)
+        if end_date:
+            query = query.filter(Booking.start_time <= end_date)
+        return query.order_by(Booking.start_time, Booking.id)
+    
+    records = (row._mapping for row in stream_query(build_query))
+    return export_response(
+        stream_records(records, list(BOOKING_EXPORT_COLUMNS), format),
+        format, "bookings"
+    )
 
 @router.get("/{booking_id}")
 async def get_booking(
     booking_id: str,
     workspace: Workspace = Depends(get_current_workspace),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    expand: Optional[str] = None
 ):
     """Get single booking details"""
     
-    booking = db.query(Booking).filter(
+    expanded = parse_expand(expand)
+    booking = db.query(Booking).options(*expand_options(expanded)).filter(
         Booking.id == booking_id,
         Booking.workspace_id == workspace.id
     ).first()
@@ -123,7 +309,9 @@ async def get_booking(
             detail="Booking not found"
         )
     
-    return booking.to_dict()
+    result = booking_payload(booking, expanded)
+    result["resources"] = [r.to_dict() for r in booking.resources]
+    return result
 
 @router.post("")
 async def create_booking(
@@ -158,48 +346,371 @@ async def create_booking(
             detail="Contact not found"
         )
     
+    if data.resource_ids and not set(data.resource_ids) <= {r.id for r in service.resources}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Resource is not assigned to this service"
+        )
+    
     # Calculate end time
     end_time = data.start_time + timedelta(minutes=service.duration)
     
-    # Check for conflicts
-    conflicting = db.query(Booking).filter(
-        Booking.workspace_id == workspace.id,
-        Booking.service_id == service.id,
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING]),
-        Booking.start_time < end_time,
-        Booking.end_time > data.start_time
+    # Create booking, holding the slot lock until commit
+    try:
+        resource_ids = reserve_slot(
+            db, workspace.id, service, data.start_time, end_time,
+            resource_ids=data.resource_ids
+        )
+        
+        booking = Booking(
+            workspace_id=workspace.id,
+            service_id=service.id,
+            contact_id=contact.id,
+            start_time=data.start_time,
+            end_time=end_time,
+            timezone=workspace.timezone,
+            status=BookingStatus.CONFIRMED,
+            notes=data.notes,
+            confirmation_sent=False
+        )
+        db.add(booking)
+        sync_booking_resources(db, booking, resource_ids)
+        sync_booking_reservations(db, booking)
+        commit_booking(db)
+    except SlotUnavailableError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This time slot is not available"
+        )
+    db.refresh(booking)
+    
+    # Trigger automation
+    await AutomationService.handle_booking_created(workspace, booking)
+    
+    result = booking.to_dict()
+    result["resource_ids"] = resource_ids
+    
+    return {
+        "status": "success",
+        "booking": result
+    }
+
+@router.post("/series")
+async def create_booking_series(
+    data: BookingSeriesCreate,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Create a recurring series of bookings from an RRULE"""
+    
+    # Verify service
+    service = db.query(Service).filter(
+        Service.id == data.service_id,
+        Service.workspace_id == workspace.id,
+        Service.is_active == True
     ).first()
     
-    if conflicting:
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    # Verify contact
+    contact = db.query(Contact).filter(
+        Contact.id == data.contact_id,
+        Contact.workspace_id == workspace.id
+    ).first()
+    
+    if not contact:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contact not found"
+        )
+    
+    if data.resource_ids and not set(data.resource_ids) <= {r.id for r in service.resources}:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Resource is not assigned to this service"
+        )
+    
+    # Sessions keep their local wall-clock time across DST changes
+    try:
+        starts = expand_rrule(data.rrule, data.start_time, workspace.timezone)
+    except RecurrenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    duration = timedelta(minutes=service.duration)
+    occurrences = [(start, start + duration) for start in starts]
+    
+    # Check every session in one pass and insert them in one transaction,
+    # holding the slot lock until commit
+    try:
+        picks = reserve_series_slots(
+            db, workspace.id, service, occurrences,
+            resource_ids=data.resource_ids
+        )
+        skipped = [start for (start, _), pick in zip(occurrences, picks) if pick is None]
+        
+        if skipped and (not data.skip_conflicts or len(skipped) == len(occurrences)):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{len(skipped)} of {len(occurrences)} sessions are not available: "
+                       f"{', '.join(start.isoformat() for start in skipped)}"
+            )
+        
+        series = BookingSeries(
+            workspace_id=workspace.id,
+            service_id=service.id,
+            contact_id=contact.id,
+            rrule=data.rrule.strip().upper(),
+            timezone=workspace.timezone,
+            first_start_time=data.start_time,
+            notes=data.notes
+        )
+        db.add(series)
+        
+        bookings = []
+        picked = []
+        for (start, end), pick in zip(occurrences, picks):
+            if pick is None:
+                continue
+            bookings.append(Booking(
+                workspace_id=workspace.id,
+                service_id=service.id,
+                contact_id=contact.id,
+                series=series,
+                start_time=start,
+                end_time=end,
+                timezone=workspace.timezone,
+                status=BookingStatus.CONFIRMED,
+                notes=data.notes,
+                confirmation_sent=False
+            ))
+            picked.append(pick)
+        db.add_all(bookings)
+        db.flush()
+        
+        resource_ids = {booking.id: pick for booking, pick in zip(bookings, picked)}
+        sync_bookings_resources(db, bookings, resource_ids)
+        sync_bookings_reservations(db, bookings)
+        commit_booking(db)
+    except SlotUnavailableError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="This time slot is not available"
         )
     
-    # Create booking
-    booking = Booking(
-        workspace_id=workspace.id,
-        service_id=service.id,
-        contact_id=contact.id,
-        start_time=data.start_time,
-        end_time=end_time,
-        timezone=workspace.timezone,
-        status=BookingStatus.CONFIRMED,
-        notes=data.notes,
-        confirmation_sent=False
+    # Reload the whole series in one query rather than one refresh per booking
+    db.refresh(series)
+    bookings = db.query(Booking).filter(
+        Booking.series_id == series.id
+    ).order_by(Booking.start_time).all()
+    
+    # One consolidated confirmation instead of one email per session
+    await AutomationService.handle_series_created(workspace, series, bookings)
+    
+    result = []
+    for booking in bookings:
+        booking_dict = booking.to_dict()
+        booking_dict["resource_ids"] = resource_ids.get(booking.id, [])
+        result.append(booking_dict)
+    
+    return {
+        "status": "success",
+        "series": series.to_dict(),
+        "bookings": result,
+        "skipped": [start.isoformat() for start in skipped]
+    }
+
+@router.post("/bulk")
+async def bulk_update_bookings(
+    data: BookingBulkAction,
+    background_tasks: BackgroundTasks,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Apply a status transition to many bookings at once"""
+    
+    action = data.action.lower().replace("-", "_")
+    if action not in BULK_TRANSITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid action: {data.action}"
+        )
+    target, allowed_from = BULK_TRANSITIONS[action]
+    
+    if (data.booking_ids is None) == (data.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either booking_ids or filter"
+        )
+    
+    # Resolve the selection to (id, current status) in one query
+    query = db.query(Booking.id, Booking.status).filter(
+        Booking.workspace_id == workspace.id
     )
-    db.add(booking)
-    db.commit()
-    db.refresh(booking)
     
-    # Trigger automation
-    await AutomationService.handle_booking_created(workspace, booking)
+    if data.booking_ids is not None:
+        requested = list(dict.fromkeys(data.booking_ids))
+        if len(requested) > MAX_BULK_BOOKINGS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {MAX_BULK_BOOKINGS} bookings per request"
+            )
+        current = dict(query.filter(Booking.id.in_(requested)).all()) if requested else {}
+    else:
+        criteria = data.filter
+        if criteria.status:
+            try:
+                query = query.filter(Booking.status == BookingStatus(criteria.status.lower()))
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid status: {criteria.status}"
+                )
+        if criteria.service_id:
+            query = query.filter(Booking.service_id == criteria.service_id)
+        if criteria.contact_id:
+            query = query.filter(Booking.contact_id == criteria.contact_id)
+        if criteria.start_date:
+            query = query.filter(Booking.start_time >= to_naive_utc(criteria.start_date))
+        if criteria.end_date:
+            query = query.filter(Booking.start_time <= to_naive_utc(criteria.end_date))
+        
+        rows = query.order_by(Booking.start_time).limit(MAX_BULK_BOOKINGS + 1).all()
+        if len(rows) > MAX_BULK_BOOKINGS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Filter matches more than {MAX_BULK_BOOKINGS} bookings; narrow it down"
+            )
+        requested = [booking_id for booking_id, _ in rows]
+        current = dict(rows)
+    
+    # Validate every transition before touching anything
+    results = {}
+    eligible = []
+    for booking_id in requested:
+        if booking_id not in current:
+            results[booking_id] = {"result": "not_found"}
+        elif current[booking_id] == target:
+            results[booking_id] = {"result": "unchanged", "status": target.value}
+        elif current[booking_id] not in allowed_from:
+            results[booking_id] = {
+                "result": "invalid_transition",
+                "status": current[booking_id].value,
+                "detail": f"Cannot {action.replace('_', ' ')} a {current[booking_id].value} booking"
+            }
+        else:
+            eligible.append(booking_id)
+    
+    updated_ids = []
+    if eligible:
+        now = datetime.utcnow()
+        values = {Booking.status: target, Booking.updated_at: now}
+        if target == BookingStatus.CANCELLED:
+            values[Booking.cancelled_at] = now
+            values[Booking.cancellation_reason] = data.reason
+        
+        # One set-based UPDATE; the status guard skips rows changed since we read them
+        db.query(Booking).filter(
+            Booking.id.in_(eligible),
+            Booking.status.in_(allowed_from)
+        ).update(values, synchronize_session=False)
+        
+        bookings = db.query(Booking).options(
+            selectinload(Booking.service),
+            selectinload(Booking.contact)
+        ).filter(
+            Booking.id.in_(eligible)
+        ).populate_existing().all()
+        changed = [b for b in bookings if b.status == target]
+        
+        sync_bookings_resources(db, changed)
+        sync_bookings_reservations(db, changed)
+        # The set-based UPDATE bypasses the activity feed's flush listener
+        record_activity(db.connection(), [booking_event(
+            b.id, b.workspace_id, target.value, target.value,
+            b.service.name if b.service else None, b.contact.name if b.contact else None, b.start_time, now
+        ) for b in changed])
+        db.commit()
+        
+        updated_ids = [b.id for b in changed]
+        for booking in bookings:
+            if booking.status == target:
+                results[booking.id] = {"result": "updated", "status": target.value}
+            else:
+                results[booking.id] = {
+                    "result": "invalid_transition",
+                    "status": booking.status.value if booking.status else None,
+                    "detail": "Booking was changed by another request"
+                }
+    
+    # Notifications go out as one batch after the response
+    if updated_ids and target == BookingStatus.CONFIRMED:
+        background_tasks.add_task(AutomationService.handle_bookings_confirmed, workspace.id, updated_ids)
+    elif updated_ids and target == BookingStatus.CANCELLED:
+        background_tasks.add_task(AutomationService.handle_bookings_cancelled, workspace.id, updated_ids, data.reason)
     
     return {
         "status": "success",
-        "booking": booking.to_dict()
+        "action": action,
+        "updated": len(updated_ids),
+        "results": [{"id": booking_id, **results[booking_id]} for booking_id in requested]
     }
 
+@router.get("/series/{series_id}")
+async def get_booking_series(
+    series_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    expand: Optional[str] = None
+):
+    """Get a recurring series with its bookings"""
+    
+    expanded = parse_expand(expand)
+    series = db.query(BookingSeries).options(
+        selectinload(BookingSeries.bookings).options(*expand_options(expanded))
+    ).filter(
+        BookingSeries.id == series_id,
+        BookingSeries.workspace_id == workspace.id
+    ).first()
+    
+    if not series:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Booking series not found"
+        )
+    
+    result = series.to_dict()
+    result["bookings"] = [booking_payload(b, expanded) for b in series.bookings]
+    
+    return result
+
+def _set_status(db: Session, workspace: Workspace, booking: Booking, new_status: BookingStatus):
+    """Change a booking's status, re-reserving its slot when it comes back from cancelled/no-show.
+    
+    Raises SlotUnavailableError when the slot was taken in the meantime;
+    the caller commits with commit_booking().
+    """
+    resource_ids = None
+    if new_status in ACTIVE_STATUSES and booking.status not in ACTIVE_STATUSES and booking.service:
+        resource_ids = reserve_slot(
+            db, workspace.id, booking.service, booking.start_time, booking.end_time,
+            exclude_booking_id=booking.id,
+            resource_ids=[r.resource_id for r in booking.resources] or None
+        )
+    booking.status = new_status
+    booking.updated_at = datetime.utcnow()
+    sync_booking_resources(db, booking, resource_ids)
+    sync_booking_reservations(db, booking)
+
 @router.patch("/{booking_id}")
 async def update_booking(
     booking_id: str,
@@ -220,9 +731,10 @@ async def update_booking(
             detail="Booking not found"
         )
     
+    new_status = None
     if data.status:
         try:
-            booking.status = BookingStatus(data.status.lower())
+            new_status = BookingStatus(data.status.lower())
         except ValueError:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -233,7 +745,16 @@ async def update_booking(
         booking.notes = data.notes
     
     booking.updated_at = datetime.utcnow()
-    db.commit()
+    try:
+        if new_status:
+            _set_status(db, workspace, booking, new_status)
+        commit_booking(db)
+    except SlotUnavailableError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This time slot is not available"
+        )
     
     return {
         "status": "success",
@@ -259,9 +780,15 @@ async def confirm_booking(
             detail="Booking not found"
         )
     
-    booking.status = BookingStatus.CONFIRMED
-    booking.updated_at = datetime.utcnow()
-    db.commit()
+    try:
+        _set_status(db, workspace, booking, BookingStatus.CONFIRMED)
+        commit_booking(db)
+    except SlotUnavailableError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This time slot is not available"
+        )
     
     # Send confirmation if not already sent
     if not booking.confirmation_sent:
@@ -299,6 +826,8 @@ async def cancel_booking(
     booking.cancelled_at = datetime.utcnow()
     booking.cancellation_reason = reason
     booking.updated_at = datetime.utcnow()
+    sync_booking_resources(db, booking)
+    sync_booking_reservations(db, booking)
     db.commit()
     
     # TODO: Send cancellation notification
@@ -338,29 +867,29 @@ async def reschedule_booking(
     # Calculate new end time
     end_time = data.start_time + timedelta(minutes=booking.service.duration)
     
-    # Check for conflicts
-    conflicting = db.query(Booking).filter(
-        Booking.workspace_id == workspace.id,
-        Booking.service_id == booking.service_id,
-        Booking.id != booking.id,
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING]),
-        Booking.start_time < end_time,
-        Booking.end_time > data.start_time
-    ).first()
-    
-    if conflicting:
+    # Update booking, holding the slot lock until commit; keep the same
+    # staff/rooms when they are still free
+    try:
+        resource_ids = reserve_slot(
+            db, workspace.id, booking.service, data.start_time, end_time,
+            exclude_booking_id=booking.id,
+            resource_ids=[r.resource_id for r in booking.resources] or None
+        )
+        
+        booking.start_time = data.start_time
+        booking.end_time = end_time
+        booking.status = BookingStatus.RESCHEDULED
+        booking.updated_at = datetime.utcnow()
+        sync_booking_resources(db, booking, resource_ids)
+        sync_booking_reservations(db, booking)
+        commit_booking(db)
+    except SlotUnavailableError:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="This time slot is not available"
         )
     
-    # Update booking
-    booking.start_time = data.start_time
-    booking.end_time = end_time
-    booking.status = BookingStatus.RESCHEDULED
-    booking.updated_at = datetime.utcnow()
-    db.commit()
-    
     # TODO: Send reschedule notification
     
     return {
@@ -390,6 +919,8 @@ async def mark_no_show(
     
     booking.status = BookingStatus.NO_SHOW
     booking.updated_at = datetime.utcnow()
+    sync_booking_resources(db, booking)
+    sync_booking_reservations(db, booking)
     db.commit()
     
     return {
@@ -419,6 +950,8 @@ async def complete_booking(
     
     booking.status = BookingStatus.COMPLETED
     booking.updated_at = datetime.utcnow()
+    sync_booking_resources(db, booking)
+    sync_booking_reservations(db, booking)
     db.commit()
     
     return {
@@ -436,7 +969,15 @@ async def check_availability(
 ):
     """Check availability for a specific date"""
     
-    query_date = datetime.fromisoformat(date) if date else datetime.utcnow()
+    # Dates and slot labels are in the workspace's local time
+    try:
+        query_date = datetime.fromisoformat(date).date() if date else local_today(workspace.timezone)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use ISO format."
+        )
+    day_of_week = query_date.isoweekday()
     
     services = db.query(Service).filter(
         Service.workspace_id == workspace.id,
@@ -448,45 +989,21 @@ async def check_availability(
     
     result = []
     for service in services:
-        # Get day of week (1-7, 1=Monday)
-        day_of_week = query_date.isoweekday()
+        if day_of_week not in get_compiled_rules(service):
+            continue
         
-        # Find availability for this day
-        availability = next(
-            (a for a in service.availability if a.get("day") == day_of_week),
-            None
-        )
+        available_slots = open_slots(db, service, workspace.timezone, query_date)
         
-        if availability and availability.get("enabled", False):
-            slots = availability.get("slots", [])
-            
-            # Filter out booked slots
-            available_slots = []
-            for slot_time in slots:
-                slot_datetime = datetime.combine(
-                    query_date.date(),
-                    datetime.strptime(slot_time, "%H:%M").time()
-                )
-                
-                # Check if slot is booked
-                conflicting = db.query(Booking).filter(
-                    Booking.workspace_id == workspace.id,
-                    Booking.service_id == service.id,
-                    Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING]),
-                    Booking.start_time == slot_datetime
-                ).first()
-                
-                if not conflicting:
-                    available_slots.append(slot_time)
-            
-            result.append({
-                "service_id": service.id,
-                "service_name": service.name,
-                "date": query_date.isoformat(),
-                "day_of_week": day_of_week,
-                "available_slots": available_slots,
-                "duration": service.duration,
-                "price": service.price
-            })
-    
-    return result
\ No newline at end of file
+        result.append({
+            "service_id": service.id,
+            "service_name": service.name,
+            "date": query_date.isoformat(),
+            "timezone": workspace.timezone,
+            "day_of_week": day_of_week,
+            "available_slots": [slot["time"] for slot in available_slots],
+            "slot_times": available_slots,
+            "duration": service.duration,
+            "price": service.price
+        })
+    
+    return result
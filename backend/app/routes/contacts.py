@@ -0,0 +1,335 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, status
+from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, or_, func
+from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+import csv
+import io
+import json
+
+from app.config import get_db
+from app.dependencies import get_current_workspace
+from app.models.workspace import Workspace
+from app.models.contact import Contact, ContactTag
+from app.services.contacts import find_or_create_contact, import_contacts, merge_tags
+from app.services.segments import compile_segment, SegmentError
+from app.services.exports import stream_query, stream_records, export_response, EXPORT_FORMATS
+from app.utils.helpers import normalize_tag
+
+router = APIRouter()
+
+EXPORT_COLUMNS = ["id", "name", "email", "phone", "source", "tags", "custom_fields",
+                  "unsubscribed", "created_at", "last_contacted"]
+
+# Pydantic models
+class ContactCreate(BaseModel):
+    name: str
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    tags: Optional[List[str]] = None
+    custom_fields: Optional[dict] = None
+
+class SegmentDefinition(BaseModel):
+    match: str = Field("all", pattern="^(all|any)$")
+    conditions: List[dict] = []
+
+class SegmentQuery(SegmentDefinition):
+    cursor: Optional[str] = None
+    limit: int = Field(50, ge=1, le=200)
+
+class ContactUpdate(BaseModel):
+    name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    phone: Optional[str] = None
+    tags: Optional[List[str]] = None
+    custom_fields: Optional[dict] = None
+    unsubscribed: Optional[bool] = None
+    is_active: Optional[bool] = None
+
+def _get_contact(db: Session, workspace: Workspace, contact_id: str) -> Contact:
+    contact = db.query(Contact).filter(
+        Contact.id == contact_id,
+        Contact.workspace_id == workspace.id
+    ).first()
+    
+    if not contact:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contact not found"
+        )
+    
+    return contact
+
+def _filtered(query, workspace_id: str, tags: Optional[List[str]], source: Optional[str] = None):
+    """Restrict a contacts query to the workspace, a source and every given tag"""
+    query = query.filter(Contact.workspace_id == workspace_id)
+    if source:
+        query = query.filter(Contact.source == source)
+    for tag in {normalize_tag(t) for t in tags or []} - {None}:
+        query = query.filter(Contact.id.in_(
+            select(ContactTag.contact_id).where(
+                ContactTag.workspace_id == workspace_id,
+                ContactTag.tag == tag
+            )
+        ))
+    return query
+
+def _check_identity_free(db: Session, workspace: Workspace, contact: Contact):
+    """Reject edits that would give two contacts the same email or phone"""
+    conditions = []
+    if contact.normalized_email:
+        conditions.append(Contact.normalized_email == contact.normalized_email)
+    if contact.normalized_phone:
+        conditions.append(Contact.normalized_phone == contact.normalized_phone)
+    if not conditions:
+        return
+    
+    clash = db.query(Contact.id).filter(
+        Contact.workspace_id == workspace.id,
+        Contact.id != contact.id,
+        or_(*conditions)
+    ).first()
+    if clash:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Another contact already uses this email or phone ({clash.id})"
+        )
+
+def _page(query, workspace_id: str, cursor: Optional[str], limit: int) -> dict:
+    """One newest-first page of a contacts query, keyed on (created_at, id)"""
+    if cursor:
+        # Compare against the stored timestamp, not a round-tripped copy
+        after = select(Contact.created_at).where(
+            Contact.id == cursor,
+            Contact.workspace_id == workspace_id
+        ).scalar_subquery()
+        query = query.filter(or_(
+            Contact.created_at < after,
+            and_(Contact.created_at == after, Contact.id < cursor)
+        ))
+    
+    contacts = query.order_by(Contact.created_at.desc(), Contact.id.desc()).limit(limit + 1).all()
+    has_more = len(contacts) > limit
+    contacts = contacts[:limit]
+    
+    return {
+        "contacts": [c.to_dict() for c in contacts],
+        "next_cursor": contacts[-1].id if has_more else None
+    }
+
+def _segment_condition(workspace: Workspace, segment: "SegmentDefinition"):
+    try:
+        return compile_segment(workspace.id, segment.dict())
+    except SegmentError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+# Routes
+@router.get("")
+async def get_contacts(
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    tag: Optional[List[str]] = Query(None),
+    source: Optional[str] = None,
+    search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Get contacts, newest first, one page at a time.
+    
+    cursor is the next_cursor of the previous page (the id of its last
+    contact); pages are keyed on (created_at, id), so they stay stable while
+    contacts are added.
+    """
+    
+    query = _filtered(db.query(Contact), workspace.id, tag, source)
+    
+    if search:
+        pattern = f"%{search}%"
+        query = query.filter(or_(
+            Contact.name.ilike(pattern),
+            Contact.email.ilike(pattern),
+            Contact.phone.ilike(pattern)
+        ))
+    
+    return _page(query, workspace.id, cursor, limit)
+
+@router.post("")
+async def create_contact(
+    data: ContactCreate,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Create a contact, or return the one that already has this email/phone"""
+    
+    if not data.email and not data.phone:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either email or phone is required"
+        )
+    
+    contact, created = find_or_create_contact(
+        db, workspace.id, data.name,
+        email=data.email, phone=data.phone, source="manual"
+    )
+    if created:
+        contact.tags = merge_tags(data.tags)
+        contact.custom_fields = data.custom_fields or {}
+    db.commit()
+    db.refresh(contact)
+    
+    return {"created": created, "contact": contact.to_dict()}
+
+@router.post("/import")
+async def import_contacts_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    update_existing: bool = True,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Bulk import contacts from CSV or NDJSON (one JSON object per line).
+    
+    CSV needs a header row; name/email/phone/tags are recognised and any
+    other column goes into custom_fields. Tags are separated by , or ;.
+    Rows matching an existing contact fill in its missing details.
+    """
+    
+    if format is None:
+        format = "ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv"
+    
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    
+    def csv_records():
+        for row in csv.DictReader(text):
+            record = {"custom_fields": {}}
+            for key, value in row.items():
+                if key is None:
+                    continue
+                key = key.strip().lower()
+                if key in ("name", "email", "phone", "tags"):
+                    record[key] = value
+                elif value not in (None, ""):
+                    record["custom_fields"][key] = value
+            yield record
+    
+    def ndjson_records():
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            # Non-objects are reported as skipped rows by import_contacts
+            yield record if isinstance(record, dict) else {}
+    
+    try:
+        result = import_contacts(
+            db, workspace.id,
+            csv_records() if format == "csv" else ndjson_records(),
+            update_existing=update_existing
+        )
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read file: {e}"
+        )
+    finally:
+        text.detach()
+    
+    return result
+
+@router.post("/segment")
+async def query_segment(
+    data: SegmentQuery,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Contacts matching a segment, paged like the contact list.
+    
+    Example - VIPs not contacted in 90 days:
+    {"conditions": [{"field": "tag", "op": "has", "value": "vip"},
+                    {"field": "last_contacted", "op": "not_within_days", "value": 90}]}
+    """
+    
+    segment = SegmentDefinition(match=data.match, conditions=data.conditions)
+    query = db.query(Contact).filter(_segment_condition(workspace, segment))
+    
+    return _page(query, workspace.id, data.cursor, data.limit)
+
+@router.post("/segment/count")
+async def count_segment(
+    data: SegmentDefinition,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Number of contacts matching a segment"""
+    
+    count = db.query(func.count(Contact.id)).filter(_segment_condition(workspace, data)).scalar()
+    
+    return {"count": count}
+
+@router.get("/export")
+async def export_contacts(
+    workspace: Workspace = Depends(get_current_workspace),
+    format: str = Query("csv", pattern=EXPORT_FORMATS),
+    tag: Optional[List[str]] = Query(None)
+):
+    """Stream every matching contact as CSV or NDJSON"""
+    
+    workspace_id = workspace.id
+    
+    def build_query(db: Session):
+        return _filtered(db.query(Contact), workspace_id, tag).order_by(Contact.id)
+    
+    records = (contact.to_dict() for contact in stream_query(build_query))
+    return export_response(stream_records(records, EXPORT_COLUMNS, format), format, "contacts")
+
+@router.get("/{contact_id}")
+async def get_contact(
+    contact_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Get contact details"""
+    
+    return _get_contact(db, workspace, contact_id).to_dict()
+
+@router.patch("/{contact_id}")
+async def update_contact(
+    contact_id: str,
+    data: ContactUpdate,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Update contact"""
+    
+    contact = _get_contact(db, workspace, contact_id)
+    
+    for field, value in data.dict(exclude_unset=True).items():
+        if field == "tags":
+            value = merge_tags(value)
+        setattr(contact, field, value)
+    
+    _check_identity_free(db, workspace, contact)
+    db.commit()
+    db.refresh(contact)
+    
+    return contact.to_dict()
+
+@router.delete("/{contact_id}")
+async def delete_contact(
+    contact_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Delete contact"""
+    
+    contact = _get_contact(db, workspace, contact_id)
+    db.delete(contact)
+    db.commit()
+    
+    return {"message": "Contact deleted successfully"}
@@ -1,15 +1,17 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, or_, select
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Optional
 from app.config import get_db
 from app.dependencies import get_current_workspace
-from app.models.workspace import Workspace
+from app.models.workspace import Workspace, Service
 from app.models.booking import Booking, BookingStatus
-from app.models.contact import Conversation, Message
+from app.models.contact import Contact, Conversation, Message
 from app.models.form import Form, FormSubmission
 from app.models.inventory import InventoryItem
+from app.models.activity import ActivityEvent
+from app.utils.serialization import FastJSONResponse, rows_to_dicts
 
 router = APIRouter()
 
@@ -79,39 +81,34 @@ async def get_dashboard_metrics(
     ).count()
     
     # ============ FORM METRICS ============
-    # Pending forms
-    pending_forms = db.query(FormSubmission).filter(
-        FormSubmission.booking_id != None,
+    # Pending forms (with or without a booking)
+    pending_forms = db.query(func.count(FormSubmission.id)).filter(
+        FormSubmission.workspace_id == workspace.id,
         FormSubmission.completed_at == None
-    ).join(Booking, FormSubmission.booking_id == Booking.id).filter(
-        Booking.workspace_id == workspace.id
-    ).count()
+    ).scalar()
     
     # Overdue forms (sent > 48h ago)
-    overdue_forms = db.query(FormSubmission).filter(
-        FormSubmission.booking_id != None,
+    overdue_forms = db.query(func.count(FormSubmission.id)).filter(
+        FormSubmission.workspace_id == workspace.id,
         FormSubmission.completed_at == None,
         FormSubmission.sent_at < now - timedelta(hours=48)
-    ).join(Booking, FormSubmission.booking_id == Booking.id).filter(
-        Booking.workspace_id == workspace.id
-    ).count()
+    ).scalar()
     
     # Completed forms (last 30 days)
-    completed_forms = db.query(FormSubmission).filter(
-        FormSubmission.completed_at != None,
+    completed_forms = db.query(func.count(FormSubmission.id)).filter(
+        FormSubmission.workspace_id == workspace.id,
         FormSubmission.completed_at >= now - timedelta(days=30)
-    ).join(Booking, FormSubmission.booking_id == Booking.id).filter(
-        Booking.workspace_id == workspace.id
-    ).count()
+    ).scalar()
     
     # ============ INVENTORY METRICS ============
     # Low stock items
+    # Projected stock already accounts for supplies held by upcoming bookings
     low_stock_items = db.query(InventoryItem).filter(
         InventoryItem.workspace_id == workspace.id,
-        InventoryItem.quantity <= InventoryItem.threshold
+        InventoryItem.projected_quantity <= InventoryItem.threshold
     ).all()
     
-    critical_items = [item for item in low_stock_items if item.quantity == 0]
+    critical_items = [item for item in low_stock_items if item.projected_quantity <= 0]
     
     # ============ ALERTS ============
     alerts = []
@@ -166,9 +163,9 @@ async def get_dashboard_metrics(
         alerts.append({
             "id": f"alert-inventory-{item.id}",
             "type": "low_stock",
-            "severity": "critical" if item.quantity == 0 else "warning",
+            "severity": "critical" if item.projected_quantity <= 0 else "warning",
             "title": f"Low stock: {item.name}",
-            "description": f"{item.quantity} {item.unit} left (threshold: {item.threshold})",
+            "description": f"{item.quantity} {item.unit} left, {item.projected_quantity} after upcoming bookings (threshold: {item.threshold})",
             "action_url": f"/inventory/{item.id}",
             "action_label": "Reorder Now",
             "timestamp": now.isoformat()
@@ -207,6 +204,7 @@ async def get_dashboard_metrics(
                     "id": item.id,
                     "name": item.name,
                     "quantity": item.quantity,
+                    "projected_quantity": item.projected_quantity,
                     "threshold": item.threshold,
                     "unit": item.unit,
                     "sku": item.sku
@@ -225,94 +223,52 @@ async def get_upcoming_bookings(
 ):
     """Get upcoming bookings for dashboard"""
     
-    bookings = db.query(Booking).filter(
+    # One joined, column-only query instead of lazy-loading contact and service per booking
+    rows = db.query(
+        Booking.id,
+        func.coalesce(Contact.name, "Unknown").label("customer_name"),
+        Contact.email.label("customer_email"),
+        func.coalesce(Service.name, "General").label("service_name"),
+        Service.duration.label("service_duration"),
+        Booking.start_time,
+        Booking.end_time,
+        Booking.status,
+        Booking.confirmation_sent,
+        Booking.reminder_sent
+    ).outerjoin(Contact, Booking.contact_id == Contact.id).outerjoin(
+        Service, Booking.service_id == Service.id
+    ).filter(
         Booking.workspace_id == workspace.id,
         Booking.start_time > datetime.utcnow(),
         Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING])
-    ).order_by(Booking.start_time.asc()).limit(limit).all()
+    ).order_by(Booking.start_time.asc()).limit(limit)
     
-    return [
-        {
-            "id": b.id,
-            "customer_name": b.contact.name if b.contact else "Unknown",
-            "customer_email": b.contact.email if b.contact else None,
-            "service_name": b.service.name if b.service else "General",
-            "service_duration": b.service.duration if b.service else None,
-            "start_time": b.start_time.isoformat(),
-            "end_time": b.end_time.isoformat(),
-            "status": b.status.value,
-            "confirmation_sent": b.confirmation_sent,
-            "reminder_sent": b.reminder_sent
-        }
-        for b in bookings
-    ]
+    return FastJSONResponse(rows_to_dicts(rows))
 
 @router.get("/activity/recent")
 async def get_recent_activity(
     workspace: Workspace = Depends(get_current_workspace),
     db: Session = Depends(get_db),
-    limit: int = 20
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
 ):
-    """Get recent activity feed"""
-    
-    activities = []
-    
-    # Recent bookings (last 7 days)
-    recent_bookings = db.query(Booking).filter(
-        Booking.workspace_id == workspace.id,
-        Booking.created_at >= datetime.utcnow() - timedelta(days=7)
-    ).order_by(Booking.created_at.desc()).limit(10).all()
-    
-    for booking in recent_bookings:
-        activities.append({
-            "id": f"booking-{booking.id}",
-            "type": "booking",
-            "action": "created",
-            "title": f"New booking: {booking.service.name if booking.service else 'Service'}",
-            "description": f"{booking.contact.name if booking.contact else 'Customer'} - {booking.start_time.strftime('%b %d, %I:%M %p')}",
-            "timestamp": booking.created_at.isoformat(),
-            "status": booking.status.value,
-            "url": f"/bookings/{booking.id}"
-        })
+    """Get recent activity feed, newest first.
     
-    # Recent messages
-    recent_messages = db.query(Message).join(Conversation).filter(
-        Conversation.workspace_id == workspace.id,
-        Message.created_at >= datetime.utcnow() - timedelta(days=3)
-    ).order_by(Message.created_at.desc()).limit(10).all()
-    
-    for msg in recent_messages:
-        activities.append({
-            "id": f"message-{msg.id}",
-            "type": "message",
-            "action": "received" if msg.direction == "inbound" else "sent",
-            "title": f"Message from {msg.conversation.contact.name if msg.conversation.contact else 'Customer'}",
-            "description": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content,
-            "timestamp": msg.created_at.isoformat(),
-            "direction": msg.direction,
-            "automated": msg.automated,
-            "url": f"/inbox/{msg.conversation_id}"
-        })
-    
-    # Recent form submissions
-    recent_submissions = db.query(FormSubmission).join(Booking).filter(
-        Booking.workspace_id == workspace.id,
-        FormSubmission.completed_at != None,
-        FormSubmission.completed_at >= datetime.utcnow() - timedelta(days=7)
-    ).order_by(FormSubmission.completed_at.desc()).limit(10).all()
-    
-    for sub in recent_submissions:
-        activities.append({
-            "id": f"form-{sub.id}",
-            "type": "form_submission",
-            "action": "completed",
-            "title": f"Form completed: {sub.form.name if sub.form else 'Form'}",
-            "description": f"Submitted by {sub.contact.name if sub.contact else 'Customer'}",
-            "timestamp": sub.completed_at.isoformat(),
-            "url": f"/forms/submissions/{sub.id}"
-        })
+    cursor is the id of the last activity already shown; the next page
+    starts right after it.
+    """
     
-    # Sort by timestamp, newest first
-    activities.sort(key=lambda x: x["timestamp"], reverse=True)
+    query = db.query(ActivityEvent).filter(ActivityEvent.workspace_id == workspace.id)
+    if cursor:
+        # Compare against the stored timestamp, not a round-tripped copy
+        after = select(ActivityEvent.created_at).where(
+            ActivityEvent.id == cursor,
+            ActivityEvent.workspace_id == workspace.id
+        ).scalar_subquery()
+        query = query.filter(or_(
+            ActivityEvent.created_at < after,
+            and_(ActivityEvent.created_at == after, ActivityEvent.id < cursor)
+        ))
     
-    return activities[:limit]
\ No newline at end of file
+    events = query.order_by(ActivityEvent.created_at.desc(), ActivityEvent.id.desc()).limit(limit).all()
+    return [e.to_dict() for e in events]
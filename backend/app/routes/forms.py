@@ -1,6 +1,6 @@
 from ast import Import
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
@@ -14,9 +14,46 @@ from app.models.booking import Booking
 from app.models.contact import Contact
 from app.models.user import User  
 from app.services.email import send_email
+from app.services.response_cache import cached_response
+from app.services.exports import (
+    stream_query, stream_records, export_response, form_columns, flatten_submission, field_key, EXPORT_FORMATS
+)
+from app.services.form_analytics import form_analytics
+from app.services.form_dispatch import dispatch_booking_forms, MAX_DISPATCH_BOOKINGS
+from app.services.form_validation import compile_form_fields, FormSchemaError
+from app.utils.serialization import rows_to_dicts, parse_fields
 
 router = APIRouter()
 
+def _check_fields(fields: list):
+    """Reject validation rules that can't be compiled (bad regex, date bounds)"""
+    try:
+        compile_form_fields(fields)
+    except FormSchemaError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+# Leading export columns; each form field follows as its own column
+SUBMISSION_EXPORT_COLUMNS = {
+    "id": FormSubmission.id,
+    "booking_id": FormSubmission.booking_id,
+    "contact_id": FormSubmission.contact_id,
+    "contact_name": Contact.name.label("contact_name"),
+    "contact_email": Contact.email.label("contact_email"),
+    "sent_at": FormSubmission.sent_at,
+    "completed_at": FormSubmission.completed_at,
+}
+
+# What Form.to_dict() exposes; ?fields= on the list picks a subset, e.g. to skip
+# the fields/settings JSON when only names are shown
+FORM_COLUMNS = {column.key: column for column in (
+    Form.id, Form.name, Form.description, Form.form_type, Form.fields, Form.settings,
+    Form.is_active, Form.require_before_booking, Form.service_id, Form.workspace_id,
+    Form.created_at, Form.updated_at
+)}
+
 # Pydantic models
 class FormField(BaseModel):
     id: str
@@ -25,6 +62,7 @@ class FormField(BaseModel):
     required: bool = False
     placeholder: Optional[str] = None
     options: Optional[List[str]] = None
+    validation_rules: Optional[dict] = None  # see services/form_validation.py
 
 class FormCreate(BaseModel):
     name: str
@@ -47,35 +85,48 @@ class FormSubmissionSend(BaseModel):
     booking_id: str
     contact_id: str
 
+class FormBulkSend(BaseModel):
+    booking_ids: List[str]
+    form_ids: Optional[List[str]] = None  # default: each booking's required forms
+    resend_pending: bool = False
+
 # Routes
 @router.get("")
 async def get_forms(
+    request: Request,
     workspace: Workspace = Depends(get_current_workspace),
     db: Session = Depends(get_db),
     service_id: Optional[str] = None,
     is_active: Optional[bool] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[str] = None
 ):
-    """Get all forms"""
-    
-    query = db.query(Form).filter(
-        Form.workspace_id == workspace.id
-    )
-    
-    if service_id:
-        query = query.filter(Form.service_id == service_id)
+    """Get all forms; fields=name,is_active,... returns only those columns (plus id)"""
     
-    if is_active is not None:
-        query = query.filter(Form.is_active == is_active)
+    selected = parse_fields(fields, FORM_COLUMNS)
+    columns = [FORM_COLUMNS[name] for name in selected] if selected else FORM_COLUMNS.values()
     
-    total = query.count()
-    forms = query.order_by(Form.created_at.desc()).offset(offset).limit(limit).all()
+    def build():
+        query = db.query(Form).filter(
+            Form.workspace_id == workspace.id
+        )
+        
+        if service_id:
+            query = query.filter(Form.service_id == service_id)
+        
+        if is_active is not None:
+            query = query.filter(Form.is_active == is_active)
+        
+        total = query.count()
+        forms = query.with_entities(*columns).order_by(Form.created_at.desc()).offset(offset).limit(limit)
+        
+        return {
+            "total": total,
+            "forms": rows_to_dicts(forms)
+        }
     
-    return {
-        "total": total,
-        "forms": [form.to_dict() for form in forms]
-    }
+    return cached_response(request, db, workspace.id, ["forms"], build)
 
 @router.post("")
 async def create_form(
@@ -101,6 +152,7 @@ async def create_form(
     
     # Convert fields to dict
     fields_dict = [field.dict() for field in data.fields]
+    _check_fields(fields_dict)
     
     form = Form(
         workspace_id=workspace.id,
@@ -122,26 +174,94 @@ async def create_form(
         "form": form.to_dict()
     }
 
-@router.get("/{form_id}")
-async def get_form(
-    form_id: str,
+# Declared before /{form_id}, which would otherwise match "submissions"
+@router.get("/submissions")
+async def get_form_submissions(
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    form_id: Optional[str] = None,
+    booking_id: Optional[str] = None,
+    contact_id: Optional[str] = None,
+    completed: Optional[bool] = None,
+    limit: int = 50,
+    offset: int = 0
+):
+    """Get form submissions"""
+    
+    query = db.query(FormSubmission).filter(
+        FormSubmission.workspace_id == workspace.id
+    )
+    
+    if form_id:
+        query = query.filter(FormSubmission.form_id == form_id)
+    
+    if booking_id:
+        query = query.filter(FormSubmission.booking_id == booking_id)
+    
+    if contact_id:
+        query = query.filter(FormSubmission.contact_id == contact_id)
+    
+    if completed is not None:
+        if completed:
+            query = query.filter(FormSubmission.completed_at != None)
+        else:
+            query = query.filter(FormSubmission.completed_at == None)
+    
+    total = query.count()
+    submissions = query.order_by(
+        FormSubmission.sent_at.desc()
+    ).offset(offset).limit(limit).all()
+    
+    return {
+        "total": total,
+        "submissions": [s.to_dict() for s in submissions]
+    }
+
+@router.get("/submissions/{submission_id}")
+async def get_form_submission(
+    submission_id: str,
     workspace: Workspace = Depends(get_current_workspace),
     db: Session = Depends(get_db)
 ):
-    """Get single form"""
+    """Get single form submission"""
     
-    form = db.query(Form).filter(
-        Form.id == form_id,
-        Form.workspace_id == workspace.id
+    submission = db.query(FormSubmission).filter(
+        FormSubmission.id == submission_id,
+        FormSubmission.workspace_id == workspace.id
     ).first()
     
-    if not form:
+    if not submission:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Form not found"
+            detail="Form submission not found"
         )
     
-    return form.to_dict()
+    return submission.to_dict()
+
+@router.get("/{form_id}")
+async def get_form(
+    form_id: str,
+    request: Request,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Get single form"""
+    
+    def build():
+        form = db.query(Form).filter(
+            Form.id == form_id,
+            Form.workspace_id == workspace.id
+        ).first()
+        
+        if not form:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Form not found"
+            )
+        
+        return form.to_dict()
+    
+    return cached_response(request, db, workspace.id, ["forms"], build)
 
 @router.patch("/{form_id}")
 async def update_form(
@@ -169,6 +289,7 @@ async def update_form(
     
     if 'fields' in update_data:
         update_data['fields'] = [field.dict() for field in data.fields]
+        _check_fields(update_data['fields'])
     
     for field, value in update_data.items():
         setattr(form, field, value)
@@ -210,6 +331,59 @@ async def delete_form(
         "message": f"Form '{form.name}' deleted successfully"
     }
 
+@router.post("/send")
+async def send_forms_bulk(
+    data: FormBulkSend,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Send forms for many bookings, one email per contact.
+    
+    Submissions that already exist are reused (and re-emailed with
+    resend_pending); the missing ones are created in one insert.
+    """
+    
+    booking_ids = list(dict.fromkeys(data.booking_ids))
+    if len(booking_ids) > MAX_DISPATCH_BOOKINGS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_DISPATCH_BOOKINGS} bookings per request"
+        )
+    
+    forms = None
+    if data.form_ids is not None:
+        form_ids = list(dict.fromkeys(data.form_ids))
+        forms = db.query(Form).filter(
+            Form.id.in_(form_ids),
+            Form.workspace_id == workspace.id,
+            Form.is_active == True
+        ).all() if form_ids else []
+        missing = set(form_ids) - {form.id for form in forms}
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Forms not found or inactive: {', '.join(sorted(missing))}"
+            )
+    
+    bookings = db.query(Booking).options(selectinload(Booking.contact)).filter(
+        Booking.id.in_(booking_ids),
+        Booking.workspace_id == workspace.id
+    ).order_by(Booking.start_time).all() if booking_ids else []
+    found = {booking.id for booking in bookings}
+    
+    result = await dispatch_booking_forms(
+        db, workspace, bookings,
+        workspace.settings.get('public_url', 'http://localhost:3000'),
+        forms=forms,
+        resend_pending=data.resend_pending
+    )
+    
+    return {
+        "status": "success",
+        **result,
+        "not_found_booking_ids": [booking_id for booking_id in booking_ids if booking_id not in found]
+    }
+
 @router.post("/{form_id}/send")
 async def send_form(
     form_id: str,
@@ -264,6 +438,7 @@ async def send_form(
     
     # Create submission record
     submission = FormSubmission(
+        workspace_id=workspace.id,
         form_id=form.id,
         booking_id=booking.id,
         contact_id=contact.id,
@@ -307,65 +482,80 @@ async def send_form(
         "form_link": form_link
     }
 
-@router.get("/submissions")
-async def get_form_submissions(
+@router.get("/{form_id}/analytics")
+async def get_form_analytics(
+    form_id: str,
     workspace: Workspace = Depends(get_current_workspace),
-    db: Session = Depends(get_db),
-    form_id: Optional[str] = None,
-    booking_id: Optional[str] = None,
-    contact_id: Optional[str] = None,
-    completed: Optional[bool] = None,
-    limit: int = 50,
-    offset: int = 0
+    db: Session = Depends(get_db)
 ):
-    """Get form submissions"""
+    """Completion rate, average time to complete and option counts of choice fields"""
     
-    query = db.query(FormSubmission).join(Form).filter(
+    form = db.query(Form).filter(
+        Form.id == form_id,
         Form.workspace_id == workspace.id
-    )
-    
-    if form_id:
-        query = query.filter(FormSubmission.form_id == form_id)
-    
-    if booking_id:
-        query = query.filter(FormSubmission.booking_id == booking_id)
-    
-    if contact_id:
-        query = query.filter(FormSubmission.contact_id == contact_id)
-    
-    if completed is not None:
-        if completed:
-            query = query.filter(FormSubmission.completed_at != None)
-        else:
-            query = query.filter(FormSubmission.completed_at == None)
+    ).first()
     
-    total = query.count()
-    submissions = query.order_by(
-        FormSubmission.sent_at.desc()
-    ).offset(offset).limit(limit).all()
+    if not form:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Form not found"
+        )
     
-    return {
-        "total": total,
-        "submissions": [s.to_dict() for s in submissions]
-    }
+    # Served from form_stats / form_field_counts, kept current as submissions arrive
+    return form_analytics(db, form)
 
-@router.get("/submissions/{submission_id}")
-async def get_form_submission(
-    submission_id: str,
+@router.get("/{form_id}/submissions/export")
+async def export_form_submissions(
+    form_id: str,
     workspace: Workspace = Depends(get_current_workspace),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    format: str = Query("csv", pattern=EXPORT_FORMATS),
+    completed: Optional[bool] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
 ):
-    """Get single form submission"""
+    """Stream a form's submissions as CSV or NDJSON, one column per form field.
     
-    submission = db.query(FormSubmission).join(Form).filter(
-        FormSubmission.id == submission_id,
+    start_date / end_date bound sent_at; CSV headers use the field labels,
+    NDJSON keys are field.<field id>.
+    """
+    
+    form = db.query(Form).filter(
+        Form.id == form_id,
         Form.workspace_id == workspace.id
     ).first()
     
-    if not submission:
+    if not form:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Form submission not found"
+            detail="Form not found"
         )
     
-    return submission.to_dict()
\ No newline at end of file
+    field_columns = form_columns(form.fields)
+    field_ids = [key for key, _ in field_columns]
+    columns = list(SUBMISSION_EXPORT_COLUMNS) + [field_key(field_id) for field_id in field_ids]
+    headers = list(SUBMISSION_EXPORT_COLUMNS) + [label for _, label in field_columns]
+    
+    def build_query(db: Session):
+        query = db.query(
+            *SUBMISSION_EXPORT_COLUMNS.values(), FormSubmission.data
+        ).outerjoin(Contact, FormSubmission.contact_id == Contact.id).filter(
+            FormSubmission.form_id == form_id
+        )
+        if completed is not None:
+            query = query.filter(
+                FormSubmission.completed_at != None if completed else FormSubmission.completed_at == None
+            )
+        if start_date:
+            query = query.filter(FormSubmission.sent_at >= start_date)
+        if end_date:
+            query = query.filter(FormSubmission.sent_at <= end_date)
+        return query.order_by(FormSubmission.sent_at, FormSubmission.id)
+    
+    def records():
+        for row in stream_query(build_query):
+            record = dict(row._mapping)
+            record.update(flatten_submission(record.pop("data"), field_ids))
+            yield record
+    
+    return export_response(stream_records(records(), columns, format, headers), format, f"form-{form_id}-submissions")
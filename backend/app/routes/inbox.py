@@ -1,23 +1,79 @@
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status, BackgroundTasks
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, and_, func, select
 from datetime import datetime
 from typing import Optional, List, Dict
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 import json
 
 from app.config import get_db
 from app.dependencies import get_current_workspace, get_current_user
 from app.models.workspace import Workspace
 from app.models.user import User
-from app.models.contact import Contact, Conversation, Message
+from app.models.contact import Contact, Conversation, Message, Broadcast
 from app.models.booking import Booking
 from app.services.automation import AutomationService
 from app.services.email import send_email
 from app.services.sms import send_sms
+from app.services.contacts import find_or_create_contact
+from app.services.segments import compile_segment, SegmentError
+from app.services.broadcasts import create_broadcast, run_broadcast
+from app.services.response_times import response_time_stats, record_first_response
+from app.services.archive import load_conversation_messages, archived_last_messages, ARCHIVABLE_STATUSES
+from app.routes.contacts import SegmentDefinition
+from app.utils.serialization import parse_fields
 
 router = APIRouter()
 
+# Characters of the last message shown in the conversation list, cut in SQL
+MESSAGE_PREVIEW_LENGTH = 160
+
+CONVERSATION_LIST_FIELDS = (
+    "contact", "subject", "status", "message_count", "awaiting_reply",
+    "last_message", "assigned_to", "created_at", "updated_at"
+)
+
+def _last_message_previews(db: Session, conversation_ids: List[str]) -> Dict[str, dict]:
+    """Newest message per conversation with its content truncated, in one query"""
+    if not conversation_ids:
+        return {}
+    ranked = select(
+        Message.id,
+        Message.conversation_id,
+        func.substr(Message.content, 1, MESSAGE_PREVIEW_LENGTH).label("content"),
+        (func.length(Message.content) > MESSAGE_PREVIEW_LENGTH).label("content_truncated"),
+        Message.channel,
+        Message.direction,
+        Message.status,
+        Message.automated,
+        Message.broadcast_id,
+        Message.created_at,
+        func.row_number().over(
+            partition_by=Message.conversation_id,
+            order_by=(Message.created_at.desc(), Message.id.desc())
+        ).label("position")
+    ).where(Message.conversation_id.in_(conversation_ids)).subquery()
+    
+    previews = {}
+    for row in db.execute(select(ranked).where(ranked.c.position == 1)):
+        preview = dict(row._mapping)
+        del preview["position"]
+        preview["content_truncated"] = bool(preview["content_truncated"])
+        previews[row.conversation_id] = preview
+    return previews
+
+def _archived_preview(message: Optional[dict]) -> Optional[dict]:
+    """The same preview for a message kept in the archive (its stored copy is complete)"""
+    if not message:
+        return None
+    content = message.get("content") or ""
+    preview = {key: message.get(key) for key in (
+        "id", "conversation_id", "channel", "direction", "status", "automated", "broadcast_id", "created_at"
+    )}
+    preview["content"] = content[:MESSAGE_PREVIEW_LENGTH]
+    preview["content_truncated"] = len(content) > MESSAGE_PREVIEW_LENGTH
+    return preview
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
@@ -63,6 +119,12 @@ class ConversationUpdate(BaseModel):
     status: Optional[str] = None
     assigned_to_id: Optional[str] = None
 
+class BroadcastCreate(BaseModel):
+    channel: str = Field(..., pattern="^(email|sms)$")
+    content: str = Field(..., min_length=1)
+    subject: Optional[str] = None
+    segment: SegmentDefinition
+
 # Routes
 @router.websocket("/ws/{workspace_id}")
 async def websocket_endpoint(
@@ -91,10 +153,17 @@ async def get_conversations(
     filter: Optional[str] = None,
     search: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    fields: Optional[str] = None
 ):
-    """Get all conversations for workspace"""
+    """Get all conversations for workspace.
+    
+    last_message is a preview (content cut to MESSAGE_PREVIEW_LENGTH, no
+    metadata); fields=subject,last_message,... returns only those (plus id)
+    and skips loading the rest.
+    """
     
+    selected = parse_fields(fields, CONVERSATION_LIST_FIELDS) or ["id", *CONVERSATION_LIST_FIELDS]
     query = db.query(Conversation).filter(
         Conversation.workspace_id == workspace.id
     )
@@ -123,28 +192,40 @@ async def get_conversations(
         )
     
     total = query.count()
+    if "contact" in selected:
+        query = query.options(selectinload(Conversation.contact))
+    if "assigned_to" in selected:
+        query = query.options(selectinload(Conversation.assigned_to))
     conversations = query.order_by(
         Conversation.last_message_at.desc().nullslast()
     ).offset(offset).limit(limit).all()
     
+    previews, archived = {}, {}
+    if "last_message" in selected:
+        previews = _last_message_previews(db, [conv.id for conv in conversations])
+        # Conversations with nothing left in messages preview their archive
+        archived = archived_last_messages(db, [
+            conv.id for conv in conversations if conv.status in ARCHIVABLE_STATUSES and conv.id not in previews
+        ])
+    
     result = []
     for conv in conversations:
-        last_message = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).order_by(Message.created_at.desc()).first()
-        
-        result.append({
+        item = {
             "id": conv.id,
-            "contact": conv.contact.to_dict() if conv.contact else None,
             "subject": conv.subject,
             "status": conv.status,
             "message_count": conv.message_count,
             "awaiting_reply": conv.awaiting_reply,
-            "last_message": last_message.to_dict() if last_message else None,
-            "assigned_to": conv.assigned_to.to_dict() if conv.assigned_to else None,
             "created_at": conv.created_at.isoformat() if conv.created_at else None,
             "updated_at": conv.updated_at.isoformat() if conv.updated_at else None
-        })
+        }
+        if "contact" in selected:
+            item["contact"] = conv.contact.to_dict() if conv.contact else None
+        if "assigned_to" in selected:
+            item["assigned_to"] = conv.assigned_to.to_dict() if conv.assigned_to else None
+        if "last_message" in selected:
+            item["last_message"] = previews.get(conv.id) or _archived_preview(archived.get(conv.id))
+        result.append({name: item[name] for name in selected})
     
     return {
         "total": total,
@@ -170,9 +251,8 @@ async def get_conversation(
             detail="Conversation not found"
         )
     
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation.id
-    ).order_by(Message.created_at.asc()).all()
+    # Older messages may have been moved to the archive
+    messages = load_conversation_messages(db, conversation.id)
     
     # Mark as not awaiting reply if it was
     if conversation.awaiting_reply:
@@ -184,7 +264,7 @@ async def get_conversation(
         "contact": conversation.contact.to_dict() if conversation.contact else None,
         "subject": conversation.subject,
         "status": conversation.status,
-        "messages": [m.to_dict() for m in messages],
+        "messages": messages,
         "assigned_to": conversation.assigned_to.to_dict() if conversation.assigned_to else None,
         "created_at": conversation.created_at.isoformat() if conversation.created_at else None,
         "updated_at": conversation.updated_at.isoformat() if conversation.updated_at else None
@@ -219,13 +299,15 @@ async def reply_to_conversation(
         direction="outbound",
         automated=False,
         status="sent",
-        message_metadata={"replied_by": current_user.id}
+        message_message_metadata={"replied_by": current_user.id}
     )
     db.add(message)
     
     # Update conversation
+    now = datetime.utcnow()
+    record_first_response(db, conversation, current_user.id, now)
     conversation.message_count += 1
-    conversation.last_message_at = datetime.utcnow()
+    conversation.last_message_at = now
     conversation.last_message_direction = "outbound"
     conversation.awaiting_reply = False
     
@@ -367,29 +449,11 @@ async def send_message(
     """Send a new message (create conversation if needed)"""
     
     # Find or create contact
-    contact = None
-    if data.contact_email:
-        contact = db.query(Contact).filter(
-            Contact.workspace_id == workspace.id,
-            Contact.email == data.contact_email
-        ).first()
-    elif data.contact_phone:
-        contact = db.query(Contact).filter(
-            Contact.workspace_id == workspace.id,
-            Contact.phone == data.contact_phone
-        ).first()
-    
-    if not contact:
-        contact_name = data.contact_name or data.contact_email or data.contact_phone or "Customer"
-        contact = Contact(
-            workspace_id=workspace.id,
-            name=contact_name,
-            email=data.contact_email,
-            phone=data.contact_phone,
-            source="manual"
-        )
-        db.add(contact)
-        db.flush()
+    contact_name = data.contact_name or data.contact_email or data.contact_phone or "Customer"
+    contact, _ = find_or_create_contact(
+        db, workspace.id, contact_name,
+        email=data.contact_email, phone=data.contact_phone, source="manual"
+    )
     
     # Find or create conversation
     conversation = db.query(Conversation).filter(
@@ -416,13 +480,15 @@ async def send_message(
         direction="outbound",
         automated=False,
         status="sent",
-        message_metadata={"sent_by": current_user.id}
+        message_message_metadata={"sent_by": current_user.id}
     )
     db.add(message)
     
     # Update conversation
+    now = datetime.utcnow()
+    record_first_response(db, conversation, current_user.id, now)
     conversation.message_count += 1
-    conversation.last_message_at = datetime.utcnow()
+    conversation.last_message_at = now
     conversation.last_message_direction = "outbound"
     conversation.awaiting_reply = False
     if not conversation.assigned_to_id:
@@ -451,16 +517,91 @@ async def send_message(
         "message_id": message.id,
         "conversation_id": conversation.id,
         "contact_id": contact.id,
-        "message": message.to_dict(),
-        "message_metadata": message.message_metadata
+        "message": message.to_dict()
     }
 
+@router.post("/broadcasts")
+async def create_broadcast_route(
+    data: BroadcastCreate,
+    background_tasks: BackgroundTasks,
+    workspace: Workspace = Depends(get_current_workspace),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Send one message to every reachable contact in a segment.
+    
+    Messages are queued immediately; delivery runs in the background and
+    can be followed on GET /broadcasts/{id}.
+    """
+    
+    segment = data.segment.dict()
+    try:
+        condition = compile_segment(workspace.id, segment)
+    except SegmentError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    broadcast = create_broadcast(
+        db, workspace.id, current_user.id,
+        channel=data.channel,
+        subject=data.subject,
+        content=data.content,
+        segment=segment,
+        condition=condition
+    )
+    db.commit()
+    db.refresh(broadcast)
+    
+    if broadcast.status == "queued":
+        background_tasks.add_task(run_broadcast, broadcast.id)
+    
+    return broadcast.to_dict()
+
+@router.get("/broadcasts")
+async def get_broadcasts(
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    limit: int = 20
+):
+    """Get recent broadcasts with their progress"""
+    
+    broadcasts = db.query(Broadcast).filter(
+        Broadcast.workspace_id == workspace.id
+    ).order_by(Broadcast.created_at.desc()).limit(min(limit, 100)).all()
+    
+    return [b.to_dict() for b in broadcasts]
+
+@router.get("/broadcasts/{broadcast_id}")
+async def get_broadcast(
+    broadcast_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Get broadcast progress"""
+    
+    broadcast = db.query(Broadcast).filter(
+        Broadcast.id == broadcast_id,
+        Broadcast.workspace_id == workspace.id
+    ).first()
+    
+    if not broadcast:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Broadcast not found"
+        )
+    
+    return broadcast.to_dict()
+
 @router.get("/stats")
 async def get_inbox_stats(
+    days: int = Query(30, ge=1, le=365),
+    user_id: Optional[str] = None,
     workspace: Workspace = Depends(get_current_workspace),
     db: Session = Depends(get_db)
 ):
-    """Get inbox statistics"""
+    """Get inbox statistics; response times cover the last `days` days, optionally for one user"""
     
     now = datetime.utcnow()
     
@@ -490,7 +631,8 @@ async def get_inbox_stats(
         Message.created_at >= now.replace(hour=0, minute=0, second=0, microsecond=0)
     ).count()
     
-    avg_response_time = None  # TODO: Calculate average response time
+    # Read from the daily rollups, not recomputed from messages
+    response_time = response_time_stats(db, workspace.id, days, user_id)
     
     return {
         "total_conversations": total_conversations,
@@ -498,5 +640,6 @@ async def get_inbox_stats(
         "awaiting_reply": awaiting_reply,
         "unassigned": unassigned,
         "messages_today": messages_today,
-        "avg_response_time": avg_response_time
+        "avg_response_time": response_time["avg_seconds"],
+        "response_time": response_time
     }
\ No newline at end of file
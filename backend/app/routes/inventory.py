@@ -6,11 +6,15 @@ from pydantic import BaseModel
 
 from app.config import get_db
 from app.dependencies import get_current_workspace, get_current_admin
-from app.models.workspace import Workspace
-from app.models.inventory import InventoryItem, InventoryUsage
+from app.models.workspace import Workspace, Service
+from app.models.inventory import InventoryItem, InventoryUsage, ServiceSupply
 from app.models.booking import Booking
 from app.models.user import User  # ← CRITICAL IMPORT
 from app.services.automation import AutomationService
+from app.services.inventory_analytics import get_usage_analytics
+from app.services.reservations import (
+    sync_booking_reservations, resync_service_reservations, get_upcoming_reservations
+)
 
 router = APIRouter()
 
@@ -49,6 +53,13 @@ class InventoryAdjustment(BaseModel):
     adjustment: int
     reason: str
 
+class ServiceSupplyItem(BaseModel):
+    inventory_id: str
+    quantity_per_booking: int
+
+class ServiceSuppliesUpdate(BaseModel):
+    supplies: List[ServiceSupplyItem]
+
 @router.get("")
 async def get_inventory_items(
     workspace: Workspace = Depends(get_current_workspace),
@@ -65,7 +76,7 @@ async def get_inventory_items(
     )
     
     if low_stock_only:
-        query = query.filter(InventoryItem.quantity <= InventoryItem.threshold)
+        query = query.filter(InventoryItem.projected_quantity <= InventoryItem.threshold)
     
     if search:
         query = query.filter(
@@ -154,6 +165,7 @@ async def get_inventory_item(
     
     result = item.to_dict()
     result["usage_history"] = [u.to_dict() for u in usage]
+    result["reservations"] = [r.to_dict() for r in get_upcoming_reservations(db, item.id)]
     
     return result
 
@@ -184,7 +196,7 @@ async def update_inventory_item(
         setattr(item, field, value)
     
     # Reset alert flag if quantity increased above threshold
-    if data.quantity is not None and item.quantity > item.threshold:
+    if data.quantity is not None and item.projected_quantity > item.threshold:
         item.low_stock_alert_sent = False
     
     item.updated_at = datetime.utcnow()
@@ -222,7 +234,7 @@ async def adjust_inventory(
     item.updated_at = datetime.utcnow()
     
     # Reset alert flag if quantity increased above threshold
-    if item.quantity > item.threshold:
+    if item.projected_quantity > item.threshold:
         item.low_stock_alert_sent = False
     
     db.commit()
@@ -286,8 +298,12 @@ async def record_usage(
     item.quantity -= data.quantity_used
     item.updated_at = datetime.utcnow()
     
+    # Usage against a booking consumes what that booking had reserved
+    sync_booking_reservations(db, booking)
+    
     db.commit()
     db.refresh(usage)
+    db.refresh(item)
     
     return {
         "status": "success",
@@ -333,10 +349,141 @@ async def get_low_stock_alerts(
     
     items = db.query(InventoryItem).filter(
         InventoryItem.workspace_id == workspace.id,
-        InventoryItem.quantity <= InventoryItem.threshold
+        InventoryItem.projected_quantity <= InventoryItem.threshold
     ).all()
     
     return {
         "count": len(items),
         "items": [item.to_dict() for item in items]
-    }
\ No newline at end of file
+    }
+
+@router.get("/analytics/usage")
+async def get_inventory_usage_analytics(
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    window_days: int = 30,
+    lead_time_days: int = 7,
+    coverage_days: int = 30
+):
+    """Get consumption rates, stockout forecast and reorder suggestions"""
+    
+    if window_days < 1 or lead_time_days < 0 or coverage_days < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="window_days must be positive and lead/coverage days non-negative"
+        )
+    
+    return get_usage_analytics(
+        db,
+        workspace.id,
+        window_days=window_days,
+        lead_time_days=lead_time_days,
+        coverage_days=coverage_days
+    )
+
+
+@router.get("/supplies/{service_id}")
+async def get_service_supplies(
+    service_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Get the bill of materials for a service"""
+    
+    service = db.query(Service).filter(
+        Service.id == service_id,
+        Service.workspace_id == workspace.id
+    ).first()
+    
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    supplies = db.query(ServiceSupply).filter(
+        ServiceSupply.service_id == service.id
+    ).all()
+    
+    return {
+        "service_id": service.id,
+        "supplies": [s.to_dict() for s in supplies]
+    }
+
+@router.put("/supplies/{service_id}")
+async def set_service_supplies(
+    service_id: str,
+    data: ServiceSuppliesUpdate,
+    workspace: Workspace = Depends(get_current_workspace),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Replace the bill of materials for a service"""
+    
+    service = db.query(Service).filter(
+        Service.id == service_id,
+        Service.workspace_id == workspace.id
+    ).first()
+    
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    wanted = {}
+    for supply in data.supplies:
+        if supply.quantity_per_booking < 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="quantity_per_booking cannot be negative"
+            )
+        wanted[supply.inventory_id] = supply.quantity_per_booking
+    
+    if wanted:
+        found = db.query(InventoryItem.id).filter(
+            InventoryItem.id.in_(list(wanted)),
+            InventoryItem.workspace_id == workspace.id
+        ).all()
+        missing = set(wanted) - {row.id for row in found}
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Inventory item not found: {', '.join(sorted(missing))}"
+            )
+    
+    existing = {
+        s.inventory_id: s
+        for s in db.query(ServiceSupply).filter(ServiceSupply.service_id == service.id).all()
+    }
+    
+    for inventory_id, supply in existing.items():
+        if not wanted.get(inventory_id):
+            db.delete(supply)
+    
+    for inventory_id, quantity in wanted.items():
+        if not quantity:
+            continue
+        if inventory_id in existing:
+            existing[inventory_id].quantity_per_booking = quantity
+        else:
+            db.add(ServiceSupply(
+                service_id=service.id,
+                inventory_id=inventory_id,
+                quantity_per_booking=quantity
+            ))
+    
+    # Existing confirmed bookings pick up the new quantities
+    resynced = resync_service_reservations(db, service.id)
+    db.commit()
+    
+    supplies = db.query(ServiceSupply).filter(
+        ServiceSupply.service_id == service.id
+    ).all()
+    
+    return {
+        "status": "success",
+        "service_id": service.id,
+        "supplies": [s.to_dict() for s in supplies],
+        "bookings_updated": resynced
+    }
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from datetime import datetime
 from typing import Optional, List, Dict
@@ -15,6 +15,8 @@ from app.models.inventory import InventoryItem
 from app.models.form import Form
 from app.models.integration import Integration, IntegrationType, IntegrationProvider
 from app.routes.auth import get_password_hash
+from app.services.response_cache import cached_response
+from app.services.workspace_cache import public_workspace_cache
 
 router = APIRouter()
 
@@ -104,6 +106,7 @@ async def setup_workspace(
     workspace.onboarding_step = max(workspace.onboarding_step, 1)
     
     db.commit()
+    public_workspace_cache.invalidate_workspace(workspace.id, workspace.slug)
     
     return {
         "status": "success", 
@@ -370,6 +373,7 @@ async def activate_workspace(
     workspace.onboarding_step = 7
     workspace.activated_at = datetime.utcnow()
     db.commit()
+    public_workspace_cache.invalidate_workspace(workspace.id, workspace.slug)
     
     return {
         "status": "success",
@@ -379,63 +383,68 @@ async def activate_workspace(
 
 @router.get("/status")
 async def get_onboarding_status(
+    request: Request,
     workspace: Workspace = Depends(get_current_workspace),
     db: Session = Depends(get_db)
 ):
     """Get current onboarding status"""
     
-    integrations_count = db.query(Integration).filter(
-        Integration.workspace_id == workspace.id
-    ).count()
-    
-    services_count = db.query(Service).filter(
-        Service.workspace_id == workspace.id
-    ).count()
-    
-    inventory_count = db.query(InventoryItem).filter(
-        InventoryItem.workspace_id == workspace.id
-    ).count()
-    
-    forms_count = db.query(Form).filter(
-        Form.workspace_id == workspace.id
-    ).count()
-    
-    staff_count = db.query(User).filter(
-        User.workspace_id == workspace.id,
-        User.role == UserRole.STAFF
-    ).count()
-    
-    steps = {
-        1: {
-            "completed": bool(workspace.name and workspace.address and workspace.contact_email),
-            "required": True
-        },
-        2: {
-            "completed": integrations_count > 0,
-            "required": True
-        },
-        3: {
-            "completed": services_count > 0,
-            "required": True
-        },
-        4: {
-            "completed": inventory_count > 0,
-            "required": False
-        },
-        5: {
-            "completed": forms_count > 0,
-            "required": False
-        },
-        6: {
-            "completed": staff_count > 0,
-            "required": False
+    def build():
+        integrations_count = db.query(Integration).filter(
+            Integration.workspace_id == workspace.id
+        ).count()
+        
+        services_count = db.query(Service).filter(
+            Service.workspace_id == workspace.id
+        ).count()
+        
+        inventory_count = db.query(InventoryItem).filter(
+            InventoryItem.workspace_id == workspace.id
+        ).count()
+        
+        forms_count = db.query(Form).filter(
+            Form.workspace_id == workspace.id
+        ).count()
+        
+        staff_count = db.query(User).filter(
+            User.workspace_id == workspace.id,
+            User.role == UserRole.STAFF
+        ).count()
+        
+        steps = {
+            1: {
+                "completed": bool(workspace.name and workspace.address and workspace.contact_email),
+                "required": True
+            },
+            2: {
+                "completed": integrations_count > 0,
+                "required": True
+            },
+            3: {
+                "completed": services_count > 0,
+                "required": True
+            },
+            4: {
+                "completed": inventory_count > 0,
+                "required": False
+            },
+            5: {
+                "completed": forms_count > 0,
+                "required": False
+            },
+            6: {
+                "completed": staff_count > 0,
+                "required": False
+            }
+        }
+        
+        return {
+            "current_step": workspace.onboarding_step,
+            "is_active": workspace.is_active,
+            "activated_at": workspace.activated_at.isoformat() if workspace.activated_at else None,
+            "steps": steps,
+            "workspace": workspace.to_dict()
         }
-    }
     
-    return {
-        "current_step": workspace.onboarding_step,
-        "is_active": workspace.is_active,
-        "activated_at": workspace.activated_at.isoformat() if workspace.activated_at else None,
-        "steps": steps,
-        "workspace": workspace.to_dict()
-    }
\ No newline at end of file
+    entities = ["workspace", "integrations", "services", "inventory", "forms", "users"]
+    return cached_response(request, db, workspace.id, entities, build)
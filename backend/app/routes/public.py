@@ -12,6 +12,14 @@ from app.models.contact import Contact, Conversation, Message
 from app.models.booking import Booking, BookingStatus
 from app.models.form import Form, FormSubmission
 from app.services.automation import AutomationService
+from app.services.reservations import sync_booking_reservations
+from app.services.slot_locks import reserve_slot, commit_booking, SlotUnavailableError
+from app.services.resource_calendar import sync_booking_resources, to_naive_utc
+from app.services.availability import open_slots, get_compiled_rules, local_today
+from app.services.response_cache import cached_response, get_versions
+from app.services.workspace_cache import public_workspace_cache
+from app.services.contacts import find_or_create_contact
+from app.services.form_validation import get_form_validator
 
 router = APIRouter()
 
@@ -29,9 +37,11 @@ class BookingRequest(BaseModel):
     email: EmailStr
     phone: Optional[str] = None
     notes: Optional[str] = None
+    resource_ids: Optional[List[str]] = None  # preferred staff/rooms
     
     @validator('start_time')
     def validate_start_time(cls, v):
+        v = to_naive_utc(v)  # stored and compared as UTC
         if v < datetime.utcnow():
             raise ValueError('Start time must be in the future')
         return v
@@ -43,30 +53,33 @@ class FormSubmissionData(BaseModel):
 @router.get("/workspace/{slug}")
 async def get_workspace_public(
     slug: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get public workspace info"""
     
-    workspace = db.query(Workspace).filter(
-        Workspace.slug == slug,
-        Workspace.is_active == True
-    ).first()
+    workspace = public_workspace_cache.get_workspace(db, slug)
     
     if not workspace:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workspace not found"
         )
+    workspace_id = workspace.id
     
-    return {
-        "id": workspace.id,
-        "name": workspace.name,
-        "slug": workspace.slug,
-        "contact_email": workspace.contact_email,
-        "contact_phone": workspace.contact_phone,
-        "logo_url": workspace.logo_url,
-        "timezone": workspace.timezone
-    }
+    def build():
+        workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+        return {
+            "id": workspace.id,
+            "name": workspace.name,
+            "slug": workspace.slug,
+            "contact_email": workspace.contact_email,
+            "contact_phone": workspace.contact_phone,
+            "logo_url": workspace.logo_url,
+            "timezone": workspace.timezone
+        }
+    
+    return cached_response(request, db, workspace_id, ["workspace"], build, public=True)
 
 @router.post("/contact/{slug}")
 async def submit_contact_form(
@@ -76,10 +89,7 @@ async def submit_contact_form(
 ):
     """Public contact form submission"""
     
-    workspace = db.query(Workspace).filter(
-        Workspace.slug == slug,
-        Workspace.is_active == True
-    ).first()
+    workspace = public_workspace_cache.get_workspace(db, slug)
     
     if not workspace:
         raise HTTPException(
@@ -94,16 +104,11 @@ async def submit_contact_form(
             detail="Either email or phone is required"
         )
     
-    # Create contact
-    contact = Contact(
-        workspace_id=workspace.id,
-        name=data.name,
-        email=data.email,
-        phone=data.phone,
-        source="contact_form"
+    # Returning visitors reuse their contact
+    contact, created = find_or_create_contact(
+        db, workspace.id, data.name,
+        email=data.email, phone=data.phone, source="contact_form"
     )
-    db.add(contact)
-    db.flush()
     
     # Create conversation
     conversation = Conversation(
@@ -113,6 +118,7 @@ async def submit_contact_form(
         status="active",
         message_count=1 if data.message else 0,
         awaiting_reply=True,
+        awaiting_since=datetime.utcnow(),
         last_message_direction="inbound"
     )
     db.add(conversation)
@@ -134,7 +140,8 @@ async def submit_contact_form(
     db.commit()
     
     # Trigger automation
-    await AutomationService.handle_new_contact(workspace, contact)
+    if created:
+        await AutomationService.handle_new_contact(workspace, contact)
     
     return {
         "status": "success",
@@ -146,37 +153,42 @@ async def submit_contact_form(
 @router.get("/book/{slug}")
 async def get_booking_page(
     slug: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Get public booking page data"""
     
-    workspace = db.query(Workspace).filter(
-        Workspace.slug == slug,
-        Workspace.is_active == True
-    ).first()
+    workspace = public_workspace_cache.get_workspace(db, slug)
     
     if not workspace:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workspace not found"
         )
+    workspace_id = workspace.id
     
-    services = db.query(Service).filter(
-        Service.workspace_id == workspace.id,
-        Service.is_active == True
-    ).all()
+    versions = get_versions(db, workspace_id, ["workspace", "services"])
     
-    return {
-        "workspace": {
-            "id": workspace.id,
-            "name": workspace.name,
-            "slug": workspace.slug,
-            "timezone": workspace.timezone,
-            "contact_email": workspace.contact_email,
-            "contact_phone": workspace.contact_phone
-        },
-        "services": [service.to_dict() for service in services]
-    }
+    def build():
+        workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+        services = public_workspace_cache.get_active_services(db, workspace_id, versions["services"])
+        
+        return {
+            "workspace": {
+                "id": workspace.id,
+                "name": workspace.name,
+                "slug": workspace.slug,
+                "timezone": workspace.timezone,
+                "contact_email": workspace.contact_email,
+                "contact_phone": workspace.contact_phone
+            },
+            "services": services
+        }
+    
+    return cached_response(
+        request, db, workspace_id, ["workspace", "services"], build,
+        public=True, versions=versions
+    )
 
 @router.post("/book/{slug}")
 async def create_booking_public(
@@ -186,10 +198,7 @@ async def create_booking_public(
 ):
     """Public booking submission"""
     
-    workspace = db.query(Workspace).filter(
-        Workspace.slug == slug,
-        Workspace.is_active == True
-    ).first()
+    workspace = public_workspace_cache.get_workspace(db, slug)
     
     if not workspace:
         raise HTTPException(
@@ -209,57 +218,50 @@ async def create_booking_public(
             detail="Service not found"
         )
     
-    # Calculate end time
-    end_time = data.start_time + timedelta(minutes=service.duration)
-    
-    # Check for conflicts
-    conflicting = db.query(Booking).filter(
-        Booking.workspace_id == workspace.id,
-        Booking.service_id == service.id,
-        Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING]),
-        Booking.start_time < end_time,
-        Booking.end_time > data.start_time
-    ).first()
-    
-    if conflicting:
+    if data.resource_ids and not set(data.resource_ids) <= {r.id for r in service.resources}:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This time slot is not available. Please select another time."
+            detail="Selected staff or room is not available for this service"
         )
     
-    # Find or create contact
-    contact = None
-    if data.email:
-        contact = db.query(Contact).filter(
-            Contact.workspace_id == workspace.id,
-            Contact.email == data.email
-        ).first()
+    # Calculate end time
+    end_time = data.start_time + timedelta(minutes=service.duration)
     
-    if not contact:
-        contact = Contact(
+    try:
+        # Take the slot lock first; it is held until commit
+        resource_ids = reserve_slot(
+            db, workspace.id, service, data.start_time, end_time,
+            resource_ids=data.resource_ids
+        )
+        
+        # Find or create contact
+        contact, _ = find_or_create_contact(
+            db, workspace.id, data.name,
+            email=data.email, phone=data.phone, source="booking"
+        )
+        
+        # Create booking
+        booking = Booking(
             workspace_id=workspace.id,
-            name=data.name,
-            email=data.email,
-            phone=data.phone,
-            source="booking"
+            service_id=service.id,
+            contact_id=contact.id,
+            start_time=data.start_time,
+            end_time=end_time,
+            timezone=workspace.timezone,
+            status=BookingStatus.CONFIRMED,
+            notes=data.notes,
+            confirmation_sent=False
+        )
+        db.add(booking)
+        sync_booking_resources(db, booking, resource_ids)
+        sync_booking_reservations(db, booking)
+        commit_booking(db)
+    except SlotUnavailableError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This time slot is not available. Please select another time."
         )
-        db.add(contact)
-        db.flush()
-    
-    # Create booking
-    booking = Booking(
-        workspace_id=workspace.id,
-        service_id=service.id,
-        contact_id=contact.id,
-        start_time=data.start_time,
-        end_time=end_time,
-        timezone=workspace.timezone,
-        status=BookingStatus.CONFIRMED,
-        notes=data.notes,
-        confirmation_sent=False
-    )
-    db.add(booking)
-    db.commit()
     db.refresh(booking)
     
     # Trigger automation
@@ -343,7 +345,15 @@ async def submit_form_public(
             detail="Invalid token"
         )
     
-    submission.data = data.data
+    # Checked in one pass by the form's cached, compiled validator
+    cleaned, errors = get_form_validator(submission.form)(data.data)
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="; ".join(errors.values())
+        )
+    
+    submission.data = cleaned
     submission.completed_at = datetime.utcnow()
     db.commit()
     
@@ -372,57 +382,38 @@ async def get_service_availability(
             detail="Service not found"
         )
     
-    # Parse date or use today
-    query_date = datetime.fromisoformat(date) if date else datetime.utcnow()
-    day_of_week = query_date.isoweekday()
+    # Dates and slot labels are in the workspace's local time
+    tz_name = service.workspace.timezone if service.workspace else None
     
-    # Get availability for this day
-    availability = next(
-        (a for a in service.availability if a.get("day") == day_of_week),
-        None
-    )
+    try:
+        query_date = datetime.fromisoformat(date).date() if date else local_today(tz_name)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use ISO format."
+        )
+    day_of_week = query_date.isoweekday()
     
-    if not availability or not availability.get("enabled", False):
+    if day_of_week not in get_compiled_rules(service):
         return {
             "service_id": service.id,
             "service_name": service.name,
             "date": query_date.isoformat(),
+            "timezone": tz_name,
             "available": False,
             "slots": []
         }
     
-    slots = availability.get("slots", [])
-    available_slots = []
-    
-    for slot_time in slots:
-        # Parse slot time
-        hour, minute = map(int, slot_time.split(':'))
-        slot_datetime = query_date.replace(hour=hour, minute=minute, second=0, microsecond=0)
-        
-        # Check if slot is in the past
-        if slot_datetime < datetime.utcnow():
-            continue
-        
-        # Check if slot is booked
-        end_time = slot_datetime + timedelta(minutes=service.duration)
-        
-        conflicting = db.query(Booking).filter(
-            Booking.workspace_id == service.workspace_id,
-            Booking.service_id == service.id,
-            Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.PENDING]),
-            Booking.start_time < end_time,
-            Booking.end_time > slot_datetime
-        ).first()
-        
-        if not conflicting:
-            available_slots.append(slot_time)
+    available_slots = open_slots(db, service, tz_name, query_date)
     
     return {
         "service_id": service.id,
         "service_name": service.name,
         "date": query_date.isoformat(),
+        "timezone": tz_name,
         "day_of_week": day_of_week,
         "duration": service.duration,
         "available": len(available_slots) > 0,
-        "slots": available_slots
-    }
\ No newline at end of file
+        "slots": [slot["time"] for slot in available_slots],
+        "slot_times": available_slots
+    }
@@ -0,0 +1,264 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from datetime import datetime, date as date_type
+from typing import Optional, List
+from pydantic import BaseModel
+
+from app.config import get_db
+from app.dependencies import get_current_workspace, get_current_admin
+from app.models.workspace import Workspace, Service
+from app.models.resource import Resource, ResourceType
+from app.models.user import User
+from app.services.resource_calendar import resource_calendar
+
+router = APIRouter()
+
+# Pydantic models
+class ResourceCreate(BaseModel):
+    name: str
+    resource_type: str
+    user_id: Optional[str] = None
+
+class ResourceUpdate(BaseModel):
+    name: Optional[str] = None
+    user_id: Optional[str] = None
+    is_active: Optional[bool] = None
+
+class ServiceResourcesUpdate(BaseModel):
+    resource_ids: List[str]
+
+def _get_resource(db: Session, workspace: Workspace, resource_id: str) -> Resource:
+    resource = db.query(Resource).filter(
+        Resource.id == resource_id,
+        Resource.workspace_id == workspace.id
+    ).first()
+    
+    if not resource:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Resource not found"
+        )
+    
+    return resource
+
+def _check_staff_user(db: Session, workspace: Workspace, user_id: Optional[str]):
+    if not user_id:
+        return
+    user = db.query(User).filter(
+        User.id == user_id,
+        User.workspace_id == workspace.id
+    ).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+# Routes
+@router.get("")
+async def get_resources(
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    resource_type: Optional[str] = None,
+    is_active: Optional[bool] = None
+):
+    """Get staff and room resources"""
+    
+    query = db.query(Resource).filter(
+        Resource.workspace_id == workspace.id
+    )
+    
+    if resource_type:
+        try:
+            query = query.filter(Resource.resource_type == ResourceType(resource_type.lower()))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid resource type: {resource_type}"
+            )
+    
+    if is_active is not None:
+        query = query.filter(Resource.is_active == is_active)
+    
+    resources = query.order_by(Resource.name).all()
+    
+    return {
+        "total": len(resources),
+        "resources": [r.to_dict() for r in resources]
+    }
+
+@router.post("")
+async def create_resource(
+    data: ResourceCreate,
+    workspace: Workspace = Depends(get_current_workspace),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Create a staff or room resource"""
+    
+    try:
+        resource_type = ResourceType(data.resource_type.lower())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid resource type: {data.resource_type}"
+        )
+    
+    _check_staff_user(db, workspace, data.user_id)
+    
+    resource = Resource(
+        workspace_id=workspace.id,
+        name=data.name,
+        resource_type=resource_type,
+        user_id=data.user_id,
+        is_active=True
+    )
+    db.add(resource)
+    db.commit()
+    db.refresh(resource)
+    
+    return {
+        "status": "success",
+        "resource": resource.to_dict()
+    }
+
+@router.patch("/{resource_id}")
+async def update_resource(
+    resource_id: str,
+    data: ResourceUpdate,
+    workspace: Workspace = Depends(get_current_workspace),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Update resource"""
+    
+    resource = _get_resource(db, workspace, resource_id)
+    
+    update_data = data.model_dump(exclude_unset=True)
+    if "user_id" in update_data:
+        _check_staff_user(db, workspace, update_data["user_id"])
+    
+    for field, value in update_data.items():
+        setattr(resource, field, value)
+    
+    resource.updated_at = datetime.utcnow()
+    db.commit()
+    db.refresh(resource)
+    
+    return {
+        "status": "success",
+        "resource": resource.to_dict()
+    }
+
+@router.delete("/{resource_id}")
+async def delete_resource(
+    resource_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Delete resource"""
+    
+    resource = _get_resource(db, workspace, resource_id)
+    
+    db.delete(resource)
+    db.commit()
+    resource_calendar.clear()
+    
+    return {
+        "status": "success",
+        "message": f"Resource '{resource.name}' deleted successfully"
+    }
+
+@router.get("/{resource_id}/schedule")
+async def get_resource_schedule(
+    resource_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db),
+    date: Optional[str] = None
+):
+    """Get busy intervals for a resource on a day (UTC)"""
+    
+    resource = _get_resource(db, workspace, resource_id)
+    
+    try:
+        day = date_type.fromisoformat(date[:10]) if date else datetime.utcnow().date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date format. Use ISO format."
+        )
+    
+    return {
+        "resource": resource.to_dict(),
+        "date": day.isoformat(),
+        "busy": resource_calendar.busy_intervals(db, resource.id, day)
+    }
+
+@router.get("/services/{service_id}")
+async def get_service_resources(
+    service_id: str,
+    workspace: Workspace = Depends(get_current_workspace),
+    db: Session = Depends(get_db)
+):
+    """Get resources a service can be booked with"""
+    
+    service = db.query(Service).filter(
+        Service.id == service_id,
+        Service.workspace_id == workspace.id
+    ).first()
+    
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    return {
+        "service_id": service.id,
+        "resources": [r.to_dict() for r in service.resources]
+    }
+
+@router.put("/services/{service_id}")
+async def set_service_resources(
+    service_id: str,
+    data: ServiceResourcesUpdate,
+    workspace: Workspace = Depends(get_current_workspace),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Replace the resources a service can be booked with"""
+    
+    service = db.query(Service).filter(
+        Service.id == service_id,
+        Service.workspace_id == workspace.id
+    ).first()
+    
+    if not service:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Service not found"
+        )
+    
+    resources = []
+    if data.resource_ids:
+        resources = db.query(Resource).filter(
+            Resource.id.in_(data.resource_ids),
+            Resource.workspace_id == workspace.id
+        ).all()
+        missing = set(data.resource_ids) - {r.id for r in resources}
+        if missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Resource not found: {', '.join(sorted(missing))}"
+            )
+    
+    service.resources = resources
+    service.updated_at = datetime.utcnow()
+    db.commit()
+    
+    return {
+        "status": "success",
+        "service_id": service.id,
+        "resources": [r.to_dict() for r in service.resources]
+    }
@@ -0,0 +1,165 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, status
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from starlette.datastructures import UploadFile
+import asyncio
+import secrets
+
+from app.config import get_db
+from app.dependencies import get_current_workspace, get_current_admin
+from app.models.workspace import Workspace
+from app.models.user import User
+from app.models.integration import Integration, IntegrationType, IntegrationProvider, InboundEvent
+from app.services.inbound import (
+    drain_inbound_events, verify_sendgrid, verify_twilio, sendgrid_external_id, SignatureError
+)
+from app.routes.inbox import manager
+
+router = APIRouter()
+
+EMPTY_TWIML = '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
+
+def _get_integration(db: Session, integration_id: str, provider: IntegrationProvider) -> Integration:
+    integration = db.query(Integration).filter(
+        Integration.id == integration_id,
+        Integration.provider == provider,
+        Integration.is_active == True
+    ).first()
+    
+    if not integration:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Integration not found"
+        )
+    
+    return integration
+
+def _enqueue(db: Session, integration: Integration, channel: str, external_id, payload: dict):
+    """Store the payload for the batch worker; provider retries of a stored message are no-ops"""
+    db.add(InboundEvent(
+        workspace_id=integration.workspace_id,
+        integration_id=integration.id,
+        provider=integration.provider.value,
+        channel=channel,
+        external_id=external_id,
+        payload=payload,
+        status="pending",
+        attempts=0
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+async def _drain_and_notify():
+    touched = await asyncio.get_running_loop().run_in_executor(None, drain_inbound_events)
+    for workspace_id, conversation_ids in touched.items():
+        await manager.send_personal_message({
+            "type": "new_messages",
+            "conversation_ids": sorted(conversation_ids)
+        }, workspace_id)
+
+@router.post("/sendgrid/inbound/{integration_id}")
+async def sendgrid_inbound(
+    integration_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    token: str = "",
+    db: Session = Depends(get_db)
+):
+    """SendGrid Inbound Parse receiver (multipart form post)"""
+    
+    integration = _get_integration(db, integration_id, IntegrationProvider.SENDGRID)
+    body = await request.body()
+    try:
+        verify_sendgrid(
+            token, (integration.config or {}).get("webhook_token"),
+            public_key=(integration.credentials or {}).get("webhook_public_key"),
+            signature=request.headers.get("x-twilio-email-event-webhook-signature"),
+            timestamp=request.headers.get("x-twilio-email-event-webhook-timestamp"),
+            body=body
+        )
+    except SignatureError as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(e)
+        )
+    
+    form = await request.form()
+    # Attachments aren't stored; only their count is kept
+    fields = {key: value for key, value in form.multi_items() if not isinstance(value, UploadFile)}
+    _enqueue(db, integration, "email", sendgrid_external_id(fields), fields)
+    background_tasks.add_task(_drain_and_notify)
+    
+    return {"status": "accepted"}
+
+@router.post("/twilio/sms/{integration_id}")
+async def twilio_sms(
+    integration_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
+    """Twilio inbound SMS receiver; answers with empty TwiML so nothing is auto-replied"""
+    
+    integration = _get_integration(db, integration_id, IntegrationProvider.TWILIO)
+    form = await request.form()
+    params = [(key, value) for key, value in form.multi_items() if isinstance(value, str)]
+    
+    # Behind a proxy the public URL differs from request.url; it can be pinned in config
+    url = (integration.config or {}).get("webhook_url") or str(request.url)
+    try:
+        verify_twilio(
+            (integration.credentials or {}).get("auth_token"), url, params,
+            request.headers.get("x-twilio-signature")
+        )
+    except SignatureError as e:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=str(e)
+        )
+    
+    payload = dict(params)
+    _enqueue(db, integration, "sms", payload.get("MessageSid"), payload)
+    background_tasks.add_task(_drain_and_notify)
+    
+    return Response(content=EMPTY_TWIML, media_type="application/xml")
+
+@router.get("/urls")
+async def get_webhook_urls(
+    request: Request,
+    workspace: Workspace = Depends(get_current_workspace),
+    admin: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Webhook URLs to configure at each provider"""
+    
+    integrations = db.query(Integration).filter(
+        Integration.workspace_id == workspace.id,
+        Integration.type.in_([IntegrationType.EMAIL, IntegrationType.SMS]),
+        Integration.is_active == True
+    ).all()
+    
+    base = str(request.base_url).rstrip("/") + "/api/webhooks"
+    urls = []
+    for integration in integrations:
+        if integration.provider == IntegrationProvider.SENDGRID:
+            config = dict(integration.config or {})
+            if not config.get("webhook_token"):
+                config["webhook_token"] = secrets.token_urlsafe(24)
+                integration.config = config
+            urls.append({
+                "integration_id": integration.id,
+                "provider": "sendgrid",
+                "url": f"{base}/sendgrid/inbound/{integration.id}?token={config['webhook_token']}"
+            })
+        elif integration.provider == IntegrationProvider.TWILIO:
+            urls.append({
+                "integration_id": integration.id,
+                "provider": "twilio",
+                "url": f"{base}/twilio/sms/{integration.id}"
+            })
+    db.commit()
+    
+    return urls
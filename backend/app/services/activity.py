@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import uuid
+import logging
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session, attributes
+
+from app.models.activity import ActivityEvent
+from app.models.booking import Booking
+from app.models.contact import Contact, Conversation, Message, Broadcast
+from app.models.form import Form, FormSubmission
+from app.models.workspace import Service
+from app.services.jobs import run_job
+
+logger = logging.getLogger(__name__)
+
+# How far back an empty feed is seeded from existing rows (what the old feed showed)
+BACKFILL_DAYS = 7
+
+PREVIEW_LENGTH = 100
+
+def _preview(content: Optional[str]) -> str:
+    content = content or ""
+    return content[:PREVIEW_LENGTH] + "..." if len(content) > PREVIEW_LENGTH else content
+
+def _names(connection, id_column, name_column, ids: Iterable[str]) -> Dict[str, str]:
+    ids = {i for i in ids if i}
+    if not ids:
+        return {}
+    return dict(connection.execute(select(id_column, name_column).where(id_column.in_(ids))).all())
+
+def booking_event(booking_id: str, workspace_id: str, action: str, status: Optional[str], service_name: Optional[str],
+                  contact_name: Optional[str], start_time: Optional[datetime], at: datetime) -> dict:
+    if action == "created":
+        title = f"New booking: {service_name or 'Service'}"
+    else:
+        title = f"Booking {action.replace('_', ' ')}: {service_name or 'Service'}"
+    when = start_time.strftime('%b %d, %I:%M %p') if start_time else ""
+    return {
+        "workspace_id": workspace_id,
+        "type": "booking",
+        "action": action,
+        "entity_id": booking_id,
+        "title": title,
+        "description": f"{contact_name or 'Customer'} - {when}",
+        "status": status,
+        "url": f"/bookings/{booking_id}",
+        "data": {},
+        "created_at": at
+    }
+
+def message_event(message_id: str, workspace_id: str, conversation_id: str, direction: str, automated: bool,
+                  content: Optional[str], contact_name: Optional[str], at: datetime) -> dict:
+    return {
+        "workspace_id": workspace_id,
+        "type": "message",
+        "action": "received" if direction == "inbound" else "sent",
+        "entity_id": message_id,
+        "title": f"Message from {contact_name or 'Customer'}",
+        "description": _preview(content),
+        "status": None,
+        "url": f"/inbox/{conversation_id}",
+        "data": {"direction": direction, "automated": bool(automated)},
+        "created_at": at
+    }
+
+def submission_event(submission_id: str, workspace_id: str, form_name: Optional[str], contact_name: Optional[str],
+                     at: datetime) -> dict:
+    return {
+        "workspace_id": workspace_id,
+        "type": "form_submission",
+        "action": "completed",
+        "entity_id": submission_id,
+        "title": f"Form completed: {form_name or 'Form'}",
+        "description": f"Submitted by {contact_name or 'Customer'}",
+        "status": None,
+        "url": f"/forms/submissions/{submission_id}",
+        "data": {},
+        "created_at": at
+    }
+
+def record_activity(connection, events: List[dict]):
+    """Append feed rows in one insert; for writes that bypass the ORM unit of work"""
+    if events:
+        connection.execute(insert(ActivityEvent.__table__), [{"id": str(uuid.uuid4()), **e} for e in events])
+
+def _status_value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+@event.listens_for(Session, "after_flush")
+def _record_changes(session, flush_context):
+    """Turn new bookings/messages/broadcasts, booking status changes and completed forms into feed rows"""
+    now = datetime.utcnow()
+    bookings, messages, submissions, broadcasts = [], [], [], []
+    
+    for obj in session.new:
+        if isinstance(obj, Booking):
+            bookings.append((obj, "created"))
+        elif isinstance(obj, Message) and not obj.broadcast_id:
+            messages.append(obj)
+        elif isinstance(obj, FormSubmission) and obj.completed_at is not None:
+            submissions.append(obj)
+        elif isinstance(obj, Broadcast):
+            broadcasts.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, Booking):
+            history = attributes.get_history(obj, "status")
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                bookings.append((obj, _status_value(obj.status)))
+        elif isinstance(obj, FormSubmission):
+            history = attributes.get_history(obj, "completed_at")
+            if history.added and history.added[0] is not None and not any(history.deleted):
+                submissions.append(obj)
+    
+    if not (bookings or messages or submissions or broadcasts):
+        return
+    
+    connection = session.connection()
+    conversations = {}
+    if messages:
+        conversations = {row.id: row for row in connection.execute(
+            select(Conversation.id, Conversation.workspace_id, Contact.name)
+            .outerjoin(Contact, Conversation.contact_id == Contact.id)
+            .where(Conversation.id.in_({m.conversation_id for m in messages}))
+        )}
+    forms = {}
+    if submissions:
+        forms = {row.id: row for row in connection.execute(
+            select(Form.id, Form.name).where(Form.id.in_({s.form_id for s in submissions}))
+        )}
+    services = _names(connection, Service.id, Service.name, (b.service_id for b, _ in bookings))
+    contacts = _names(connection, Contact.id, Contact.name,
+                      [b.contact_id for b, _ in bookings] + [s.contact_id for s in submissions])
+    
+    events = []
+    for booking, action in bookings:
+        events.append(booking_event(
+            booking.id, booking.workspace_id, action, _status_value(booking.status),
+            services.get(booking.service_id), contacts.get(booking.contact_id), booking.start_time, now
+        ))
+    for message in messages:
+        conversation = conversations.get(message.conversation_id)
+        if conversation is None:
+            continue
+        events.append(message_event(
+            message.id, conversation.workspace_id, message.conversation_id, message.direction,
+            message.automated, message.content, conversation.name, now
+        ))
+    for submission in submissions:
+        form = forms.get(submission.form_id)
+        if form is None:
+            continue
+        events.append(submission_event(submission.id, submission.workspace_id, form.name, contacts.get(submission.contact_id), now))
+    for broadcast in broadcasts:
+        events.append({
+            "workspace_id": broadcast.workspace_id,
+            "type": "broadcast",
+            "action": "queued",
+            "entity_id": broadcast.id,
+            "title": f"Broadcast queued: {broadcast.subject or broadcast.channel}",
+            "description": _preview(broadcast.content),
+            "status": None,
+            "url": None,
+            "data": {"channel": broadcast.channel},
+            "created_at": now
+        })
+    record_activity(connection, events)
+
+def backfill_activity(db: Session, days: int = BACKFILL_DAYS) -> int:
+    """Seed an empty feed from the last `days` of bookings, messages and completed forms"""
+    if db.query(ActivityEvent.id).first() is not None:
+        return 0
+    since = datetime.utcnow() - timedelta(days=days)
+    
+    events = [booking_event(
+        row.id, row.workspace_id, "created", _status_value(row.status), row.service_name,
+        row.contact_name, row.start_time, row.created_at
+    ) for row in db.query(
+        Booking.id, Booking.workspace_id, Booking.status, Booking.start_time, Booking.created_at,
+        Service.name.label("service_name"), Contact.name.label("contact_name")
+    ).outerjoin(Service, Booking.service_id == Service.id).outerjoin(
+        Contact, Booking.contact_id == Contact.id
+    ).filter(Booking.created_at >= since)]
+    
+    events += [message_event(
+        row.id, row.workspace_id, row.conversation_id, row.direction, row.automated,
+        row.content, row.contact_name, row.created_at
+    ) for row in db.query(
+        Message.id, Message.conversation_id, Message.direction, Message.automated, Message.content,
+        Message.created_at, Conversation.workspace_id, Contact.name.label("contact_name")
+    ).join(Conversation, Message.conversation_id == Conversation.id).outerjoin(
+        Contact, Conversation.contact_id == Contact.id
+    ).filter(Message.created_at >= since, Message.broadcast_id == None)]
+    
+    events += [submission_event(
+        row.id, row.workspace_id, row.form_name, row.contact_name, row.completed_at
+    ) for row in db.query(
+        FormSubmission.id, FormSubmission.completed_at, FormSubmission.workspace_id,
+        Form.name.label("form_name"), Contact.name.label("contact_name")
+    ).join(Form, FormSubmission.form_id == Form.id).outerjoin(
+        Contact, FormSubmission.contact_id == Contact.id
+    ).filter(FormSubmission.completed_at >= since)]
+    
+    # Stored timestamps may carry a timezone; the feed compares naive UTC
+    for e in events:
+        if e["created_at"] is not None and e["created_at"].tzinfo is not None:
+            e["created_at"] = e["created_at"].astimezone(timezone.utc).replace(tzinfo=None)
+    events = [e for e in events if e["created_at"] is not None]
+    record_activity(db.connection(), events)
+    db.commit()
+    return len(events)
+
+def run_activity_backfill_job():
+    """Feed backfill, for running outside a request"""
+    return run_job(backfill_activity, "Seeded activity feed with {} events", "Error backfilling activity feed")
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import json
+import time as _time
+import zlib
+import logging
+from sqlalchemy import func, select, delete
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.contact import Conversation, Message, ConversationArchive
+from app.services.jobs import run_job
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # in requirements.txt; zlib is for dev setups without it
+    zstandard = None
+
+# Conversations moved per transaction, so the mover never holds locks for long
+ARCHIVE_BATCH_SIZE = 50
+
+# Messages moved per transaction; a batch stops taking conversations once it
+# reaches this (a single longer conversation still goes alone)
+ARCHIVE_MAX_MESSAGES = 5000
+
+# Message ids per DELETE statement, well under bind-parameter limits
+DELETE_CHUNK_SIZE = 500
+
+# Conversations whose messages may be moved to the archive
+ARCHIVABLE_STATUSES = ("resolved", "archived")
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "zlib", zlib.compress(data, 9)
+
+def _decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(payload)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this archive")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown archive codec: {codec}")
+
+def decode_archive(archive: ConversationArchive) -> List[dict]:
+    """Archived messages as Message.to_dict() payloads, oldest first"""
+    return json.loads(_decompress(archive.codec, archive.payload))
+
+def _store(db: Session, archive: Optional[ConversationArchive], conversation: Conversation, messages: List[dict]):
+    codec, payload = _compress(json.dumps(messages, separators=(",", ":")).encode())
+    if archive is None:
+        archive = ConversationArchive(conversation_id=conversation.id, workspace_id=conversation.workspace_id)
+        db.add(archive)
+    archive.codec = codec
+    archive.payload = payload
+    archive.message_count = len(messages)
+    archive.last_message = messages[-1] if messages else None
+
+def load_conversation_messages(db: Session, conversation_id: str) -> List[dict]:
+    """All messages of a conversation, reading through to its archive"""
+    hot = [m.to_dict() for m in db.query(Message).filter(
+        Message.conversation_id == conversation_id
+    ).order_by(Message.created_at.asc()).all()]
+    
+    archive = db.query(ConversationArchive).filter(
+        ConversationArchive.conversation_id == conversation_id
+    ).first()
+    if archive is None:
+        return hot
+    return decode_archive(archive) + hot
+
+def archived_last_messages(db: Session, conversation_ids: List[str]) -> Dict[str, dict]:
+    """Newest archived message per conversation, without decompressing anything"""
+    if not conversation_ids:
+        return {}
+    return dict(db.query(ConversationArchive.conversation_id, ConversationArchive.last_message).filter(
+        ConversationArchive.conversation_id.in_(conversation_ids)
+    ).all())
+
+def _archive_batch(db: Session, cutoff: datetime, after_id: str, batch_size: int) -> Tuple[Optional[str], int]:
+    conversations = db.query(Conversation).filter(
+        Conversation.status.in_(ARCHIVABLE_STATUSES),
+        func.coalesce(Conversation.last_message_at, Conversation.created_at) < cutoff,
+        Conversation.id > after_id,
+        Conversation.id.in_(select(Message.conversation_id))
+    ).order_by(Conversation.id).limit(batch_size).all()
+    if not conversations:
+        return None, 0
+    
+    counts = dict(db.query(Message.conversation_id, func.count(Message.id)).filter(
+        Message.conversation_id.in_([c.id for c in conversations])
+    ).group_by(Message.conversation_id).all())
+    total = 0
+    for position, conversation in enumerate(conversations):
+        total += counts.get(conversation.id, 0)
+        if position and total > ARCHIVE_MAX_MESSAGES:
+            conversations = conversations[:position]
+            break
+    
+    ids = [c.id for c in conversations]
+    grouped: Dict[str, List[Message]] = {conversation_id: [] for conversation_id in ids}
+    for message in db.query(Message).filter(
+        Message.conversation_id.in_(ids)
+    ).order_by(Message.conversation_id, Message.created_at, Message.id):
+        grouped[message.conversation_id].append(message)
+    archives = {a.conversation_id: a for a in db.query(ConversationArchive).filter(
+        ConversationArchive.conversation_id.in_(ids)
+    )}
+    
+    moved_ids = []
+    for conversation in conversations:
+        messages = grouped[conversation.id]
+        archive = archives.get(conversation.id)
+        existing = decode_archive(archive) if archive else []
+        _store(db, archive, conversation, existing + [m.to_dict() for m in messages])
+        moved_ids.extend(m.id for m in messages)
+    
+    # Only the rows just serialized; anything written since stays hot
+    for start in range(0, len(moved_ids), DELETE_CHUNK_SIZE):
+        db.execute(delete(Message).where(
+            Message.id.in_(moved_ids[start:start + DELETE_CHUNK_SIZE])
+        ).execution_options(synchronize_session=False))
+    db.commit()
+    db.expunge_all()
+    return ids[-1], len(moved_ids)
+
+def archive_old_messages(
+    db: Session,
+    older_than_days: Optional[int] = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_seconds: float = 0.0
+) -> int:
+    """Move messages of closed, idle conversations into conversation_archives.
+    
+    Runs in small batches that each commit; a conversation that is reopened
+    keeps its archive, and is re-archived (merged) once it goes idle again.
+    """
+    days = settings.MESSAGE_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    
+    moved = 0
+    last_id = ""
+    while True:
+        last_id, count = _archive_batch(db, cutoff, last_id, batch_size)
+        if last_id is None:
+            return moved
+        moved += count
+        if pause_seconds:
+            # Give request traffic a turn between batches
+            _time.sleep(pause_seconds)
+
+def run_archive_job():
+    """Archive pass for running outside a request"""
+    return run_job(
+        lambda db: archive_old_messages(db, pause_seconds=0.05),
+        "Archived {} messages", "Error in message archive job"
+    )
@@ -1,21 +1,31 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 import uuid
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 import logging
 from app.config import settings
 #from app.config import settings
 from app.services.email import send_email
 from app.services.sms import send_sms
+from app.services.availability import get_zone
+from app.services.resource_calendar import to_naive_utc
+from app.services.form_dispatch import required_forms, ensure_submissions, dispatch_booking_forms, form_link
 from app.models.workspace import Workspace
 from app.models.contact import Contact, Conversation, Message
-from app.models.booking import Booking, BookingStatus
+from app.models.booking import Booking, BookingStatus, BookingSeries
 from app.models.form import Form, FormSubmission
 from app.models.inventory import InventoryItem
 from app.models.integration import Integration, IntegrationType
 
 logger = logging.getLogger(__name__)
 
+def _session_line(booking: Booking, tz_name: Optional[str]) -> str:
+    """'• Mon, Nov 02, 2026  10:00 AM - 11:00 AM' in the given timezone"""
+    zone = get_zone(tz_name)
+    start = to_naive_utc(booking.start_time).replace(tzinfo=timezone.utc).astimezone(zone)
+    end = to_naive_utc(booking.end_time).replace(tzinfo=timezone.utc).astimezone(zone)
+    return f"• {start.strftime('%a, %b %d, %Y')}  {start.strftime('%I:%M %p')} - {end.strftime('%I:%M %p')}"
+
 class AutomationService:
     
     @staticmethod
@@ -121,8 +131,8 @@ The {workspace.name} Team"""
             logger.error(f"Error in handle_new_contact: {str(e)}")
     
     @staticmethod
-    async def handle_booking_created(workspace: Workspace, booking: Booking):
-        """Booking created → confirmation + forms"""
+    async def handle_booking_created(workspace: Workspace, booking: Booking, send_forms: bool = True):
+        """Booking created → confirmation + forms (send_forms=False when the caller batches them)"""
         try:
             db = Session.object_session(booking)
             
@@ -192,75 +202,190 @@ The {workspace.name} Team
             booking.confirmation_sent = True
             db.commit()
             
-            # Send required forms
-            if booking.service:
-                forms = db.query(Form).filter(
-                    Form.workspace_id == workspace.id,
-                    Form.service_id == booking.service.id,
-                    Form.is_active == True,
-                    Form.require_before_booking == True
-                ).all()
-                
-                for form in forms:
-                    # Check if already sent
-                    existing = db.query(FormSubmission).filter(
-                        FormSubmission.form_id == form.id,
-                        FormSubmission.booking_id == booking.id,
-                        FormSubmission.contact_id == booking.contact_id
-                    ).first()
-                    
-                    if existing:
-                        continue
-                    
-                    # Create submission
-                    token = str(uuid.uuid4())
-                    submission = FormSubmission(
-                        form_id=form.id,
-                        booking_id=booking.id,
-                        contact_id=booking.contact_id,
-                        token=token,
-                        sent_at=datetime.utcnow()
-                    )
-                    db.add(submission)
-                    
-                    # Send form link
-                    form_link = f"{settings.PUBLIC_URL}/public/form/{token}"
-                    form_subject = f"Please complete: {form.name}"
-                    form_body = f"""
-Hello {booking.contact.name},
+            # Send required forms, listed in one email
+            if send_forms and booking.service_id:
+                result = await dispatch_booking_forms(db, workspace, [booking], settings.PUBLIC_URL)
+                if result["created"]:
+                    logger.info(f"Forms sent for booking {booking.id}")
+            
+        except Exception as e:
+            logger.error(f"Error in handle_booking_created: {str(e)}")
+    
+    @staticmethod
+    async def handle_series_created(workspace: Workspace, series: BookingSeries, bookings: List[Booking]):
+        """Recurring series created → one confirmation listing every session + forms"""
+        try:
+            db = Session.object_session(series)
+            
+            if not bookings:
+                return
+            if not series.contact or not series.contact.email:
+                logger.warning(f"No email for booking series {series.id}")
+                return
+            
+            # Sessions are listed on the wall clock the series was defined in
+            service = series.service
+            session_lines = "\n".join(_session_line(b, series.timezone) for b in bookings)
+            
+            # Required forms are sent once for the whole series, tied to the first session
+            form_lines = []
+            if service:
+                forms = required_forms(db, workspace.id, [service.id]).get(service.id, [])
+                for form, _, token, state in ensure_submissions(db, [(form, bookings[0]) for form in forms]):
+                    if state != "completed":
+                        form_lines.append(f"• {form.name}: {form_link(settings.PUBLIC_URL, token)}")
+            
+            forms_section = ""
+            if form_lines:
+                forms_section = f"""
+━━━━━━━━━━━━━━━━━━━━━━
+📋 FORMS TO COMPLETE
+━━━━━━━━━━━━━━━━━━━━━━
+
+Please complete before your first session:
+{chr(10).join(form_lines)}
+"""
+            
+            confirmation_subject = f"{len(bookings)} Sessions Confirmed - {workspace.name}"
+            confirmation_body = f"""
+Hello {series.contact.name},
 
-Please complete the following form for your upcoming appointment:
+Your recurring booking has been confirmed!
 
 ━━━━━━━━━━━━━━━━━━━━━━
-📋 FORM: {form.name}
+📋 APPOINTMENT DETAILS
 ━━━━━━━━━━━━━━━━━━━━━━
 
-{form.description if form.description else 'This form is required before your appointment.'}
+Service: {service.name if service else 'Appointment'}
+Duration: {service.duration if service else 'N/A'} minutes
+Sessions: {len(bookings)}
 
-Link: {form_link}
+━━━━━━━━━━━━━━━━━━━━━━
+📅 SCHEDULE ({series.timezone})
+━━━━━━━━━━━━━━━━━━━━━━
 
-This form must be completed before your appointment on {start_date} at {start_time}.
+{session_lines}
 
+━━━━━━━━━━━━━━━━━━━━━━
+📍 LOCATION
 ━━━━━━━━━━━━━━━━━━━━━━
 
-Thank you for your cooperation!
+{workspace.address if workspace.address else 'To be confirmed'}
+{forms_section}
+━━━━━━━━━━━━━━━━━━━━━━
+✏️ NEED TO MAKE CHANGES?
+━━━━━━━━━━━━━━━━━━━━━━
+
+• To reschedule: Contact us at {workspace.contact_email}
+• To cancel: Reply to this email
+• Questions: Call us at {workspace.contact_phone or 'N/A'}
+
+━━━━━━━━━━━━━━━━━━━━━━
+
+Thank you for choosing {workspace.name}!
 
 Best regards,
 The {workspace.name} Team
 """
-                    
-                    await send_email(
-                        to=booking.contact.email,
-                        subject=form_subject,
-                        body=form_body,
-                        workspace=workspace
-                    )
+            
+            await send_email(
+                to=series.contact.email,
+                subject=confirmation_subject,
+                body=confirmation_body,
+                workspace=workspace
+            )
+            
+            db.query(Booking).filter(Booking.series_id == series.id).update(
+                {Booking.confirmation_sent: True},
+                synchronize_session="fetch"
+            )
+            db.commit()
+            logger.info(f"Confirmation sent for booking series {series.id} ({len(bookings)} sessions)")
+            
+        except Exception as e:
+            logger.error(f"Error in handle_series_created: {str(e)}")
+    
+    @staticmethod
+    async def handle_bookings_confirmed(workspace_id: str, booking_ids: List[str]):
+        """Bulk confirm → confirmation + forms for bookings not yet notified"""
+        from app.config import SessionLocal
+        db = SessionLocal()
+        try:
+            workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+            bookings = db.query(Booking).options(
+                selectinload(Booking.contact),
+                selectinload(Booking.service)
+            ).filter(
+                Booking.id.in_(booking_ids),
+                Booking.confirmation_sent == False
+            ).order_by(Booking.start_time).all()
+            
+            for booking in bookings:
+                await AutomationService.handle_booking_created(workspace, booking, send_forms=False)
+            
+            # Forms of every confirmed booking go out together, one email per contact
+            await dispatch_booking_forms(db, workspace, bookings, settings.PUBLIC_URL)
+            
+            logger.info(f"Processed confirmations for {len(bookings)} bookings")
+            
+        except Exception as e:
+            logger.error(f"Error in handle_bookings_confirmed: {str(e)}")
+        finally:
+            db.close()
+    
+    @staticmethod
+    async def handle_bookings_cancelled(workspace_id: str, booking_ids: List[str], reason: Optional[str] = None):
+        """Bulk cancel → one cancellation notice per contact"""
+        from app.config import SessionLocal
+        db = SessionLocal()
+        try:
+            workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+            bookings = db.query(Booking).options(
+                selectinload(Booking.contact),
+                selectinload(Booking.service)
+            ).filter(
+                Booking.id.in_(booking_ids)
+            ).order_by(Booking.start_time).all()
+            
+            by_contact = {}
+            for booking in bookings:
+                if booking.contact and booking.contact.email:
+                    by_contact.setdefault(booking.contact_id, []).append(booking)
+            
+            for contact_bookings in by_contact.values():
+                contact = contact_bookings[0].contact
+                session_lines = "\n".join(
+                    f"{_session_line(b, workspace.timezone)}  ({b.service.name if b.service else 'Appointment'})"
+                    for b in contact_bookings
+                )
+                noun = "appointment has" if len(contact_bookings) == 1 else "appointments have"
                 
-                db.commit()
-                logger.info(f"Forms sent for booking {booking.id}")
+                cancellation_body = f"""
+Hello {contact.name},
+
+The following {noun} been cancelled:
+
+{session_lines}
+{f"{chr(10)}Reason: {reason}{chr(10)}" if reason else ""}
+To book a new time, contact us at {workspace.contact_email} or call {workspace.contact_phone or 'N/A'}.
+
+Best regards,
+The {workspace.name} Team
+"""
+                
+                await send_email(
+                    to=contact.email,
+                    subject=f"Booking Cancelled - {workspace.name}",
+                    body=cancellation_body,
+                    workspace=workspace
+                )
+            
+            logger.info(f"Sent cancellation notices to {len(by_contact)} contacts")
             
         except Exception as e:
-            logger.error(f"Error in handle_booking_created: {str(e)}")
+            logger.error(f"Error in handle_bookings_cancelled: {str(e)}")
+        finally:
+            db.close()
     
     @staticmethod
     async def send_booking_reminders():
@@ -341,7 +466,7 @@ The {booking.workspace.name} Team
             
             # Find low stock items that haven't triggered alert
             items = db.query(InventoryItem).filter(
-                InventoryItem.quantity <= InventoryItem.threshold,
+                InventoryItem.projected_quantity <= InventoryItem.threshold,
                 InventoryItem.low_stock_alert_sent == False
             ).all()
             
@@ -360,6 +485,7 @@ The {booking.workspace.name} Team
 Item: {item.name}
 SKU: {item.sku}
 Current Quantity: {item.quantity} {item.unit}
+Reserved for Upcoming Bookings: {item.reserved_quantity} {item.unit}
 Threshold: {item.threshold} {item.unit}
 Reorder Point: {item.reorder_point if item.reorder_point else 'Not set'}
 
@@ -0,0 +1,135 @@
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import threading
+import logging
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.workspace import Service
+from app.services.slot_locks import ACTIVE_STATUSES
+from app.services.resource_calendar import resource_calendar, to_naive_utc
+
+logger = logging.getLogger(__name__)
+
+# Resolved (service, timezone, date) slot lists kept in memory
+MAX_CACHED_DAYS = 4096
+
+# weekday (1=Monday .. 7=Sunday) -> sorted minute offsets from local midnight
+CompiledRules = Dict[int, Tuple[int, ...]]
+
+_compiled: Dict[str, Tuple[object, CompiledRules]] = {}
+_resolved: "OrderedDict[tuple, List[Tuple[int, datetime]]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def get_zone(tz_name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {tz_name!r}, falling back to UTC")
+        return ZoneInfo("UTC")
+
+def compile_rules(availability: Optional[list]) -> CompiledRules:
+    """Parse the Service.availability JSON once into minute offsets"""
+    compiled = {}
+    for rule in availability or []:
+        if not rule.get("enabled", False):
+            continue
+        minutes = set()
+        for slot in rule.get("slots", []):
+            try:
+                hour, minute = map(int, slot.split(":"))
+            except (AttributeError, ValueError):
+                logger.warning(f"Ignoring malformed availability slot {slot!r}")
+                continue
+            if 0 <= hour < 24 and 0 <= minute < 60:
+                minutes.add(hour * 60 + minute)
+        if minutes:
+            compiled[rule.get("day")] = tuple(sorted(minutes))
+    return compiled
+
+def _version(service: Service):
+    return service.updated_at or service.created_at
+
+def get_compiled_rules(service: Service) -> CompiledRules:
+    version = _version(service)
+    with _cache_lock:
+        cached = _compiled.get(service.id)
+        if cached and cached[0] == version:
+            return cached[1]
+    
+    compiled = compile_rules(service.availability)
+    with _cache_lock:
+        _compiled[service.id] = (version, compiled)
+    return compiled
+
+def resolve_slots(service: Service, tz_name: Optional[str], day: date) -> List[Tuple[int, datetime]]:
+    """(minute offset, naive UTC start) for each slot on a local calendar date.
+    
+    Wall-clock times skipped by a DST jump are dropped; repeated ones use
+    their first occurrence.
+    """
+    key = (service.id, _version(service), tz_name, day)
+    with _cache_lock:
+        if key in _resolved:
+            _resolved.move_to_end(key)
+            return _resolved[key]
+    
+    zone = get_zone(tz_name)
+    resolved = []
+    for offset in get_compiled_rules(service).get(day.isoweekday(), ()):
+        local = datetime.combine(day, time(offset // 60, offset % 60), tzinfo=zone)
+        utc = local.astimezone(timezone.utc)
+        if utc.astimezone(zone).replace(tzinfo=None) != local.replace(tzinfo=None):
+            continue  # does not exist on this date
+        resolved.append((offset, utc.replace(tzinfo=None)))
+    
+    with _cache_lock:
+        _resolved[key] = resolved
+        while len(_resolved) > MAX_CACHED_DAYS:
+            _resolved.popitem(last=False)
+    return resolved
+
+def local_today(tz_name: Optional[str]) -> date:
+    return datetime.now(get_zone(tz_name)).date()
+
+def open_slots(db: Session, service: Service, tz_name: Optional[str], day: date) -> List[dict]:
+    """Future, unbooked slots of a service on a local date"""
+    now = datetime.utcnow()
+    duration = timedelta(minutes=service.duration)
+    candidates = [
+        (offset, start) for offset, start in resolve_slots(service, tz_name, day) if start >= now
+    ]
+    if not candidates:
+        return []
+    
+    resources = [r for r in service.resources if r.is_active]
+    busy = []
+    if not resources:
+        # One range query for the whole day instead of one per slot
+        busy = [
+            (to_naive_utc(start), to_naive_utc(end))
+            for start, end in db.query(Booking.start_time, Booking.end_time).filter(
+                Booking.service_id == service.id,
+                Booking.status.in_(ACTIVE_STATUSES),
+                Booking.resource_scheduled == False,
+                Booking.start_time < candidates[-1][1] + duration,
+                Booking.end_time > candidates[0][1]
+            ).all()
+        ]
+    
+    slots = []
+    for offset, start in candidates:
+        end = start + duration
+        if resources:
+            free = resource_calendar.pick_free_resources(db, resources, start, end) is not None
+        else:
+            free = not any(b_start < end and b_end > start for b_start, b_end in busy)
+        if free:
+            slots.append({
+                "time": f"{offset // 60:02d}:{offset % 60:02d}",
+                "start_time": start.isoformat(),
+                "end_time": end.isoformat()
+            })
+    return slots
@@ -0,0 +1,331 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import threading
+import time as _time
+import uuid
+import logging
+from sqlalchemy import func, insert, update, or_, and_
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact, Conversation, Message, Broadcast
+from app.models.integration import Integration, IntegrationType, IntegrationProvider
+from app.services.email import send_sendgrid_batch, send_smtp_batch, SENDGRID_BATCH_SIZE
+from app.services.sms import send_twilio_batch
+
+logger = logging.getLogger(__name__)
+
+# Recipients handled per insert batch / per send batch
+RECIPIENT_CHUNK_SIZE = 1000
+SEND_BATCH_SIZE = 500
+
+# A "sending" broadcast with no progress for this long is taken over
+STALE_AFTER_SECONDS = 300
+
+# Sustained messages per second per workspace and provider. SendGrid counts
+# recipients, so one request for a full batch waits for that many tokens.
+PROVIDER_RATES = {
+    "sendgrid": 500,
+    "smtp": 10,
+    "twilio": 10,
+    "console": None,
+}
+
+class RateLimiter:
+    """Thread-safe token bucket; acquire() blocks until the rate allows it"""
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = _time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, count: int = 1):
+        with self._lock:
+            now = _time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Go into debt for big batches; later callers wait it off
+            wait = max(0.0, (min(count, self.rate) - self.tokens) / self.rate)
+            self.tokens -= count
+            if wait:
+                self.tokens += wait * self.rate
+                self.updated = now + wait
+        if wait:
+            _time.sleep(wait)
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(workspace_id: str, provider: str) -> Optional[RateLimiter]:
+    """Limiter shared by every broadcast of a workspace on one provider"""
+    rate = PROVIDER_RATES.get(provider)
+    if not rate:
+        return None
+    with _limiters_lock:
+        limiter = _limiters.get((workspace_id, provider))
+        if limiter is None:
+            limiter = _limiters[(workspace_id, provider)] = RateLimiter(rate)
+        return limiter
+
+def _address_column(channel: str):
+    return Contact.email if channel == "email" else func.coalesce(Contact.normalized_phone, Contact.phone)
+
+def _reachable(channel: str):
+    column = Contact.email if channel == "email" else Contact.phone
+    return (
+        Contact.is_active == True,
+        Contact.unsubscribed != True,
+        column != None,
+        column != ""
+    )
+
+def create_broadcast(
+    db: Session,
+    workspace_id: str,
+    user_id: Optional[str],
+    channel: str,
+    subject: Optional[str],
+    content: str,
+    segment: dict,
+    condition
+) -> Broadcast:
+    """Queue one outbound message per reachable contact matching condition.
+    
+    Conversations and messages are written with set-based inserts and one
+    counter UPDATE per chunk instead of per-recipient ORM work; sending is
+    left to run_broadcast.
+    """
+    now = datetime.utcnow()
+    broadcast = Broadcast(
+        workspace_id=workspace_id,
+        created_by_id=user_id,
+        channel=channel,
+        subject=subject,
+        content=content,
+        segment=segment,
+        status="queued",
+        total_recipients=0,
+        sent_count=0,
+        failed_count=0,
+        skipped_count=0
+    )
+    db.add(broadcast)
+    db.flush()
+    
+    matched = db.query(func.count(Contact.id)).filter(condition).scalar()
+    
+    total = 0
+    last_id = ""
+    while True:
+        contacts = db.query(Contact.id, Contact.name).filter(
+            condition,
+            *_reachable(channel),
+            Contact.id > last_id
+        ).order_by(Contact.id).limit(RECIPIENT_CHUNK_SIZE).all()
+        if not contacts:
+            break
+        last_id = contacts[-1].id
+        contact_ids = [c.id for c in contacts]
+        
+        conversations = dict(db.query(Conversation.contact_id, Conversation.id).filter(
+            Conversation.workspace_id == workspace_id,
+            Conversation.contact_id.in_(contact_ids),
+            Conversation.status == "active"
+        ).all())
+        
+        new_conversations = []
+        for contact in contacts:
+            if contact.id not in conversations:
+                conversations[contact.id] = str(uuid.uuid4())
+                new_conversations.append({
+                    "id": conversations[contact.id],
+                    "workspace_id": workspace_id,
+                    "contact_id": contact.id,
+                    "subject": subject or f"Conversation with {contact.name}",
+                    "status": "active",
+                    "message_count": 0,
+                    "awaiting_reply": False
+                })
+        if new_conversations:
+            db.execute(insert(Conversation.__table__), new_conversations)
+        
+        db.execute(insert(Message.__table__), [{
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversations[contact_id],
+            "broadcast_id": broadcast.id,
+            "content": content,
+            "channel": channel,
+            "direction": "outbound",
+            "status": "queued",
+            "automated": False,
+            "message_message_metadata": {"sent_by": user_id}
+        } for contact_id in contact_ids])
+        
+        # A broadcast doesn't answer anyone: awaiting_reply / awaiting_since stay as
+        # they were (conversations created above start out not waiting)
+        db.execute(
+            update(Conversation.__table__)
+            .where(Conversation.__table__.c.id.in_(list(conversations.values())))
+            .values(
+                message_count=func.coalesce(Conversation.__table__.c.message_count, 0) + 1,
+                last_message_at=now,
+                last_message_direction="outbound",
+                updated_at=now
+            )
+        )
+        total += len(contacts)
+    
+    broadcast.total_recipients = total
+    broadcast.skipped_count = matched - total
+    if not total:
+        broadcast.status = "completed"
+        broadcast.completed_at = now
+    return broadcast
+
+def _sender(db: Session, broadcast: Broadcast) -> Tuple[str, Callable[[List[str], Optional[RateLimiter]], Set[str]]]:
+    """(provider key, send(addresses, limiter) -> failed addresses) for a broadcast"""
+    integration = db.query(Integration).filter(
+        Integration.workspace_id == broadcast.workspace_id,
+        Integration.type == (IntegrationType.EMAIL if broadcast.channel == "email" else IntegrationType.SMS),
+        Integration.is_active == True
+    ).first()
+    provider = integration.provider if integration else None
+    credentials = (integration.credentials or {}) if integration else {}
+    subject = broadcast.subject or "Message"
+    
+    def per_message(limiter):
+        return limiter.acquire if limiter else None
+    
+    if broadcast.channel == "email" and provider == IntegrationProvider.SENDGRID:
+        def send(addresses, limiter):
+            failed = set()
+            for position in range(0, len(addresses), SENDGRID_BATCH_SIZE):
+                batch = addresses[position:position + SENDGRID_BATCH_SIZE]
+                if limiter:
+                    limiter.acquire(len(batch))
+                if not send_sendgrid_batch(batch, subject, broadcast.content, credentials.get("from_email")):
+                    failed.update(batch)
+            return failed
+        return "sendgrid", send
+    
+    if broadcast.channel == "email" and provider == IntegrationProvider.SMTP:
+        return "smtp", lambda addresses, limiter: send_smtp_batch(
+            addresses, subject, broadcast.content, credentials, before_send=per_message(limiter)
+        )
+    
+    if broadcast.channel == "sms" and provider == IntegrationProvider.TWILIO:
+        return "twilio", lambda addresses, limiter: send_twilio_batch(
+            addresses, broadcast.content,
+            from_number=credentials.get("from_number"),
+            account_sid=credentials.get("account_sid"),
+            auth_token=credentials.get("auth_token"),
+            before_send=per_message(limiter)
+        )
+    
+    def log_only(addresses, limiter):
+        # Log for development, like send_email / send_sms without a provider
+        logger.info(f"[{broadcast.channel.upper()} BROADCAST] {len(addresses)} recipients | {broadcast.content[:100]}")
+        return set()
+    return "console", log_only
+
+def _record_results(db: Session, broadcast_id: str, rows, failed: Set[str]):
+    now = datetime.utcnow()
+    sent_ids = [r.id for r in rows if r.address not in failed]
+    failed_ids = [r.id for r in rows if r.address in failed]
+    
+    if sent_ids:
+        db.execute(update(Message).where(Message.id.in_(sent_ids)).values(status="sent"))
+        db.execute(
+            update(Contact)
+            .where(Contact.id.in_({r.contact_id for r in rows if r.address not in failed}))
+            .values(last_contacted=now)
+        )
+    if failed_ids:
+        db.execute(update(Message).where(Message.id.in_(failed_ids)).values(status="failed"))
+    db.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values(
+        sent_count=Broadcast.sent_count + len(sent_ids),
+        failed_count=Broadcast.failed_count + len(failed_ids),
+        updated_at=now
+    ))
+    db.commit()
+
+def _claim(db: Session, broadcast: Broadcast) -> bool:
+    """Compare-and-set on (status, updated_at), so only one worker sends a broadcast"""
+    observed = broadcast.updated_at
+    now = datetime.utcnow()
+    claimed = db.execute(update(Broadcast).where(
+        Broadcast.id == broadcast.id,
+        Broadcast.status == broadcast.status,
+        Broadcast.updated_at == observed if observed is not None else Broadcast.updated_at == None
+    ).values(
+        status="sending",
+        started_at=broadcast.started_at or now,
+        updated_at=now
+    ).execution_options(synchronize_session=False)).rowcount
+    db.commit()
+    return bool(claimed)
+
+def run_broadcast(broadcast_id: str):
+    """Send a broadcast's queued messages in rate-limited batches.
+    
+    Progress is committed after every batch, and only queued messages are
+    picked up, so an interrupted broadcast can simply be run again.
+    """
+    from app.config import SessionLocal
+    db = SessionLocal()
+    try:
+        broadcast = db.query(Broadcast).filter(Broadcast.id == broadcast_id).first()
+        if not broadcast or broadcast.status in ("completed", "failed") or not _claim(db, broadcast):
+            return
+        db.refresh(broadcast)
+        
+        provider, send = _sender(db, broadcast)
+        limiter = get_rate_limiter(broadcast.workspace_id, provider)
+        
+        last_id = ""
+        while True:
+            rows = db.query(
+                Message.id,
+                Contact.id.label("contact_id"),
+                _address_column(broadcast.channel).label("address")
+            ).join(Conversation, Message.conversation_id == Conversation.id).join(
+                Contact, Conversation.contact_id == Contact.id
+            ).filter(
+                Message.broadcast_id == broadcast_id,
+                Message.status == "queued",
+                Message.id > last_id
+            ).order_by(Message.id).limit(SEND_BATCH_SIZE).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            failed = send(list(dict.fromkeys(r.address for r in rows)), limiter)
+            _record_results(db, broadcast_id, rows, failed)
+        
+        broadcast.status = "completed"
+        broadcast.completed_at = broadcast.updated_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error sending broadcast {broadcast_id}: {str(e)}")
+        db.execute(update(Broadcast).where(Broadcast.id == broadcast_id).values(status="failed", error=str(e)))
+        db.commit()
+    finally:
+        db.close()
+
+def resume_broadcasts():
+    """Finish broadcasts interrupted by a restart, for running outside a request"""
+    from app.config import SessionLocal
+    db = SessionLocal()
+    try:
+        # A broadcast still sending elsewhere updates its row after every batch
+        stale = datetime.utcnow() - timedelta(seconds=STALE_AFTER_SECONDS)
+        pending = [row.id for row in db.query(Broadcast.id).filter(or_(
+            Broadcast.status == "queued",
+            and_(Broadcast.status == "sending", func.coalesce(Broadcast.updated_at, Broadcast.started_at) < stale)
+        )).order_by(Broadcast.created_at).all()]
+    finally:
+        db.close()
+    
+    for broadcast_id in pending:
+        run_broadcast(broadcast_id)
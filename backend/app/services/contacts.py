@@ -0,0 +1,534 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import uuid
+import json
+import math
+import logging
+from sqlalchemy import func, or_, event, delete, insert, String, cast
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, attributes
+
+from app.models.contact import Contact, ContactTag, ContactFieldValue, Conversation
+from app.models.booking import Booking, BookingSeries
+from app.models.form import FormSubmission
+from app.services.jobs import run_job
+from app.utils.helpers import normalize_email, normalize_phone, normalize_tag
+
+logger = logging.getLogger(__name__)
+
+# Contacts examined per transaction by the merge job
+MERGE_BATCH_SIZE = 500
+
+# Tables whose contact_id follows a contact into the one it is merged into
+CONTACT_REFERENCES = (Booking, BookingSeries, Conversation, FormSubmission)
+
+def _find_matches(
+    db: Session,
+    workspace_id: str,
+    email: Optional[str],
+    phone: Optional[str]
+) -> Tuple[Optional[Contact], Optional[Contact]]:
+    """(contact owning the email, contact owning the phone), from one query"""
+    conditions = []
+    if email:
+        conditions.append(Contact.normalized_email == email)
+    if phone:
+        conditions.append(Contact.normalized_phone == phone)
+    if not conditions:
+        return None, None
+    
+    by_email = by_phone = None
+    for contact in db.query(Contact).filter(
+        Contact.workspace_id == workspace_id,
+        or_(*conditions)
+    ).all():
+        if email and contact.normalized_email == email:
+            by_email = contact
+        if phone and contact.normalized_phone == phone:
+            by_phone = contact
+    return by_email, by_phone
+
+def find_or_create_contact(
+    db: Session,
+    workspace_id: str,
+    name: str,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+    source: Optional[str] = None
+) -> Tuple[Contact, bool]:
+    """Return (contact, created) for an email/phone, matched after normalization.
+    
+    An email match wins over a phone match. Missing email/phone is filled in
+    on the existing contact when no other contact owns it. The insert runs
+    in a savepoint, so a concurrent request creating the same contact is
+    resolved by re-reading the winner instead of failing.
+    """
+    normalized_email, normalized_phone = normalize_email(email), normalize_phone(phone)
+    
+    for _ in range(2):
+        by_email, by_phone = _find_matches(db, workspace_id, normalized_email, normalized_phone)
+        contact = by_email or by_phone
+        
+        if contact:
+            if normalized_email and not contact.normalized_email:
+                contact.email = email
+            if normalized_phone and not contact.normalized_phone and by_phone is None:
+                contact.phone = phone
+            return contact, False
+        
+        try:
+            with db.begin_nested():
+                contact = Contact(
+                    workspace_id=workspace_id,
+                    name=name,
+                    email=email,
+                    phone=phone,
+                    source=source
+                )
+                db.add(contact)
+            return contact, True
+        except IntegrityError:
+            logger.info(f"Contact for {normalized_email or normalized_phone} created concurrently, re-reading")
+    
+    raise RuntimeError("Could not find or create contact")
+
+def _merge_into(db: Session, survivor: Contact, duplicate: Contact):
+    """Move everything from duplicate onto survivor and delete duplicate"""
+    for model in CONTACT_REFERENCES:
+        db.query(model).filter(model.contact_id == duplicate.id).update(
+            {model.contact_id: survivor.id},
+            synchronize_session=False
+        )
+    
+    survivor.tags = merge_tags(survivor.tags, duplicate.tags)
+    survivor.custom_fields = {**(duplicate.custom_fields or {}), **(survivor.custom_fields or {})}
+    survivor.unsubscribed = bool(survivor.unsubscribed or duplicate.unsubscribed)
+    if duplicate.last_contacted and (not survivor.last_contacted or duplicate.last_contacted > survivor.last_contacted):
+        survivor.last_contacted = duplicate.last_contacted
+    
+    email, phone = duplicate.email, duplicate.phone
+    # Children were moved above; don't let the ORM null out a stale copy of them
+    db.expire(duplicate, ["bookings", "conversations", "form_submissions"])
+    db.delete(duplicate)
+    db.flush()  # release the duplicate's unique keys first
+    
+    if email and not survivor.normalized_email:
+        survivor.email = email
+    if phone and not survivor.normalized_phone:
+        survivor.phone = phone
+
+def _backfill_batch(db: Session, after_id: str, batch_size: int) -> Tuple[Optional[str], int, int]:
+    """Fill normalized keys on rows created before they existed, merging collisions.
+    
+    Walks contacts by id so unparseable values (left NULL) aren't revisited.
+    Returns the last id seen, or None when done.
+    """
+    contacts = db.query(Contact).filter(
+        Contact.id > after_id,
+        or_(
+            (Contact.email != None) & (Contact.normalized_email == None),
+            (Contact.phone != None) & (Contact.normalized_phone == None)
+        )
+    ).order_by(Contact.id).limit(batch_size).all()
+    if not contacts:
+        return None, 0, 0
+    
+    last_id = contacts[-1].id
+    updated = merged = 0
+    for contact in contacts:
+        email, phone = normalize_email(contact.email), normalize_phone(contact.phone)
+        by_email, by_phone = _find_matches(db, contact.workspace_id, email, phone)
+        
+        # Whoever already holds the key keeps it; this contact is merged in
+        owner = next((c for c in (by_email, by_phone) if c is not None and c.id != contact.id), None)
+        if owner is not None:
+            _merge_into(db, owner, contact)
+            merged += 1
+        else:
+            contact.normalized_email = email
+            contact.normalized_phone = phone
+            db.flush()  # later rows in the batch must see these keys
+            updated += 1
+    
+    db.commit()
+    return last_id, updated, merged
+
+def _merge_groups(db: Session, column) -> int:
+    """Merge contacts sharing a normalized key (only possible without the unique index)"""
+    merged = 0
+    groups = db.query(Contact.workspace_id, column).filter(
+        column != None
+    ).group_by(Contact.workspace_id, column).having(func.count(Contact.id) > 1).all()
+    
+    for workspace_id, key in groups:
+        contacts = db.query(Contact).filter(
+            Contact.workspace_id == workspace_id,
+            column == key
+        ).order_by(Contact.created_at, Contact.id).all()
+        for duplicate in contacts[1:]:
+            _merge_into(db, contacts[0], duplicate)
+            merged += 1
+        db.commit()
+    return merged
+
+def merge_duplicate_contacts(db: Session, batch_size: int = MERGE_BATCH_SIZE) -> Dict[str, int]:
+    """Backfill normalized keys and merge duplicate contacts, in small transactions"""
+    stats = {"normalized": 0, "merged": 0}
+    
+    last_id = ""
+    while last_id is not None:
+        last_id, updated, merged = _backfill_batch(db, last_id, batch_size)
+        stats["normalized"] += updated
+        stats["merged"] += merged
+    
+    stats["merged"] += _merge_groups(db, Contact.normalized_email)
+    stats["merged"] += _merge_groups(db, Contact.normalized_phone)
+    
+    if stats["normalized"] or stats["merged"]:
+        logger.info(f"Contact dedup: {stats['normalized']} normalized, {stats['merged']} merged")
+    return stats
+
+def merge_tags(*tag_lists: Optional[Iterable]) -> List[str]:
+    """Concatenate tag lists, dropping blanks and case/space variants of earlier tags"""
+    merged = {}
+    for tags in tag_lists:
+        for tag in tags or []:
+            key = normalize_tag(tag)
+            if key and key not in merged:
+                merged[key] = str(tag).strip()
+    return list(merged.values())
+
+def tag_rows(contact_id: str, workspace_id: str, tags: Optional[Iterable]) -> List[dict]:
+    """contact_tags rows for a tag list (normalized, de-duplicated)"""
+    keys = dict.fromkeys(filter(None, (normalize_tag(tag) for tag in tags or [])))
+    return [{"contact_id": contact_id, "workspace_id": workspace_id, "tag": tag} for tag in keys]
+
+def replace_tag_rows(connection, contacts: List[Tuple[str, str, Optional[Iterable]]]):
+    """Rewrite contact_tags for (contact_id, workspace_id, tags) triples"""
+    table = ContactTag.__table__
+    ids = [contact_id for contact_id, _, _ in contacts]
+    for position in range(0, len(ids), MERGE_BATCH_SIZE):
+        connection.execute(delete(table).where(table.c.contact_id.in_(ids[position:position + MERGE_BATCH_SIZE])))
+    
+    rows = [row for contact_id, workspace_id, tags in contacts for row in tag_rows(contact_id, workspace_id, tags)]
+    if rows:
+        connection.execute(insert(table), rows)
+
+def field_value(value) -> Tuple[Optional[str], Optional[float]]:
+    """(lowercased text, number) a custom field value is indexed and compared by"""
+    if value is None:
+        return None, None
+    if isinstance(value, bool):
+        return ("true" if value else "false"), None
+    if isinstance(value, (int, float)):
+        return str(value).lower(), float(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, sort_keys=True).lower(), None
+    
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        number = None
+    if number is not None and not math.isfinite(number):
+        number = None
+    return text.lower(), number
+
+def field_rows(contact_id: str, workspace_id: str, custom_fields: Optional[dict]) -> List[dict]:
+    """contact_field_values rows for a custom_fields dict (keys folded like tags)"""
+    rows = {}
+    for key, value in (custom_fields or {}).items():
+        field = normalize_tag(key)
+        if not field or value is None or field in rows:
+            continue
+        text, number = field_value(value)
+        rows[field] = {
+            "contact_id": contact_id,
+            "workspace_id": workspace_id,
+            "field": field,
+            "value_text": text,
+            "value_number": number
+        }
+    return list(rows.values())
+
+def replace_field_rows(connection, contacts: List[Tuple[str, str, Optional[dict]]]):
+    """Rewrite contact_field_values for (contact_id, workspace_id, custom_fields) triples"""
+    table = ContactFieldValue.__table__
+    ids = [contact_id for contact_id, _, _ in contacts]
+    for position in range(0, len(ids), MERGE_BATCH_SIZE):
+        connection.execute(delete(table).where(table.c.contact_id.in_(ids[position:position + MERGE_BATCH_SIZE])))
+    
+    rows = [row for contact_id, workspace_id, fields in contacts for row in field_rows(contact_id, workspace_id, fields)]
+    if rows:
+        connection.execute(insert(table), rows)
+
+@event.listens_for(Session, "after_flush")
+def _sync_contact_indexes(session, flush_context):
+    """Keep contact_tags / contact_field_values in step with Contact within the same transaction"""
+    tags, fields = [], []
+    for obj in session.new:
+        if isinstance(obj, Contact):
+            tags.append((obj.id, obj.workspace_id, obj.tags))
+            fields.append((obj.id, obj.workspace_id, obj.custom_fields))
+    for obj in session.dirty:
+        if not isinstance(obj, Contact):
+            continue
+        if attributes.get_history(obj, "tags").has_changes():
+            tags.append((obj.id, obj.workspace_id, obj.tags))
+        if attributes.get_history(obj, "custom_fields").has_changes():
+            fields.append((obj.id, obj.workspace_id, obj.custom_fields))
+    for obj in session.deleted:
+        if isinstance(obj, Contact):
+            tags.append((obj.id, obj.workspace_id, None))
+            fields.append((obj.id, obj.workspace_id, None))
+    
+    if tags:
+        replace_tag_rows(session.connection(), tags)
+    if fields:
+        replace_field_rows(session.connection(), fields)
+
+def _backfill_index(db: Session, column, index_model, replace, batch_size: int) -> int:
+    backfilled = 0
+    last_id = ""
+    while True:
+        contacts = db.query(Contact.id, Contact.workspace_id, column).filter(
+            Contact.id > last_id,
+            column != None,
+            cast(column, String).notin_(["[]", "{}", "null"]),
+            ~Contact.id.in_(db.query(index_model.contact_id))
+        ).order_by(Contact.id).limit(batch_size).all()
+        if not contacts:
+            return backfilled
+        
+        replace(db.connection(), [tuple(row) for row in contacts])
+        db.commit()
+        backfilled += len(contacts)
+        last_id = contacts[-1][0]
+
+def backfill_contact_tags(db: Session, batch_size: int = MERGE_BATCH_SIZE) -> int:
+    """Create missing contact_tags rows for contacts tagged before the table existed"""
+    return _backfill_index(db, Contact.tags, ContactTag, replace_tag_rows, batch_size)
+
+def backfill_contact_fields(db: Session, batch_size: int = MERGE_BATCH_SIZE) -> int:
+    """Create missing contact_field_values rows for contacts saved before the table existed"""
+    return _backfill_index(db, Contact.custom_fields, ContactFieldValue, replace_field_rows, batch_size)
+
+def _contact_maintenance(db: Session) -> dict:
+    """Merge duplicates, then fill the tag and custom field indexes"""
+    stats = merge_duplicate_contacts(db)
+    stats["tagged"] = backfill_contact_tags(db)
+    stats["fields_indexed"] = backfill_contact_fields(db)
+    return stats
+
+def run_contact_maintenance_job():
+    """Dedup and index backfill, for running outside a request"""
+    return run_job(_contact_maintenance, None, "Error in contact maintenance job")
+
+# Rows handled per transaction by bulk import
+IMPORT_BATCH_SIZE = 1000
+
+def _merge_import_row(target: dict, row: dict, by_key: Dict[str, dict]):
+    """Fold a later duplicate row from the same file into the first one's copy.
+    
+    An email/phone another row of the batch already claims is left out, so
+    the batch never inserts two contacts with the same key.
+    """
+    for field, prefix in (("email", "e"), ("phone", "p")):
+        normalized = row[f"normalized_{field}"]
+        if target[field] or not row[field]:
+            continue
+        if normalized and by_key.get(f"{prefix}:{normalized}", target) is not target:
+            continue
+        target[field] = row[field]
+        target[f"normalized_{field}"] = normalized
+    target["tags"] = merge_tags(target["tags"], row["tags"])
+    target["custom_fields"] = {**target["custom_fields"], **row["custom_fields"]}
+
+def _folded_error(row: dict, normalized_email: Optional[str], normalized_phone: Optional[str]) -> Optional[dict]:
+    """Error entry for a row whose email/phone ended up on a different contact"""
+    dropped = [
+        row[field] for field, kept in (("email", normalized_email), ("phone", normalized_phone))
+        if row[f"normalized_{field}"] and row[f"normalized_{field}"] != kept
+    ]
+    if not dropped:
+        return None
+    return {"row": row["row"], "error": f"Merged into another contact; {', '.join(dropped)} not saved"}
+
+def _import_batch(db: Session, workspace_id: str, rows: List[dict], update_existing: bool) -> dict:
+    # Collapse duplicates inside the batch first, merging into copies so the
+    # caller's rows stay intact for the row-by-row fallback
+    unique: List[dict] = []
+    by_key: Dict[str, dict] = {}
+    folded: List[Tuple[dict, dict]] = []
+    for row in rows:
+        keys = []
+        if row["normalized_email"]:
+            keys.append(f"e:{row['normalized_email']}")
+        if row["normalized_phone"]:
+            keys.append(f"p:{row['normalized_phone']}")
+        target = next((by_key[k] for k in keys if k in by_key), None)
+        if target is None:
+            target = dict(row)
+            unique.append(target)
+        else:
+            _merge_import_row(target, row, by_key)
+            folded.append((row, target))
+        for key in keys:
+            by_key.setdefault(key, target)
+    
+    errors = []
+    for row, target in folded:
+        error = _folded_error(row, target["normalized_email"], target["normalized_phone"])
+        if error:
+            errors.append(error)
+    
+    # One query finds every existing contact the batch refers to
+    emails = {r["normalized_email"] for r in unique if r["normalized_email"]}
+    phones = {r["normalized_phone"] for r in unique if r["normalized_phone"]}
+    existing_by_email: Dict[str, Contact] = {}
+    existing_by_phone: Dict[str, Contact] = {}
+    if emails or phones:
+        conditions = []
+        if emails:
+            conditions.append(Contact.normalized_email.in_(emails))
+        if phones:
+            conditions.append(Contact.normalized_phone.in_(phones))
+        for contact in db.query(Contact).filter(Contact.workspace_id == workspace_id, or_(*conditions)).all():
+            if contact.normalized_email:
+                existing_by_email[contact.normalized_email] = contact
+            if contact.normalized_phone:
+                existing_by_phone[contact.normalized_phone] = contact
+    
+    stats = {"created": 0, "updated": 0, "unchanged": 0, "errors": errors}
+    new_rows = []
+    for row in unique:
+        contact = existing_by_email.get(row["normalized_email"]) or existing_by_phone.get(row["normalized_phone"])
+        if contact is None:
+            new_rows.append(row)
+            continue
+        if not update_existing:
+            stats["unchanged"] += 1
+            continue
+        
+        if row["email"] and not contact.normalized_email and row["normalized_email"] not in existing_by_email:
+            contact.email = row["email"]
+        if row["phone"] and not contact.normalized_phone and row["normalized_phone"] not in existing_by_phone:
+            contact.phone = row["phone"]
+        tags = merge_tags(contact.tags, row["tags"])
+        if tags != (contact.tags or []):
+            contact.tags = tags
+        if row["custom_fields"]:
+            contact.custom_fields = {**(contact.custom_fields or {}), **row["custom_fields"]}
+        stats["updated" if db.is_modified(contact) else "unchanged"] += 1
+        error = _folded_error(row, contact.normalized_email, contact.normalized_phone)
+        if error:
+            errors.append(error)
+    db.flush()
+    
+    if new_rows:
+        records = [{
+            "id": str(uuid.uuid4()),
+            "workspace_id": workspace_id,
+            "name": row["name"],
+            "email": row["email"],
+            "phone": row["phone"],
+            "normalized_email": row["normalized_email"],
+            "normalized_phone": row["normalized_phone"],
+            "source": "import",
+            "tags": row["tags"],
+            "custom_fields": row["custom_fields"],
+            "is_active": True,
+            "unsubscribed": False
+        } for row in new_rows]
+        db.execute(insert(Contact.__table__), records)
+        replace_tag_rows(db.connection(), [(r["id"], workspace_id, r["tags"]) for r in records])
+        replace_field_rows(db.connection(), [(r["id"], workspace_id, r["custom_fields"]) for r in records])
+        stats["created"] = len(records)
+    
+    return stats
+
+def prepare_import_row(raw: dict) -> dict:
+    """Normalize one imported record; raises ValueError when it can't be used"""
+    email = (raw.get("email") or "").strip() or None
+    phone = (str(raw.get("phone") or "")).strip() or None
+    name = (raw.get("name") or "").strip() or email or phone
+    if not (email or phone):
+        raise ValueError("Row needs an email or phone")
+    
+    tags = raw.get("tags") or []
+    if isinstance(tags, str):
+        tags = [t.strip() for t in tags.replace(";", ",").split(",")]
+    custom_fields = raw.get("custom_fields")
+    if not isinstance(custom_fields, dict):
+        custom_fields = {}
+    
+    return {
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "normalized_email": normalize_email(email),
+        "normalized_phone": normalize_phone(phone),
+        "tags": merge_tags(tags),
+        "custom_fields": custom_fields
+    }
+
+def import_contacts(
+    db: Session,
+    workspace_id: str,
+    records: Iterable[dict],
+    update_existing: bool = True,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    max_errors: int = 100
+) -> dict:
+    """Import records in batches, deduplicating against the file and the workspace.
+    
+    records is consumed lazily, so memory stays flat however large the
+    upload is. Each batch commits on its own; if a concurrent write wins a
+    unique key mid-batch, that batch is redone one row at a time. Rows whose
+    email or phone belongs to another contact are merged into it and
+    reported in errors.
+    """
+    stats = {"processed": 0, "created": 0, "updated": 0, "unchanged": 0, "skipped": 0, "errors": []}
+    
+    def report(errors: List[dict]):
+        stats["errors"].extend(errors[:max(0, max_errors - len(stats["errors"]))])
+    
+    def flush(batch: List[dict]):
+        try:
+            result = _import_batch(db, workspace_id, batch, update_existing)
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            result = {"created": 0, "updated": 0, "unchanged": 0, "errors": []}
+            for row in batch:
+                try:
+                    with db.begin_nested():
+                        row_result = _import_batch(db, workspace_id, [row], update_existing)
+                except IntegrityError:
+                    stats["skipped"] += 1
+                    result["errors"].append({"row": row["row"], "error": "Conflicts with a contact saved at the same time"})
+                    continue
+                for key, value in row_result.items():
+                    result[key] += value
+            db.commit()
+        report(result.pop("errors"))
+        for key, value in result.items():
+            stats[key] += value
+    
+    batch = []
+    for line_number, raw in enumerate(records, start=1):
+        stats["processed"] += 1
+        try:
+            row = prepare_import_row(raw)
+        except (ValueError, AttributeError, TypeError) as e:
+            stats["skipped"] += 1
+            report([{"row": line_number, "error": str(e)}])
+            continue
+        row["row"] = line_number
+        batch.append(row)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    
+    return stats
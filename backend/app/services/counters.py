@@ -0,0 +1,25 @@
+from sqlalchemy import Table, update, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+def increment(connection, table: Table, keys: dict, amounts: dict):
+    """Add amounts to the counter row at keys, creating it when missing.
+    
+    One upsert on PostgreSQL/SQLite, so concurrent writers never lose an
+    increment; other dialects update first and insert if nothing matched.
+    """
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        upsert = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table).values(**keys, **amounts)
+        connection.execute(upsert.on_conflict_do_update(
+            index_elements=[table.c[name] for name in keys],
+            set_={name: table.c[name] + amount for name, amount in amounts.items()}
+        ))
+        return
+    
+    updated = connection.execute(
+        update(table).where(*(table.c[name] == value for name, value in keys.items())).values(
+            **{name: table.c[name] + amount for name, amount in amounts.items()}
+        )
+    ).rowcount
+    if not updated:
+        connection.execute(insert(table).values(**keys, **amounts))
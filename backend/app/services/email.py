@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional, Set
 import logging
 from app.config import settings
 from app.models.workspace import Workspace
@@ -244,6 +244,88 @@ async def send_sendgrid_email(to: str, subject: str, body: str, from_email: str,
     except Exception as e:
         logger.error(f"SendGrid error: {str(e)}")
 
+# Recipients SendGrid accepts in one request (personalizations limit)
+SENDGRID_BATCH_SIZE = 1000
+
+def send_sendgrid_batch(recipients: List[str], subject: str, body: str, from_email: str) -> bool:
+    """Send one email to many addresses in a single SendGrid request.
+    
+    Each address gets its own personalization, so recipients don't see
+    each other. Returns False when the request failed as a whole.
+    """
+    try:
+        import sendgrid
+        from sendgrid.helpers.mail import Mail, Email, To, Personalization
+    except ImportError:
+        logger.warning("SendGrid not installed. Using console logging.")
+        logger.info(f"[SENDGRID] {len(recipients)} recipients | Subject: {subject}")
+        return True
+    
+    try:
+        sg = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
+        mail = Mail(
+            from_email=Email(from_email or "noreply@careops.com"),
+            subject=subject,
+            plain_text_content=body,
+            html_content=body.replace("\n", "<br>")
+        )
+        for address in recipients:
+            personalization = Personalization()
+            personalization.add_to(To(address))
+            mail.add_personalization(personalization)
+        
+        response = sg.send(mail)
+        logger.info(f"SendGrid batch response: {response.status_code} ({len(recipients)} recipients)")
+        return 200 <= response.status_code < 300
+    except Exception as e:
+        logger.error(f"SendGrid batch error: {str(e)}")
+        return False
+
+def send_smtp_batch(recipients: List[str], subject: str, body: str, config: dict, before_send=None) -> Set[str]:
+    """Send one email to many addresses over a single SMTP connection.
+    
+    before_send() is called ahead of every message (rate limiting).
+    Returns the addresses that could not be sent.
+    """
+    import smtplib
+    from email.mime.text import MIMEText
+    
+    failed = set()
+    try:
+        server = smtplib.SMTP(config.get('host', 'smtp.gmail.com'), config.get('port', 587))
+        server.starttls()
+        if config.get('username') and config.get('password'):
+            server.login(config.get('username'), config.get('password'))
+    except Exception as e:
+        logger.error(f"SMTP error: {str(e)}")
+        return set(recipients)
+    
+    try:
+        for address in recipients:
+            if before_send:
+                before_send()
+            msg = MIMEText(body, 'plain')
+            msg['From'] = config.get('from_email', 'noreply@careops.com')
+            msg['To'] = address
+            msg['Subject'] = subject
+            try:
+                server.send_message(msg)
+            except smtplib.SMTPServerDisconnected:
+                # The rest of the batch can't go out on this connection
+                failed.update(recipients[recipients.index(address):])
+                break
+            except smtplib.SMTPException as e:
+                logger.error(f"SMTP error for {address}: {str(e)}")
+                failed.add(address)
+    finally:
+        try:
+            server.quit()
+        except Exception:
+            pass
+    
+    logger.info(f"SMTP batch sent {len(recipients) - len(failed)}/{len(recipients)}")
+    return failed
+
 async def send_smtp_email(to: str, subject: str, body: str, config: dict):
     """Send email via SMTP"""
     try:
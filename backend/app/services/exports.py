@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+import csv
+import enum
+import io
+import json
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Query, Session
+
+from app.config import SessionLocal
+from app.utils.serialization import dumps
+
+# Rows fetched per round trip when streaming an export
+EXPORT_CHUNK_SIZE = 1000
+
+# Bytes buffered before a chunk is handed to the client
+FLUSH_BYTES = 64 * 1024
+
+EXPORT_FORMATS = "^(csv|ndjson)$"
+
+# Prefix of form field keys in a submission record, so a field id can never
+# shadow one of the submission's own columns
+FIELD_KEY_PREFIX = "field."
+
+def csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(v) for v in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+def stream_query(build_query: Callable[[Session], Query]) -> Iterator[Any]:
+    """Rows of build_query(db), fetched EXPORT_CHUNK_SIZE at a time from a session of their own.
+    
+    The request's session is closed before a streamed body is sent, so an
+    export builds its query against this one instead.
+    """
+    db = SessionLocal()
+    try:
+        yield from build_query(db).yield_per(EXPORT_CHUNK_SIZE)
+    finally:
+        db.close()
+
+def stream_records(
+    records: Iterable[dict],
+    columns: Sequence[str],
+    format: str,
+    headers: Optional[Sequence[str]] = None
+) -> Iterator[bytes]:
+    """Encode records as CSV (with a header row) or NDJSON in ~64 KB chunks, as they arrive"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if format == "csv" else None
+    if writer:
+        writer.writerow(headers or columns)
+    
+    for record in records:
+        if writer:
+            writer.writerow([csv_cell(record.get(key)) for key in columns])
+        else:
+            buffer.write(dumps({key: record.get(key) for key in columns}).decode("utf-8"))
+            buffer.write("\n")
+        if buffer.tell() > FLUSH_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue().encode("utf-8")
+
+def export_response(chunks: Iterator[bytes], format: str, filename: str) -> StreamingResponse:
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
+
+def form_columns(fields: Optional[list]) -> List[Tuple[str, str]]:
+    """(data key, header label) per form field, in form order"""
+    columns = []
+    for field in fields or []:
+        key = field.get("id") or field.get("field_id")
+        if key and key not in {k for k, _ in columns}:
+            columns.append((key, field.get("label") or key))
+    return columns
+
+def field_key(field_id: str) -> str:
+    return f"{FIELD_KEY_PREFIX}{field_id}"
+
+def flatten_submission(data: Optional[dict], field_ids: List[str]) -> dict:
+    """One field.<id> key per form field, taken from a submission's data; answers to removed fields are dropped"""
+    data = data or {}
+    return {field_key(field_id): data.get(field_id) for field_id in field_ids}
@@ -0,0 +1,197 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import logging
+from sqlalchemy import event, insert, select, delete
+from sqlalchemy.orm import Session, attributes
+
+from app.models.form import Form, FormSubmission, FormStats, FormFieldCount
+from app.services.counters import increment
+from app.services.jobs import run_job
+
+logger = logging.getLogger(__name__)
+
+# Field types whose answers are counted per option
+CHOICE_TYPES = ("select", "radio", "checkbox")
+
+# Longer answers are cut before being counted (and stored as a key)
+MAX_VALUE_LENGTH = 200
+
+def choice_fields(fields: Optional[list]) -> List[dict]:
+    return [
+        field for field in fields or []
+        if (field.get("type") or field.get("field_type")) in CHOICE_TYPES and (field.get("id") or field.get("field_id"))
+    ]
+
+def _field_id(field: dict) -> str:
+    return field.get("id") or field.get("field_id")
+
+def _choice_values(value) -> List[str]:
+    """Counted keys of one answer: each picked option, or true/false for a lone checkbox"""
+    if value is None or value == "":
+        return []
+    values = value if isinstance(value, (list, tuple)) else [value]
+    keys = []
+    for v in values:
+        if isinstance(v, bool):
+            keys.append("true" if v else "false")
+        elif v is not None and v != "":
+            keys.append(str(v)[:MAX_VALUE_LENGTH])
+    return list(dict.fromkeys(keys))
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _completion_counts(fields: Optional[list], data: Optional[dict]) -> Counter:
+    counts = Counter()
+    data = data or {}
+    for field in choice_fields(fields):
+        for value in _choice_values(data.get(_field_id(field))):
+            counts[(_field_id(field), value)] += 1
+    return counts
+
+def _apply(connection, form_id: str, sent: int, completed: int, seconds: float, counts: Counter):
+    increment(
+        connection, FormStats.__table__,
+        {"form_id": form_id},
+        {"sent_count": sent, "completed_count": completed, "completion_seconds": seconds}
+    )
+    for (field_id, value), count in sorted(counts.items()):
+        increment(
+            connection, FormFieldCount.__table__,
+            {"form_id": form_id, "field_id": field_id, "value": value},
+            {"count": count}
+        )
+
+def count_sent(connection, sent_by_form: Dict[str, int]):
+    """Count submissions created outside the ORM (bulk inserts)"""
+    for form_id, sent in sorted(sent_by_form.items()):
+        if sent:
+            _apply(connection, form_id, sent, 0, 0.0, Counter())
+
+@event.listens_for(Session, "after_flush")
+def _count_submissions(session, flush_context):
+    """Add sent / completed submissions to the form's running totals in the same transaction"""
+    sent: Counter = Counter()
+    completed: List[FormSubmission] = []
+    for obj in session.new:
+        if isinstance(obj, FormSubmission):
+            sent[obj.form_id] += 1
+            if obj.completed_at is not None:
+                completed.append(obj)
+    for obj in session.dirty:
+        if isinstance(obj, FormSubmission):
+            history = attributes.get_history(obj, "completed_at")
+            if history.added and history.added[0] is not None and not any(history.deleted):
+                completed.append(obj)
+    if not sent and not completed:
+        return
+    
+    connection = session.connection()
+    fields = dict(connection.execute(
+        select(Form.id, Form.fields).where(Form.id.in_({s.form_id for s in completed}))
+    ).all()) if completed else {}
+    
+    totals: Dict[str, Tuple[int, int, float, Counter]] = {
+        form_id: (count, 0, 0.0, Counter()) for form_id, count in sent.items()
+    }
+    for submission in completed:
+        sent_count, completed_count, seconds, counts = totals.get(submission.form_id, (0, 0, 0.0, Counter()))
+        sent_at = _naive(submission.sent_at) or _naive(submission.completed_at)
+        elapsed = max(0.0, (_naive(submission.completed_at) - sent_at).total_seconds())
+        totals[submission.form_id] = (
+            sent_count, completed_count + 1, seconds + elapsed,
+            counts + _completion_counts(fields.get(submission.form_id), submission.data)
+        )
+    for form_id, (sent_count, completed_count, seconds, counts) in sorted(totals.items()):
+        _apply(connection, form_id, sent_count, completed_count, seconds, counts)
+
+def rebuild_form_stats(db: Session, form: Form):
+    """Recount one form's totals from its submissions (for forms that predate the tables)"""
+    connection = db.connection()
+    connection.execute(delete(FormStats.__table__).where(FormStats.form_id == form.id))
+    connection.execute(delete(FormFieldCount.__table__).where(FormFieldCount.form_id == form.id))
+    
+    sent = completed = 0
+    seconds = 0.0
+    counts = Counter()
+    rows = db.query(FormSubmission.sent_at, FormSubmission.completed_at, FormSubmission.data).filter(
+        FormSubmission.form_id == form.id
+    ).yield_per(1000)
+    for sent_at, completed_at, data in rows:
+        sent += 1
+        if completed_at is None:
+            continue
+        completed += 1
+        seconds += max(0.0, (_naive(completed_at) - (_naive(sent_at) or _naive(completed_at))).total_seconds())
+        counts += _completion_counts(form.fields, data)
+    
+    connection.execute(insert(FormStats.__table__).values(
+        form_id=form.id, sent_count=sent, completed_count=completed, completion_seconds=seconds
+    ))
+    if counts:
+        connection.execute(insert(FormFieldCount.__table__), [
+            {"form_id": form.id, "field_id": field_id, "value": value, "count": count}
+            for (field_id, value), count in counts.items()
+        ])
+
+def backfill_form_stats(db: Session) -> int:
+    """Build totals for every form that has submissions but no form_stats row yet"""
+    forms = db.query(Form).filter(
+        ~Form.id.in_(select(FormStats.form_id)),
+        Form.id.in_(select(FormSubmission.form_id))
+    ).all()
+    for form in forms:
+        rebuild_form_stats(db, form)
+        db.commit()
+    return len(forms)
+
+def run_form_stats_backfill_job():
+    """Form totals backfill, for running outside a request"""
+    return run_job(backfill_form_stats, "Built submission totals for {} forms", "Error backfilling form totals")
+
+def form_analytics(db: Session, form: Form) -> dict:
+    """Completion rate, time to complete and per-option counts, read from the running totals"""
+    stats = db.query(FormStats).filter(FormStats.form_id == form.id).first()
+    sent = stats.sent_count if stats else 0
+    completed = stats.completed_count if stats else 0
+    
+    counts: Dict[str, Dict[str, int]] = {}
+    for field_id, value, count in db.query(
+        FormFieldCount.field_id, FormFieldCount.value, FormFieldCount.count
+    ).filter(FormFieldCount.form_id == form.id):
+        counts.setdefault(field_id, {})[value] = count
+    
+    fields = []
+    for field in choice_fields(form.fields):
+        picked = counts.get(_field_id(field), {})
+        options = [str(option)[:MAX_VALUE_LENGTH] for option in field.get("options") or []]
+        if not options and (field.get("type") or field.get("field_type")) == "checkbox":
+            options = ["true", "false"]
+        # Answers that aren't (or are no longer) listed options come last
+        others = sorted((v for v in picked if v not in options), key=lambda v: -picked[v])
+        fields.append({
+            "id": _field_id(field),
+            "label": field.get("label"),
+            "type": field.get("type") or field.get("field_type"),
+            "options": [
+                {
+                    "value": value,
+                    "count": picked.get(value, 0),
+                    "share": round(picked.get(value, 0) / completed, 4) if completed else 0.0
+                }
+                for value in dict.fromkeys(options + others)
+            ]
+        })
+    
+    return {
+        "form_id": form.id,
+        "sent": sent,
+        "completed": completed,
+        "pending": sent - completed,
+        "completion_rate": round(completed / sent, 4) if sent else None,
+        "avg_time_to_complete_seconds": round(stats.completion_seconds / completed, 1) if completed else None,
+        "fields": fields
+    }
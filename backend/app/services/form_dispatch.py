@@ -0,0 +1,202 @@
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import uuid
+import logging
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.workspace import Workspace
+from app.models.booking import Booking
+from app.models.form import Form, FormSubmission
+from app.services.email import send_email
+from app.services.form_analytics import count_sent
+
+logger = logging.getLogger(__name__)
+
+# Bookings whose existing submissions are looked up per query
+DISPATCH_CHUNK_SIZE = 500
+
+# Upper bound on bookings per bulk send request
+MAX_DISPATCH_BOOKINGS = 1000
+
+# (form, booking, token, status); status is "created", "pending" or "completed"
+Dispatch = Tuple[Form, Booking, str, str]
+
+def required_forms(db: Session, workspace_id: str, service_ids: Iterable[str]) -> Dict[str, List[Form]]:
+    """Active require_before_booking forms per service, in one query"""
+    service_ids = {service_id for service_id in service_ids if service_id}
+    if not service_ids:
+        return {}
+    forms: Dict[str, List[Form]] = {}
+    for form in db.query(Form).filter(
+        Form.workspace_id == workspace_id,
+        Form.service_id.in_(service_ids),
+        Form.is_active == True,
+        Form.require_before_booking == True
+    ).order_by(Form.created_at):
+        forms.setdefault(form.service_id, []).append(form)
+    return forms
+
+def ensure_submissions(db: Session, pairs: Iterable[Tuple[Form, Booking]]) -> List[Dispatch]:
+    """One submission per (form, booking contact), reusing rows that already exist.
+    
+    Existing rows are resolved with one query per chunk of bookings and the
+    missing ones are written with a single bulk insert, so tokens for a whole
+    batch are created in the caller's transaction.
+    """
+    pairs = list({(form.id, booking.id): (form, booking) for form, booking in pairs}.values())
+    if not pairs:
+        return []
+    
+    existing: Dict[Tuple[str, str, str], Tuple[str, bool]] = {}
+    form_ids = list({form.id for form, _ in pairs})
+    booking_ids = list({booking.id for _, booking in pairs})
+    for start in range(0, len(booking_ids), DISPATCH_CHUNK_SIZE):
+        rows = db.query(
+            FormSubmission.form_id, FormSubmission.booking_id, FormSubmission.contact_id,
+            FormSubmission.token, FormSubmission.completed_at
+        ).filter(
+            FormSubmission.form_id.in_(form_ids),
+            FormSubmission.booking_id.in_(booking_ids[start:start + DISPATCH_CHUNK_SIZE])
+        ).order_by(FormSubmission.sent_at)
+        for form_id, booking_id, contact_id, token, completed_at in rows:
+            key = (form_id, booking_id, contact_id)
+            # A completed copy wins over pending ones; otherwise the oldest token is reused
+            if key not in existing or (completed_at is not None and not existing[key][1]):
+                existing[key] = (token, completed_at is not None)
+    
+    now = datetime.utcnow()
+    dispatches: List[Dispatch] = []
+    new_rows = []
+    for form, booking in pairs:
+        found = existing.get((form.id, booking.id, booking.contact_id))
+        if found:
+            dispatches.append((form, booking, found[0], "completed" if found[1] else "pending"))
+            continue
+        token = str(uuid.uuid4())
+        new_rows.append({
+            "id": str(uuid.uuid4()),
+            "workspace_id": form.workspace_id,
+            "form_id": form.id,
+            "booking_id": booking.id,
+            "contact_id": booking.contact_id,
+            "token": token,
+            "data": {},
+            "sent_at": now
+        })
+        dispatches.append((form, booking, token, "created"))
+    
+    if new_rows:
+        db.execute(insert(FormSubmission.__table__), new_rows)
+        # Core inserts skip the after_flush listener that keeps form totals
+        count_sent(db.connection(), Counter(row["form_id"] for row in new_rows))
+    return dispatches
+
+def form_link(base_url: str, token: str) -> str:
+    return f"{base_url}/public/form/{token}"
+
+def _forms_email(workspace: Workspace, contact, entries: List[Tuple[Form, Booking, str]]) -> Tuple[str, str]:
+    """(subject, body) of one email listing every form a contact has to complete"""
+    lines = []
+    for form, booking, link in entries:
+        when = f"{booking.start_time.strftime('%A, %B %d, %Y')} at {booking.start_time.strftime('%I:%M %p')}"
+        lines.append(f"• {form.name} (appointment on {when})")
+        if form.description:
+            lines.append(f"  {form.description}")
+        lines.append(f"  Link: {link}")
+        lines.append("")
+    
+    if len(entries) == 1:
+        subject = f"Please complete: {entries[0][0].name}"
+        intro = "Please complete the following form for your upcoming appointment:"
+    else:
+        subject = f"Please complete {len(entries)} forms - {workspace.name}"
+        intro = "Please complete the following forms for your upcoming appointments:"
+    
+    body = f"""
+Hello {contact.name},
+
+{intro}
+
+━━━━━━━━━━━━━━━━━━━━━━
+📋 FORMS TO COMPLETE
+━━━━━━━━━━━━━━━━━━━━━━
+
+{chr(10).join(lines)}
+Each form must be completed before its appointment.
+
+━━━━━━━━━━━━━━━━━━━━━━
+
+Thank you for your cooperation!
+
+Best regards,
+The {workspace.name} Team
+"""
+    return subject, body
+
+def form_emails(
+    workspace: Workspace,
+    dispatches: List[Dispatch],
+    base_url: str,
+    statuses: Tuple[str, ...] = ("created",)
+) -> List[Tuple[str, str, str]]:
+    """(address, subject, body) per contact, listing their dispatched forms with the given statuses"""
+    by_contact: Dict[str, list] = {}
+    for form, booking, token, state in dispatches:
+        if state in statuses and booking.contact and booking.contact.email:
+            by_contact.setdefault(booking.contact_id, []).append((form, booking, form_link(base_url, token)))
+    
+    emails = []
+    for entries in by_contact.values():
+        contact = entries[0][1].contact
+        emails.append((contact.email, *_forms_email(workspace, contact, entries)))
+    return emails
+
+async def send_form_emails(workspace: Workspace, emails: List[Tuple[str, str, str]]) -> int:
+    sent = 0
+    for to, subject, body in emails:
+        try:
+            await send_email(to=to, subject=subject, body=body, workspace=workspace)
+            sent += 1
+        except Exception as e:
+            logger.error(f"Error sending forms to {to}: {str(e)}")
+    return sent
+
+async def dispatch_booking_forms(
+    db: Session,
+    workspace: Workspace,
+    bookings: List[Booking],
+    base_url: str,
+    forms: Optional[List[Form]] = None,
+    resend_pending: bool = False
+) -> dict:
+    """Create and email the forms of many bookings at once.
+    
+    Each booking gets `forms`, or its service's required forms when None.
+    Bookings whose contact has no email are skipped. Submissions are
+    committed before any link is emailed.
+    """
+    reachable = [b for b in bookings if b.contact and b.contact.email]
+    if forms is None:
+        by_service = required_forms(db, workspace.id, (b.service_id for b in reachable))
+        pairs = [(form, booking) for booking in reachable for form in by_service.get(booking.service_id, [])]
+    else:
+        pairs = [(form, booking) for booking in reachable for form in forms]
+    
+    skipped = [b.id for b in bookings if not (b.contact and b.contact.email)]
+    
+    dispatches = ensure_submissions(db, pairs)
+    # Rendered before the commit expires the loaded bookings, contacts and forms
+    statuses = ("created", "pending") if resend_pending else ("created",)
+    emails = form_emails(workspace, dispatches, base_url, statuses)
+    states = Counter(state for _, _, _, state in dispatches)
+    db.commit()
+    
+    return {
+        "created": states["created"],
+        "pending": states["pending"],
+        "completed": states["completed"],
+        "emails_sent": await send_form_emails(workspace, emails),
+        "skipped_booking_ids": skipped
+    }
@@ -0,0 +1,248 @@
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+import threading
+import logging
+
+from app.models.form import Form
+from app.utils.helpers import normalize_phone
+
+logger = logging.getLogger(__name__)
+
+# Compiled validators kept in memory, least recently used dropped first
+MAX_CACHED_FORMS = 1024
+
+# Upper bound on free-text answers when a field sets no max_length
+MAX_TEXT_LENGTH = 10000
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+class FormSchemaError(ValueError):
+    """Raised when a form's fields carry validation rules that can't be compiled"""
+    pass
+
+# value -> (cleaned value, error message or None)
+Check = Callable[[Any], Tuple[Any, Optional[str]]]
+
+def _is_empty(value) -> bool:
+    return value is None or value == "" or value == [] or value is False
+
+def _text_check(rules: dict, default_max: int) -> Check:
+    min_length = rules.get("min_length")
+    max_length = rules.get("max_length") or default_max
+    pattern = rules.get("pattern")
+    try:
+        compiled = re.compile(pattern) if pattern else None
+    except re.error as e:
+        raise FormSchemaError(f"Invalid pattern {pattern!r}: {e}")
+    message = rules.get("pattern_message") or "has an invalid format"
+    
+    def check(value):
+        if not isinstance(value, str):
+            return value, "must be text"
+        value = value.strip()
+        if min_length and len(value) < min_length:
+            return value, f"must be at least {min_length} characters"
+        if len(value) > max_length:
+            return value, f"must be at most {max_length} characters"
+        if compiled and not compiled.fullmatch(value):
+            return value, message
+        return value, None
+    return check
+
+def _email_check(rules: dict) -> Check:
+    text = _text_check(rules, 320)
+    
+    def check(value):
+        value, error = text(value)
+        if error is None and not EMAIL_PATTERN.match(value):
+            error = "must be a valid email address"
+        return value, error
+    return check
+
+def _phone_check(rules: dict) -> Check:
+    text = _text_check(rules, 50)
+    
+    def check(value):
+        value, error = text(value)
+        if error is None and not normalize_phone(value):
+            error = "must be a valid phone number"
+        return value, error
+    return check
+
+def _number_check(rules: dict) -> Check:
+    minimum = rules.get("min")
+    maximum = rules.get("max")
+    integer = bool(rules.get("integer"))
+    
+    def check(value):
+        if isinstance(value, bool):
+            return value, "must be a number"
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                return value, "must be a number"
+        if not isinstance(value, (int, float)) or value != value:
+            return value, "must be a number"
+        if integer:
+            if value != int(value):
+                return value, "must be a whole number"
+            value = int(value)
+        if minimum is not None and value < minimum:
+            return value, f"must be at least {minimum}"
+        if maximum is not None and value > maximum:
+            return value, f"must be at most {maximum}"
+        return value, None
+    return check
+
+def _date_check(rules: dict) -> Check:
+    try:
+        minimum = date.fromisoformat(rules["min"]) if rules.get("min") else None
+        maximum = date.fromisoformat(rules["max"]) if rules.get("max") else None
+    except (TypeError, ValueError) as e:
+        raise FormSchemaError(f"Invalid date bound: {e}")
+    
+    def check(value):
+        try:
+            parsed = date.fromisoformat(value[:10]) if isinstance(value, str) else None
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            return value, "must be a date (YYYY-MM-DD)"
+        if minimum and parsed < minimum:
+            return value, f"must be on or after {minimum.isoformat()}"
+        if maximum and parsed > maximum:
+            return value, f"must be on or before {maximum.isoformat()}"
+        return value, None
+    return check
+
+def _choice_check(options: List[str]) -> Check:
+    allowed = frozenset(options)
+    
+    def check(value):
+        if not isinstance(value, str) or (allowed and value not in allowed):
+            return value, "must be one of the listed options"
+        return value, None
+    return check
+
+def _checkbox_check(options: List[str], rules: dict) -> Check:
+    if not options:
+        def single(value):
+            if isinstance(value, str) and value.lower() in ("true", "false", "on"):
+                value = value.lower() != "false"
+            if not isinstance(value, bool):
+                return value, "must be true or false"
+            return value, None
+        return single
+    
+    allowed = frozenset(options)
+    min_selected = rules.get("min_selected")
+    max_selected = rules.get("max_selected")
+    
+    def multiple(value):
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list) or not all(isinstance(v, str) and v in allowed for v in value):
+            return value, "must be a list of the listed options"
+        value = list(dict.fromkeys(value))
+        if min_selected and len(value) < min_selected:
+            return value, f"must have at least {min_selected} selected"
+        if max_selected and len(value) > max_selected:
+            return value, f"must have at most {max_selected} selected"
+        return value, None
+    return multiple
+
+def _any_check(value):
+    return value, None
+
+def _field_check(field_type: str, options: List[str], rules: dict) -> Check:
+    if field_type == "textarea":
+        return _text_check(rules, MAX_TEXT_LENGTH)
+    if field_type == "email":
+        return _email_check(rules)
+    if field_type in ("tel", "phone"):
+        return _phone_check(rules)
+    if field_type == "number":
+        return _number_check(rules)
+    if field_type == "date":
+        return _date_check(rules)
+    if field_type in ("select", "radio"):
+        return _choice_check(options)
+    if field_type == "checkbox":
+        return _checkbox_check(options, rules)
+    if field_type == "file":
+        return _any_check
+    return _text_check(rules, MAX_TEXT_LENGTH)
+
+class FormValidator:
+    """A form's fields compiled into one check per field.
+    
+    Calling it returns (cleaned data, {field id: error}); answers to fields
+    the form doesn't have are dropped.
+    """
+    
+    def __init__(self, checks: List[Tuple[str, str, bool, Check]]):
+        self.checks = checks
+    
+    def __call__(self, data: Optional[dict]) -> Tuple[dict, Dict[str, str]]:
+        data = data if isinstance(data, dict) else {}
+        cleaned, errors = {}, {}
+        for field_id, label, required, check in self.checks:
+            value = data.get(field_id)
+            if _is_empty(value) and not (value is False and not required):
+                if required:
+                    errors[field_id] = f"{label} is required"
+                continue
+            value, error = check(value)
+            if error:
+                errors[field_id] = f"{label} {error}"
+            elif required and _is_empty(value):
+                errors[field_id] = f"{label} is required"
+            else:
+                cleaned[field_id] = value
+        return cleaned, errors
+
+def compile_form_fields(fields: Optional[list], strict: bool = True) -> FormValidator:
+    """Compile Form.fields; with strict=False, fields with broken rules are only type-checked"""
+    checks = []
+    for field in fields or []:
+        field_id = field.get("id") or field.get("field_id")
+        if not field_id:
+            continue
+        field_type = field.get("type") or field.get("field_type") or "text"
+        options = [str(option) for option in field.get("options") or []]
+        rules = field.get("validation_rules") or {}
+        try:
+            check = _field_check(field_type, options, rules)
+        except FormSchemaError as e:
+            if strict:
+                raise FormSchemaError(f"Field {field.get('label') or field_id}: {e}")
+            logger.warning(f"Ignoring validation rules of field {field_id}: {e}")
+            check = _field_check(field_type, options, {})
+        checks.append((field_id, field.get("label") or field_id, bool(field.get("required")), check))
+    return FormValidator(checks)
+
+_validators: "OrderedDict[str, Tuple[object, FormValidator]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _version(form: Form):
+    return form.updated_at or form.created_at
+
+def get_form_validator(form: Form) -> FormValidator:
+    """Compiled validator for a form, reused until the form is updated"""
+    version = _version(form)
+    with _cache_lock:
+        cached = _validators.get(form.id)
+        if cached and cached[0] == version:
+            _validators.move_to_end(form.id)
+            return cached[1]
+    
+    validator = compile_form_fields(form.fields, strict=False)
+    with _cache_lock:
+        _validators[form.id] = (version, validator)
+        _validators.move_to_end(form.id)
+        while len(_validators) > MAX_CACHED_FORMS:
+            _validators.popitem(last=False)
+    return validator
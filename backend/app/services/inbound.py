@@ -0,0 +1,326 @@
+from datetime import datetime
+from email.utils import parseaddr
+from typing import Dict, List, Optional, Set, Tuple
+import base64
+import hashlib
+import hmac
+import re
+import threading
+import uuid
+import logging
+from sqlalchemy import func, insert, update, bindparam, or_
+from sqlalchemy.orm import Session
+
+from app.models.contact import Contact, Conversation, Message
+from app.models.integration import InboundEvent
+from app.services.activity import record_activity, message_event
+from app.utils.helpers import normalize_email, normalize_phone
+
+logger = logging.getLogger(__name__)
+
+# Events turned into messages per transaction
+INBOUND_BATCH_SIZE = 500
+
+# Events that keep failing are parked after this many tries
+MAX_ATTEMPTS = 5
+
+# Pending events left behind (crash, missed trigger) are picked up this often
+INBOUND_POLL_SECONDS = 30
+
+MESSAGE_ID_HEADER = re.compile(r"^message-id:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+HTML_TAG = re.compile(r"<[^>]+>")
+
+class SignatureError(ValueError):
+    """Raised when a webhook request can't be authenticated"""
+    pass
+
+def twilio_signature(auth_token: str, url: str, params: List[Tuple[str, str]]) -> str:
+    """X-Twilio-Signature: HMAC-SHA1 over the URL and the sorted POST parameters"""
+    data = url + "".join(f"{key}{value}" for key, value in sorted(params))
+    digest = hmac.new(auth_token.encode(), data.encode(), hashlib.sha1).digest()
+    return base64.b64encode(digest).decode()
+
+def verify_twilio(auth_token: Optional[str], url: str, params: List[Tuple[str, str]], signature: Optional[str]):
+    if not auth_token or not signature:
+        raise SignatureError("Missing Twilio signature")
+    if not hmac.compare_digest(twilio_signature(auth_token, url, params), signature):
+        raise SignatureError("Invalid Twilio signature")
+
+def verify_sendgrid(
+    token: Optional[str],
+    expected_token: Optional[str],
+    public_key: Optional[str] = None,
+    signature: Optional[str] = None,
+    timestamp: Optional[str] = None,
+    body: bytes = b""
+):
+    """Check the per-integration URL token, plus SendGrid's ECDSA signature when a key is configured"""
+    if not expected_token or not token or not hmac.compare_digest(token, expected_token):
+        raise SignatureError("Invalid webhook token")
+    if not public_key:
+        return
+    if not signature or not timestamp:
+        raise SignatureError("Missing SendGrid signature")
+    
+    from cryptography.exceptions import InvalidSignature
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    try:
+        key = serialization.load_der_public_key(base64.b64decode(public_key))
+        key.verify(base64.b64decode(signature), timestamp.encode() + body, ec.ECDSA(hashes.SHA256()))
+    except (InvalidSignature, ValueError) as e:
+        raise SignatureError(f"Invalid SendGrid signature: {e}")
+
+def sendgrid_external_id(fields: dict) -> Optional[str]:
+    match = MESSAGE_ID_HEADER.search(fields.get("headers") or "")
+    return match.group(1) if match else None
+
+def _parse_event(event: InboundEvent) -> dict:
+    """Sender, name, subject and text of a queued payload"""
+    payload = event.payload or {}
+    if event.provider == "twilio":
+        phone = normalize_phone(payload.get("From"))
+        if not phone:
+            raise ValueError("Inbound SMS has no sender number")
+        return {
+            "email": None,
+            "phone": phone,
+            "name": payload.get("ProfileName") or phone,
+            "subject": None,
+            "content": payload.get("Body") or "",
+            "metadata": {"from": payload.get("From"), "to": payload.get("To"),
+                         "external_id": event.external_id, "media": int(payload.get("NumMedia") or 0)}
+        }
+    
+    name, address = parseaddr(payload.get("from") or "")
+    email = normalize_email(address)
+    if not email:
+        raise ValueError("Inbound email has no sender address")
+    content = payload.get("text") or HTML_TAG.sub("", payload.get("html") or "")
+    return {
+        "email": email,
+        "phone": None,
+        "name": name or address,
+        "subject": payload.get("subject"),
+        "content": content.strip(),
+        "metadata": {"from": payload.get("from"), "to": payload.get("to"), "subject": payload.get("subject"),
+                     "external_id": event.external_id, "attachments": int(payload.get("attachments") or 0)}
+    }
+
+def _resolve_contacts(db: Session, workspace_id: str, items: List[dict]) -> Dict[str, str]:
+    """(email/phone key) -> contact id, creating unknown senders in one insert"""
+    emails = {i["email"] for i in items if i["email"]}
+    phones = {i["phone"] for i in items if i["phone"]}
+    conditions = []
+    if emails:
+        conditions.append(Contact.normalized_email.in_(emails))
+    if phones:
+        conditions.append(Contact.normalized_phone.in_(phones))
+    
+    found: Dict[str, str] = {}
+    for contact_id, email, phone in db.query(Contact.id, Contact.normalized_email, Contact.normalized_phone).filter(
+        Contact.workspace_id == workspace_id, or_(*conditions)
+    ):
+        if email:
+            found[f"e:{email}"] = contact_id
+        if phone:
+            found[f"p:{phone}"] = contact_id
+    
+    new_contacts = []
+    for item in items:
+        key = item["key"]
+        if key in found:
+            continue
+        found[key] = str(uuid.uuid4())
+        new_contacts.append({
+            "id": found[key],
+            "workspace_id": workspace_id,
+            "name": item["name"],
+            "email": item["email"],
+            "phone": item["phone"],
+            "normalized_email": item["email"],
+            "normalized_phone": item["phone"],
+            "source": item["channel"],
+            "tags": [],
+            "custom_fields": {},
+            "is_active": True,
+            "unsubscribed": False
+        })
+    if new_contacts:
+        db.execute(insert(Contact.__table__), new_contacts)
+    return found
+
+def _ingest_workspace(db: Session, workspace_id: str, items: List[dict]) -> Set[str]:
+    contacts = _resolve_contacts(db, workspace_id, items)
+    contact_ids = set(contacts.values())
+    
+    # Newest active conversation per contact
+    conversations = dict(db.query(Conversation.contact_id, Conversation.id).filter(
+        Conversation.workspace_id == workspace_id,
+        Conversation.contact_id.in_(contact_ids),
+        Conversation.status == "active"
+    ).order_by(Conversation.created_at).all())
+    
+    new_conversations = []
+    for item in items:
+        contact_id = contacts[item["key"]]
+        if contact_id not in conversations:
+            conversations[contact_id] = str(uuid.uuid4())
+            new_conversations.append({
+                "id": conversations[contact_id],
+                "workspace_id": workspace_id,
+                "contact_id": contact_id,
+                "subject": item["subject"] or f"Conversation with {item['name']}",
+                "status": "active",
+                "message_count": 0,
+                "awaiting_reply": True
+            })
+    if new_conversations:
+        db.execute(insert(Conversation.__table__), new_conversations)
+    
+    messages = []
+    totals: Dict[str, dict] = {}
+    for item in items:
+        conversation_id = conversations[contacts[item["key"]]]
+        messages.append({
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "content": item["content"],
+            "channel": item["channel"],
+            "direction": "inbound",
+            "status": "received",
+            "automated": False,
+            "message_message_metadata": item["metadata"],
+            "created_at": item["received_at"]
+        })
+        total = totals.setdefault(conversation_id, {
+            "cid": conversation_id, "n": 0, "at": item["received_at"], "first": item["received_at"]
+        })
+        total["n"] += 1
+        total["at"] = max(total["at"], item["received_at"])
+        total["first"] = min(total["first"], item["received_at"])
+    db.execute(insert(Message.__table__), messages)
+    record_activity(db.connection(), [message_event(
+        m["id"], workspace_id, m["conversation_id"], "inbound", False, m["content"], item["name"], m["created_at"]
+    ) for m, item in zip(messages, items)])
+    
+    # One UPDATE per conversation, sent as a single executemany
+    table = Conversation.__table__
+    db.execute(
+        update(table).where(table.c.id == bindparam("cid")).values(
+            message_count=func.coalesce(table.c.message_count, 0) + bindparam("n"),
+            last_message_at=bindparam("at"),
+            last_message_direction="inbound",
+            awaiting_reply=True,
+            # Keep the clock of a conversation that was already waiting
+            awaiting_since=func.coalesce(table.c.awaiting_since, bindparam("first")),
+            updated_at=bindparam("at")
+        ),
+        list(totals.values())
+    )
+    return set(totals)
+
+def _hold_back(event: InboundEvent, error: Exception):
+    """Leave a failed event pending for the next pass, or park it once it has used its tries"""
+    event.status = "failed" if (event.attempts or 0) >= MAX_ATTEMPTS else "pending"
+    event.processed_at = None
+    event.error = str(error)
+
+def _ingest_isolated(db: Session, workspace_id: str, items: List[dict]) -> Set[str]:
+    """_ingest_workspace() in a savepoint; when it fails, each event is retried in
+    its own savepoint so only the events that fail by themselves are held back"""
+    try:
+        with db.begin_nested():
+            return _ingest_workspace(db, workspace_id, items)
+    except Exception as e:
+        if len(items) == 1:
+            logger.warning(f"Inbound event {items[0]['event'].id} failed: {str(e)}")
+            _hold_back(items[0]["event"], e)
+            return set()
+        logger.warning(f"Inbound batch for workspace {workspace_id} failed, retrying its events one by one: {str(e)}")
+    
+    touched: Set[str] = set()
+    for item in items:
+        touched |= _ingest_isolated(db, workspace_id, [item])
+    return touched
+
+def process_inbound_batch(db: Session, batch_size: int = INBOUND_BATCH_SIZE) -> Tuple[int, Dict[str, Set[str]]]:
+    """Turn one batch of pending events into messages; returns (events handled, touched conversations)"""
+    events = db.query(InboundEvent).filter(
+        InboundEvent.status == "pending"
+    ).order_by(InboundEvent.received_at, InboundEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not events:
+        return 0, {}
+    
+    now = datetime.utcnow()
+    by_workspace: Dict[str, List[dict]] = {}
+    for event in events:
+        event.attempts = (event.attempts or 0) + 1
+        try:
+            item = _parse_event(event)
+        except (ValueError, TypeError) as e:
+            event.status = "failed"
+            event.error = str(e)
+            continue
+        item["channel"] = event.channel
+        item["key"] = f"e:{item['email']}" if item["email"] else f"p:{item['phone']}"
+        item["received_at"] = event.received_at or now
+        item["event"] = event
+        by_workspace.setdefault(event.workspace_id, []).append(item)
+        event.status = "processed"
+        event.processed_at = now
+    
+    # Each workspace in its own savepoint, so one bad event can't sink the batch
+    touched = {
+        workspace_id: _ingest_isolated(db, workspace_id, items)
+        for workspace_id, items in by_workspace.items()
+    }
+    db.commit()
+    return len(events), touched
+
+_drain_lock = threading.Lock()
+
+def drain_inbound_events() -> Dict[str, Set[str]]:
+    """Process pending events until none are left, for running outside a request.
+    
+    Only one drain runs per process; triggers that arrive meanwhile are
+    covered by the running drain's next batch (or the periodic poll).
+    """
+    if not _drain_lock.acquire(blocking=False):
+        return {}
+    
+    from app.config import SessionLocal
+    db = SessionLocal()
+    touched: Dict[str, Set[str]] = {}
+    try:
+        while True:
+            try:
+                count, batch_touched = process_inbound_batch(db)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error ingesting inbound events: {str(e)}")
+                _record_failure(db, str(e))
+                break
+            for workspace_id, conversation_ids in batch_touched.items():
+                touched.setdefault(workspace_id, set()).update(conversation_ids)
+            if count < INBOUND_BATCH_SIZE:
+                break
+    finally:
+        db.close()
+        _drain_lock.release()
+    return touched
+
+def _record_failure(db: Session, error: str):
+    """Note an error that broke a whole batch (not any one event) on the events it held.
+    
+    Nothing is parked here: events that fail on their own are held back by
+    _ingest_isolated(), so these stay pending until the problem clears.
+    """
+    try:
+        ids = [row.id for row in db.query(InboundEvent.id).filter(
+            InboundEvent.status == "pending"
+        ).order_by(InboundEvent.received_at, InboundEvent.id).limit(INBOUND_BATCH_SIZE)]
+        db.execute(update(InboundEvent).where(InboundEvent.id.in_(ids)).values(error=error))
+        db.commit()
+    except Exception:
+        db.rollback()
@@ -0,0 +1,135 @@
+from datetime import datetime, date, time, timedelta
+from typing import Dict
+import math
+import threading
+import logging
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.inventory import InventoryItem, InventoryUsage
+
+logger = logging.getLogger(__name__)
+
+# Daily usage buckets are kept for this many days; longer windows are clamped.
+HISTORY_DAYS = 90
+
+# workspace_id -> {"watermark": datetime, "buckets": {item_id: {date: qty}}}
+_usage_cache: Dict[str, dict] = {}
+_cache_lock = threading.Lock()
+
+def _to_date(value) -> date:
+    """func.date() returns a string on SQLite and a date on Postgres"""
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _refresh_buckets(db: Session, workspace_id: str) -> Dict[str, Dict[date, int]]:
+    """Fold usage rows since the cached watermark into the daily buckets"""
+    horizon = datetime.utcnow() - timedelta(days=HISTORY_DAYS)
+
+    with _cache_lock:
+        entry = _usage_cache.get(workspace_id)
+        if entry is None:
+            entry = {"watermark": None, "buckets": {}}
+            _usage_cache[workspace_id] = entry
+        watermark = entry["watermark"]
+
+    # One grouped query per refresh: the database sums each (item, day) bucket
+    # instead of us walking individual usage rows.
+    query = db.query(
+        InventoryUsage.inventory_id,
+        func.date(InventoryUsage.created_at),
+        func.sum(InventoryUsage.quantity_used),
+        func.max(InventoryUsage.created_at)
+    ).join(InventoryItem, InventoryUsage.inventory_id == InventoryItem.id).filter(
+        InventoryItem.workspace_id == workspace_id,
+        InventoryUsage.created_at >= horizon
+    )
+
+    # Re-read the watermark's whole day and replace those buckets, so rows that
+    # share the watermark timestamp are never double counted or skipped.
+    refresh_from = horizon.date()
+    if watermark is not None:
+        refresh_from = max(refresh_from, watermark.date())
+        query = query.filter(
+            InventoryUsage.created_at >= datetime.combine(refresh_from, time.min)
+        )
+
+    rows = query.group_by(
+        InventoryUsage.inventory_id,
+        func.date(InventoryUsage.created_at)
+    ).all()
+
+    with _cache_lock:
+        buckets = entry["buckets"]
+        cutoff = horizon.date()
+        for item_buckets in buckets.values():
+            stale = [d for d in item_buckets if d < cutoff or d >= refresh_from]
+            for day in stale:
+                del item_buckets[day]
+
+        for inventory_id, day, quantity, latest in rows:
+            buckets.setdefault(inventory_id, {})[_to_date(day)] = int(quantity or 0)
+            if latest and (entry["watermark"] is None or latest > entry["watermark"]):
+                entry["watermark"] = latest
+
+        return {item_id: dict(days) for item_id, days in buckets.items()}
+
+def get_usage_analytics(
+    db: Session,
+    workspace_id: str,
+    window_days: int = 30,
+    lead_time_days: int = 7,
+    coverage_days: int = 30
+) -> dict:
+    """Consumption rate, days until stockout and reorder suggestion per item"""
+    window_days = max(1, min(window_days, HISTORY_DAYS))
+    buckets = _refresh_buckets(db, workspace_id)
+
+    today = datetime.utcnow().date()
+    window_start = today - timedelta(days=window_days - 1)
+
+    items = db.query(InventoryItem).filter(
+        InventoryItem.workspace_id == workspace_id
+    ).order_by(InventoryItem.name).all()
+
+    result = []
+    for item in items:
+        daily = buckets.get(item.id, {})
+        used = sum(qty for day, qty in daily.items() if day >= window_start)
+        daily_rate = used / window_days
+
+        days_until_stockout = None
+        if daily_rate > 0:
+            days_until_stockout = round(max(item.quantity, 0) / daily_rate, 1)
+
+        # Cover the supplier lead time plus the review period, on top of the
+        # safety threshold already configured for the item.
+        target = daily_rate * (lead_time_days + coverage_days) + item.threshold
+        suggested_reorder = max(0, math.ceil(target - item.quantity))
+
+        result.append({
+            "id": item.id,
+            "name": item.name,
+            "sku": item.sku,
+            "unit": item.unit,
+            "quantity": item.quantity,
+            "threshold": item.threshold,
+            "used_in_window": used,
+            "daily_usage_rate": round(daily_rate, 3),
+            "days_until_stockout": days_until_stockout,
+            "stockout_date": (
+                (today + timedelta(days=math.floor(days_until_stockout))).isoformat()
+                if days_until_stockout is not None else None
+            ),
+            "suggested_reorder_quantity": suggested_reorder,
+            "is_low_stock": item.is_low_stock
+        })
+
+    return {
+        "window_days": window_days,
+        "lead_time_days": lead_time_days,
+        "coverage_days": coverage_days,
+        "generated_at": datetime.utcnow().isoformat(),
+        "items": result
+    }
@@ -0,0 +1,36 @@
+from typing import Callable, Optional
+import asyncio
+import logging
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+def run_job(work: Callable[[Session], object], done: Optional[str], failed: str):
+    """Run work(db) in a session of its own, for running outside a request.
+    
+    A truthy result is logged with done ("{}" takes the result); an error is
+    rolled back and logged after failed. Returns work's result, None on error.
+    """
+    from app.config import SessionLocal
+    db = SessionLocal()
+    try:
+        result = work(db)
+        if result and done:
+            logger.info(done.format(result))
+        return result
+    except Exception as e:
+        db.rollback()
+        logger.error(f"{failed}: {str(e)}")
+    finally:
+        db.close()
+
+async def run_periodic(job: Callable[[], object], interval_seconds: float):
+    """Run job every interval_seconds, off the event loop, until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, job)
+        except Exception as e:
+            # A failed pass must not end the loop; the next one retries
+            logger.error(f"Error in periodic job {getattr(job, '__name__', job)}: {str(e)}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,138 @@
+from datetime import datetime, date, timedelta, timezone
+from typing import List, Optional
+import calendar
+
+from app.services.availability import get_zone
+from app.services.resource_calendar import to_naive_utc
+
+# Longest series accepted in one request (two years of weekly sessions)
+MAX_OCCURRENCES = 104
+
+WEEKDAYS = {"MO": 0, "TU": 1, "WE": 2, "TH": 3, "FR": 4, "SA": 5, "SU": 6}
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+
+class RecurrenceError(ValueError):
+    """Raised for RRULEs outside the supported subset"""
+    pass
+
+def parse_rrule(rule: str) -> dict:
+    """Parse the RFC 5545 subset we support.
+    
+    FREQ=DAILY|WEEKLY|MONTHLY with optional INTERVAL, BYDAY (weekly only)
+    and exactly one of COUNT or UNTIL.
+    """
+    parts = {}
+    for part in rule.strip().upper().removeprefix("RRULE:").split(";"):
+        if not part:
+            continue
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            raise RecurrenceError(f"Malformed RRULE part: {part}")
+        parts[key] = value
+    
+    unsupported = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "WKST"}
+    if unsupported:
+        raise RecurrenceError(f"Unsupported RRULE parts: {', '.join(sorted(unsupported))}")
+    
+    freq = parts.get("FREQ")
+    if freq not in FREQUENCIES:
+        raise RecurrenceError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    
+    try:
+        interval = int(parts.get("INTERVAL", "1"))
+        count = int(parts["COUNT"]) if "COUNT" in parts else None
+    except ValueError:
+        raise RecurrenceError("INTERVAL and COUNT must be integers")
+    if interval < 1 or (count is not None and count < 1):
+        raise RecurrenceError("INTERVAL and COUNT must be positive")
+    
+    until = None
+    if "UNTIL" in parts:
+        value = parts["UNTIL"]
+        try:
+            if "T" in value:
+                until = datetime.strptime(value.rstrip("Z"), "%Y%m%dT%H%M%S")
+                if value.endswith("Z"):
+                    until = until.replace(tzinfo=timezone.utc)
+            else:
+                until = datetime.strptime(value, "%Y%m%d").date()
+        except ValueError:
+            raise RecurrenceError(f"Invalid UNTIL: {value}")
+    
+    if (count is None) == (until is None):
+        raise RecurrenceError("RRULE needs exactly one of COUNT or UNTIL")
+    
+    byday = None
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise RecurrenceError("BYDAY is only supported with FREQ=WEEKLY")
+        try:
+            byday = sorted({WEEKDAYS[day] for day in parts["BYDAY"].split(",")})
+        except KeyError:
+            raise RecurrenceError(f"Invalid BYDAY: {parts['BYDAY']}")
+    
+    return {"freq": freq, "interval": interval, "count": count, "until": until, "byday": byday}
+
+def _add_months(day: date, months: int) -> Optional[date]:
+    """Same day of month `months` later, or None when that month is too short"""
+    month_index = day.month - 1 + months
+    year, month = day.year + month_index // 12, month_index % 12 + 1
+    if day.day > calendar.monthrange(year, month)[1]:
+        return None
+    return day.replace(year=year, month=month)
+
+def _candidate_dates(first: date, rule: dict):
+    # As with an iCalendar DTSTART, the first date counts even on an unlisted weekday
+    if rule["byday"] is not None and first.weekday() not in rule["byday"]:
+        yield first
+    step = 0
+    while True:
+        if rule["freq"] == "DAILY":
+            yield first + timedelta(days=step * rule["interval"])
+        elif rule["freq"] == "WEEKLY":
+            if rule["byday"] is None:
+                yield first + timedelta(weeks=step * rule["interval"])
+            else:
+                week_start = first - timedelta(days=first.weekday()) + timedelta(weeks=step * rule["interval"])
+                for weekday in rule["byday"]:
+                    day = week_start + timedelta(days=weekday)
+                    if day >= first:
+                        yield day
+        else:
+            day = _add_months(first, step * rule["interval"])
+            if day is not None:
+                yield day
+        step += 1
+
+def expand_rrule(rule: str, first_start: datetime, tz_name: Optional[str]) -> List[datetime]:
+    """Occurrence start times (naive UTC) of a series.
+    
+    Expansion happens on the workspace's wall clock, so a 09:00 session
+    stays at 09:00 local time across DST changes. first_start is always
+    the first occurrence.
+    """
+    parsed = parse_rrule(rule)
+    zone = get_zone(tz_name)
+    local_first = to_naive_utc(first_start).replace(tzinfo=timezone.utc).astimezone(zone)
+    wall_time = local_first.timetz().replace(tzinfo=None)
+    
+    until = parsed["until"]
+    if isinstance(until, datetime):
+        until = to_naive_utc(until.replace(tzinfo=until.tzinfo or zone))
+    
+    occurrences = []
+    for day in _candidate_dates(local_first.date(), parsed):
+        start = to_naive_utc(datetime.combine(day, wall_time, tzinfo=zone))
+        
+        if isinstance(until, datetime) and start > until:
+            break
+        if not isinstance(until, datetime) and until is not None and day > until:
+            break
+        
+        occurrences.append(start)
+        if len(occurrences) > MAX_OCCURRENCES:
+            raise RecurrenceError(f"A series can have at most {MAX_OCCURRENCES} occurrences")
+        if parsed["count"] is not None and len(occurrences) >= parsed["count"]:
+            break
+    
+    return occurrences
@@ -0,0 +1,170 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import logging
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingStatus
+from app.models.inventory import InventoryItem, InventoryUsage, ServiceSupply, InventoryReservation
+from app.services.jobs import run_job
+from app.utils.helpers import chunks, IN_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Bookings in these states still hold their supplies
+HOLDING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.RESCHEDULED)
+
+def _adjust_reserved(db: Session, inventory_id: str, delta: int):
+    """Shift an item's reserved total in SQL so concurrent writers don't clobber it"""
+    if not delta:
+        return
+    db.query(InventoryItem).filter(InventoryItem.id == inventory_id).update(
+        {InventoryItem.reserved_quantity: func.coalesce(InventoryItem.reserved_quantity, 0) + delta},
+        synchronize_session="fetch"
+    )
+
+def _ended(booking: Booking, now: datetime) -> bool:
+    end_time = booking.end_time
+    if end_time is not None and end_time.tzinfo is not None:
+        end_time = end_time.astimezone(timezone.utc).replace(tzinfo=None)
+    return end_time is not None and end_time < now
+
+def _desired_reservations(db: Session, bookings: List[Booking]) -> Dict[str, Dict[str, int]]:
+    """BOM quantities per booking, minus anything each one already consumed.
+
+    Bookings that have already ended hold nothing, completed or not.
+    """
+    now = datetime.utcnow()
+    holding = [
+        b for b in bookings
+        if b.service_id and b.status in HOLDING_STATUSES and not _ended(b, now)
+    ]
+    if not holding:
+        return {}
+
+    supplies: Dict[str, List[ServiceSupply]] = {}
+    for supply in db.query(ServiceSupply).filter(
+        ServiceSupply.service_id.in_({b.service_id for b in holding})
+    ).all():
+        supplies.setdefault(supply.service_id, []).append(supply)
+    holding = [b for b in holding if b.service_id in supplies]
+
+    used: Dict[tuple, int] = {}
+    for chunk in chunks([b.id for b in holding]):
+        for booking_id, inventory_id, quantity in db.query(
+            InventoryUsage.booking_id,
+            InventoryUsage.inventory_id,
+            func.sum(InventoryUsage.quantity_used)
+        ).filter(
+            InventoryUsage.booking_id.in_(chunk)
+        ).group_by(InventoryUsage.booking_id, InventoryUsage.inventory_id).all():
+            used[(booking_id, inventory_id)] = int(quantity or 0)
+
+    desired = {}
+    for booking in holding:
+        for supply in supplies[booking.service_id]:
+            remaining = supply.quantity_per_booking - used.get((booking.id, supply.inventory_id), 0)
+            if remaining > 0:
+                desired.setdefault(booking.id, {})[supply.inventory_id] = remaining
+    return desired
+
+def sync_bookings_reservations(db: Session, bookings: List[Booking]):
+    """Bring bookings' reservation rows in line with their status, time and service.
+
+    Call after any booking create/status change/reschedule, before commit.
+    Works on many bookings with a fixed number of queries, and adjusts each
+    touched item's reserved total once.
+    """
+    if not bookings:
+        return
+    db.flush()
+
+    existing: Dict[str, Dict[str, InventoryReservation]] = {}
+    for chunk in chunks([b.id for b in bookings]):
+        for r in db.query(InventoryReservation).filter(
+            InventoryReservation.booking_id.in_(chunk)
+        ).all():
+            existing.setdefault(r.booking_id, {})[r.inventory_id] = r
+    desired = _desired_reservations(db, bookings)
+
+    deltas: Dict[str, int] = {}
+    for booking in bookings:
+        held_items = existing.get(booking.id, {})
+        wanted_items = desired.get(booking.id, {})
+
+        for inventory_id in set(held_items) | set(wanted_items):
+            reservation = held_items.get(inventory_id)
+            held = reservation.quantity if reservation else 0
+            wanted = wanted_items.get(inventory_id, 0)
+
+            if wanted == 0:
+                db.delete(reservation)
+            elif reservation is None:
+                db.add(InventoryReservation(
+                    inventory_id=inventory_id,
+                    booking_id=booking.id,
+                    quantity=wanted,
+                    start_time=booking.start_time
+                ))
+            else:
+                reservation.quantity = wanted
+                reservation.start_time = booking.start_time
+                reservation.updated_at = datetime.utcnow()
+            
+            deltas[inventory_id] = deltas.get(inventory_id, 0) + wanted - held
+    
+    for inventory_id in sorted(deltas):
+        _adjust_reserved(db, inventory_id, deltas[inventory_id])
+
+def sync_booking_reservations(db: Session, booking: Booking):
+    """sync_bookings_reservations() for a single booking"""
+    sync_bookings_reservations(db, [booking])
+
+def resync_service_reservations(db: Session, service_id: str) -> int:
+    """Re-apply a changed bill of materials to the service's holding bookings"""
+    bookings = db.query(Booking).filter(
+        Booking.service_id == service_id,
+        Booking.status.in_(HOLDING_STATUSES)
+    ).all()
+
+    sync_bookings_reservations(db, bookings)
+
+    return len(bookings)
+
+def release_past_reservations(db: Session, now: Optional[datetime] = None) -> int:
+    """Drop the reservations of bookings that ended without being completed.
+
+    A confirmed booking nobody closes out would otherwise keep lowering its
+    items' projected quantity forever. Commits per chunk.
+    """
+    now = now or datetime.utcnow()
+    released = 0
+    while True:
+        reservations = db.query(InventoryReservation).join(InventoryReservation.booking).filter(
+            Booking.end_time < now
+        ).limit(IN_CHUNK_SIZE).all()
+        if not reservations:
+            return released
+
+        deltas: Dict[str, int] = {}
+        for reservation in reservations:
+            deltas[reservation.inventory_id] = deltas.get(reservation.inventory_id, 0) - reservation.quantity
+            db.delete(reservation)
+        db.flush()
+        for inventory_id in sorted(deltas):
+            _adjust_reserved(db, inventory_id, deltas[inventory_id])
+        db.commit()
+        released += len(reservations)
+
+def run_reservation_release_job():
+    """Release pass for running outside a request"""
+    return run_job(
+        release_past_reservations,
+        "Released {} reservations of past bookings", "Error releasing past reservations"
+    )
+
+def get_upcoming_reservations(db: Session, inventory_id: str, limit: int = 50) -> List[InventoryReservation]:
+    """Reservations for an item, soonest booking first"""
+    return db.query(InventoryReservation).filter(
+        InventoryReservation.inventory_id == inventory_id
+    ).order_by(InventoryReservation.start_time.asc()).limit(limit).all()
@@ -0,0 +1,307 @@
+from datetime import datetime, date, time, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from bisect import bisect_left, insort
+from collections import OrderedDict
+import threading
+import time as _time
+import logging
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.resource import Resource, BookingResource
+from app.utils.helpers import chunks
+
+logger = logging.getLogger(__name__)
+
+# Cached days are reloaded after this long, which bounds staleness when
+# several worker processes write bookings.
+DAY_TTL_SECONDS = 60
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Compare everything as naive UTC, which is what SQLite hands back"""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def days_spanned(start: datetime, end: datetime) -> List[date]:
+    last = (end - timedelta(microseconds=1)).date() if end > start else start.date()
+    days = []
+    current = start.date()
+    while current <= last:
+        days.append(current)
+        current += timedelta(days=1)
+    return days
+
+class IntervalIndex:
+    """Intervals of one resource on one day, sorted by start.
+    
+    max_end[i] holds the latest end among the first i + 1 intervals, so an
+    overlap test is one bisect plus one lookup: some interval starting
+    before `end` must also finish after `start`.
+    """
+    
+    def __init__(self):
+        self.entries: List[Tuple[datetime, datetime, str]] = []
+        self.max_end: List[datetime] = []
+    
+    def _rebuild_from(self, position: int):
+        del self.max_end[position:]
+        running = self.max_end[-1] if self.max_end else None
+        for start, end, _ in self.entries[position:]:
+            running = end if running is None or end > running else running
+            self.max_end.append(running)
+    
+    def add(self, start: datetime, end: datetime, booking_id: str):
+        entry = (start, end, booking_id)
+        position = bisect_left(self.entries, entry)
+        insort(self.entries, entry)
+        self._rebuild_from(position)
+    
+    def remove(self, booking_id: str):
+        for position, entry in enumerate(self.entries):
+            if entry[2] == booking_id:
+                del self.entries[position]
+                self._rebuild_from(position)
+                return
+    
+    def overlaps(self, start: datetime, end: datetime, exclude_booking_id: Optional[str] = None) -> bool:
+        count = bisect_left(self.entries, (end,))
+        if count == 0 or self.max_end[count - 1] <= start:
+            return False
+        if exclude_booking_id is None:
+            return True
+        # Rare path (rescheduling): ignore the booking being moved
+        return any(
+            e_end > start and booking_id != exclude_booking_id
+            for _, e_end, booking_id in self.entries[:count]
+        )
+    
+    def __iter__(self):
+        return iter(self.entries)
+
+class ResourceCalendar:
+    """In-process interval indexes per (resource, day), loaded lazily"""
+    
+    def __init__(self):
+        self._days: Dict[Tuple[str, date], Tuple[IntervalIndex, float]] = {}
+        self._booking_keys: Dict[str, Set[Tuple[str, date]]] = {}
+        self._lock = threading.RLock()
+    
+    def load(self, db: Session, resource_ids: List[str], days: List[date]):
+        """Load any missing or expired (resource, day) indexes in one query"""
+        now = _time.monotonic()
+        with self._lock:
+            missing = [
+                (resource_id, day)
+                for resource_id in resource_ids
+                for day in days
+                if (resource_id, day) not in self._days
+                or now - self._days[(resource_id, day)][1] > DAY_TTL_SECONDS
+            ]
+        if not missing:
+            return
+        
+        missing_resources = sorted({key[0] for key in missing})
+        missing_days = sorted({key[1] for key in missing})
+        range_start = datetime.combine(missing_days[0], time.min)
+        range_end = datetime.combine(missing_days[-1] + timedelta(days=1), time.min)
+        
+        rows = db.query(
+            BookingResource.resource_id,
+            BookingResource.booking_id,
+            BookingResource.start_time,
+            BookingResource.end_time
+        ).filter(
+            BookingResource.resource_id.in_(missing_resources),
+            BookingResource.is_active == True,
+            BookingResource.start_time < range_end,
+            BookingResource.end_time > range_start
+        ).all()
+        
+        with self._lock:
+            for key in missing:
+                old = self._days.pop(key, None)
+                if old:
+                    for _, _, booking_id in old[0]:
+                        self._booking_keys.get(booking_id, set()).discard(key)
+                self._days[key] = (IntervalIndex(), now)
+            
+            wanted = set(missing)
+            for resource_id, booking_id, start, end in rows:
+                self._insert(resource_id, booking_id, to_naive_utc(start), to_naive_utc(end), wanted)
+    
+    def _insert(self, resource_id, booking_id, start, end, only_keys=None):
+        for day in days_spanned(start, end):
+            key = (resource_id, day)
+            if key not in self._days or (only_keys is not None and key not in only_keys):
+                continue
+            self._days[key][0].add(start, end, booking_id)
+            self._booking_keys.setdefault(booking_id, set()).add(key)
+    
+    def forget(self, booking_id: str):
+        with self._lock:
+            for key in self._booking_keys.pop(booking_id, set()):
+                if key in self._days:
+                    self._days[key][0].remove(booking_id)
+    
+    def apply(self, booking_id: str, rows: List[Tuple[str, datetime, datetime, bool]]):
+        """Replace a booking's intervals in whatever days are cached"""
+        with self._lock:
+            self.forget(booking_id)
+            for resource_id, start, end, active in rows:
+                if active:
+                    self._insert(resource_id, booking_id, to_naive_utc(start), to_naive_utc(end))
+    
+    def clear(self):
+        with self._lock:
+            self._days.clear()
+            self._booking_keys.clear()
+    
+    def is_free(
+        self,
+        db: Session,
+        resource_id: str,
+        start: datetime,
+        end: datetime,
+        exclude_booking_id: Optional[str] = None
+    ) -> bool:
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        days = days_spanned(start, end)
+        self.load(db, [resource_id], days)
+        with self._lock:
+            return not any(
+                self._days[(resource_id, day)][0].overlaps(start, end, exclude_booking_id)
+                for day in days
+            )
+    
+    def pick_free_resources(
+        self,
+        db: Session,
+        resources: List[Resource],
+        start: datetime,
+        end: datetime,
+        preferred: Optional[List[str]] = None,
+        exclude_booking_id: Optional[str] = None
+    ) -> Optional[List[str]]:
+        """One free resource per type (preferring the given ids), or None"""
+        by_type: "OrderedDict[str, List[Resource]]" = OrderedDict()
+        for resource in resources:
+            by_type.setdefault(resource.resource_type, []).append(resource)
+        
+        start_utc, end_utc = to_naive_utc(start), to_naive_utc(end)
+        self.load(db, [r.id for r in resources], days_spanned(start_utc, end_utc))
+        
+        chosen = []
+        for group in by_type.values():
+            candidates = [r for r in group if preferred and r.id in preferred] or group
+            free = next(
+                (r for r in candidates if self.is_free(db, r.id, start, end, exclude_booking_id)),
+                None
+            )
+            if free is None:
+                return None
+            chosen.append(free.id)
+        return chosen
+    
+    def busy_intervals(self, db: Session, resource_id: str, day: date) -> List[dict]:
+        self.load(db, [resource_id], [day])
+        with self._lock:
+            return [
+                {"booking_id": booking_id, "start_time": start.isoformat(), "end_time": end.isoformat()}
+                for start, end, booking_id in self._days[(resource_id, day)][0]
+            ]
+
+resource_calendar = ResourceCalendar()
+
+def find_resource_conflict(
+    db: Session,
+    resource_ids: List[str],
+    start: datetime,
+    end: datetime,
+    exclude_booking_id: Optional[str] = None
+) -> Optional[BookingResource]:
+    """Authoritative DB check used under the slot lock before committing"""
+    query = db.query(BookingResource).filter(
+        BookingResource.resource_id.in_(resource_ids),
+        BookingResource.is_active == True,
+        BookingResource.start_time < end,
+        BookingResource.end_time > start
+    )
+    if exclude_booking_id:
+        query = query.filter(BookingResource.booking_id != exclude_booking_id)
+    return query.first()
+
+def sync_bookings_resources(
+    db: Session,
+    bookings: List[Booking],
+    resource_ids: Optional[Dict[str, List[str]]] = None
+):
+    """Keep booking_resources rows in line with the bookings; call before commit.
+    
+    resource_ids maps booking id to the resources that replace its current
+    assignment; bookings missing from it keep theirs. Rows are read with
+    one query per chunk of bookings. The in-memory calendar is updated once
+    the transaction commits.
+    """
+    # slot_locks imports this module, so its statuses are imported on use
+    from app.services.slot_locks import ACTIVE_STATUSES
+    if not bookings:
+        return
+    db.flush()
+    resource_ids = resource_ids or {}
+    
+    rows_by_booking: Dict[str, List[BookingResource]] = {}
+    for chunk in chunks([b.id for b in bookings]):
+        for row in db.query(BookingResource).filter(BookingResource.booking_id.in_(chunk)).all():
+            rows_by_booking.setdefault(row.booking_id, []).append(row)
+    
+    pending = db.info.setdefault("resource_calendar_updates", {})
+    for booking in bookings:
+        rows = rows_by_booking.get(booking.id, [])
+        
+        if booking.id in resource_ids:
+            wanted = resource_ids[booking.id] or []
+            keep = set(wanted)
+            for row in rows:
+                if row.resource_id not in keep:
+                    db.delete(row)
+            held = {row.resource_id for row in rows}
+            rows = [row for row in rows if row.resource_id in keep]
+            for resource_id in wanted:
+                if resource_id not in held:
+                    row = BookingResource(booking_id=booking.id, resource_id=resource_id)
+                    db.add(row)
+                    rows.append(row)
+            booking.resource_scheduled = bool(wanted)
+        
+        active = booking.status in ACTIVE_STATUSES
+        for row in rows:
+            row.start_time = booking.start_time
+            row.end_time = booking.end_time
+            row.is_active = active
+        
+        pending[booking.id] = [
+            (row.resource_id, booking.start_time, booking.end_time, active) for row in rows
+        ]
+
+def sync_booking_resources(db: Session, booking: Booking, resource_ids: Optional[List[str]] = None):
+    """sync_bookings_resources() for one booking.
+    
+    Passing resource_ids replaces the assigned resources.
+    """
+    db.flush()  # a new booking needs its id before it can key resource_ids
+    sync_bookings_resources(
+        db, [booking], {booking.id: resource_ids} if resource_ids is not None else None
+    )
+
+@event.listens_for(Session, "after_commit")
+def _apply_calendar_updates(session):
+    updates = session.info.pop("resource_calendar_updates", None)
+    if updates:
+        for booking_id, rows in updates.items():
+            resource_calendar.apply(booking_id, rows)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_calendar_updates(session):
+    session.info.pop("resource_calendar_updates", None)
@@ -0,0 +1,133 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+import threading
+import logging
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.cache_version import WorkspaceCacheVersion
+from app.models.workspace import Workspace, Service
+from app.models.form import Form
+from app.models.integration import Integration
+from app.models.inventory import InventoryItem
+from app.models.user import User
+from app.services.counters import increment
+from app.utils.serialization import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Model -> entity name whose version is bumped when a row changes
+ENTITY_MODELS = {
+    Workspace: "workspace",
+    Service: "services",
+    Form: "forms",
+    Integration: "integrations",
+    InventoryItem: "inventory",
+    User: "users",
+}
+
+# Rendered bodies kept in memory, keyed by ETag
+MAX_CACHED_BODIES = 512
+
+_bodies: "OrderedDict[str, bytes]" = OrderedDict()
+_bodies_lock = threading.Lock()
+
+def _workspace_id(obj) -> Optional[str]:
+    return obj.id if isinstance(obj, Workspace) else getattr(obj, "workspace_id", None)
+
+def _bump(connection, keys: Iterable[Tuple[str, str]]):
+    """Increment (or create) the counters inside the current transaction"""
+    for workspace_id, entity in sorted(keys):
+        increment(
+            connection, WorkspaceCacheVersion.__table__,
+            {"workspace_id": workspace_id, "entity": entity},
+            {"version": 1}
+        )
+
+def bump_versions(db: Session, workspace_id: str, *entities: str):
+    """Invalidate cached responses for writes that bypass the ORM unit of work"""
+    _bump(db.connection(), {(workspace_id, entity) for entity in entities})
+
+@event.listens_for(Session, "after_flush")
+def _bump_changed_entities(session, flush_context):
+    # Versions of a workspace being deleted go with it (ON DELETE CASCADE)
+    deleted_workspaces = {obj.id for obj in session.deleted if isinstance(obj, Workspace)}
+    
+    keys: Set[Tuple[str, str]] = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        entity = ENTITY_MODELS.get(type(obj))
+        if entity is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        workspace_id = _workspace_id(obj)
+        if workspace_id and workspace_id not in deleted_workspaces:
+            keys.add((workspace_id, entity))
+    
+    if keys:
+        _bump(session.connection(), keys)
+
+def get_versions(db: Session, workspace_id: str, entities: List[str]) -> Dict[str, int]:
+    """Current counters for the entities, read from the small versions table only"""
+    rows = dict(db.query(WorkspaceCacheVersion.entity, WorkspaceCacheVersion.version).filter(
+        WorkspaceCacheVersion.workspace_id == workspace_id,
+        WorkspaceCacheVersion.entity.in_(entities)
+    ).all())
+    return {entity: rows.get(entity, 0) for entity in entities}
+
+def make_etag(request: Request, workspace_id: str, versions: Dict[str, int]) -> str:
+    """Strong ETag over the URL, workspace and entity versions"""
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    state = ",".join(f"{entity}:{versions[entity]}" for entity in sorted(versions))
+    digest = hashlib.sha256(f"{request.url.path}?{query}|{workspace_id}|{state}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def cached_response(
+    request: Request,
+    db: Session,
+    workspace_id: str,
+    entities: List[str],
+    build: Callable[[], object],
+    public: bool = False,
+    versions: Optional[Dict[str, int]] = None
+) -> Response:
+    """Serve a workspace-scoped read with ETag / If-None-Match support.
+    
+    build() is only called when neither the client nor the body cache has
+    the current version; it should return the JSON payload and may raise
+    HTTPException as usual. Pass versions when the caller already read them.
+    """
+    if versions is None:
+        versions = get_versions(db, workspace_id, entities)
+    etag = make_etag(request, workspace_id, versions)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, no-cache" if public else "private, no-cache"
+    }
+    
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    with _bodies_lock:
+        body = _bodies.get(etag)
+        if body is not None:
+            _bodies.move_to_end(etag)
+    
+    if body is None:
+        body = FastJSONResponse(content=jsonable_encoder(build())).body
+        with _bodies_lock:
+            _bodies[etag] = body
+            while len(_bodies) > MAX_CACHED_BODIES:
+                _bodies.popitem(last=False)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+import bisect
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.contact import Conversation
+from app.models.response_time import ResponseTimeRollup
+from app.services.counters import increment
+
+# Upper bounds (seconds) of the latency buckets; the last one is open-ended
+BUCKET_BOUNDS = [60, 120, 300, 600, 900, 1800, 3600, 7200, 14400, 28800, 86400, 172800, 604800, float("inf")]
+
+def bucket_for(seconds: float) -> int:
+    return bisect.bisect_left(BUCKET_BOUNDS, seconds)
+
+def record_first_response(db: Session, conversation: Conversation, user_id: Optional[str], at: Optional[datetime] = None):
+    """Count the wait since the oldest unanswered inbound message, if any.
+    
+    Call this for human replies only, before committing them; automated and
+    broadcast messages leave the conversation waiting.
+    """
+    since = conversation.awaiting_since
+    if since is None:
+        return
+    at = at or datetime.utcnow()
+    seconds = max(0.0, (at - since.replace(tzinfo=None)).total_seconds())
+    increment(
+        db.connection(), ResponseTimeRollup.__table__,
+        {"workspace_id": conversation.workspace_id, "day": at.date(), "user_id": user_id or "", "bucket": bucket_for(seconds)},
+        {"count": 1, "total_seconds": seconds}
+    )
+    conversation.awaiting_since = None
+
+def _percentile(counts: List[int], total: int, fraction: float) -> float:
+    """Interpolated within the bucket holding the rank; the open bucket reports its lower bound"""
+    rank = fraction * total
+    seen = 0
+    for bucket, count in enumerate(counts):
+        if count and seen + count >= rank:
+            lower = BUCKET_BOUNDS[bucket - 1] if bucket else 0
+            upper = BUCKET_BOUNDS[bucket]
+            if upper == float("inf"):
+                return float(lower)
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return 0.0
+
+def response_time_stats(db: Session, workspace_id: str, days: int = 30, user_id: Optional[str] = None) -> dict:
+    """avg / p50 / p90 first-response time (seconds) over the last `days` UTC days"""
+    query = db.query(
+        ResponseTimeRollup.bucket,
+        func.sum(ResponseTimeRollup.count),
+        func.sum(ResponseTimeRollup.total_seconds)
+    ).filter(
+        ResponseTimeRollup.workspace_id == workspace_id,
+        ResponseTimeRollup.day > datetime.utcnow().date() - timedelta(days=days)
+    )
+    if user_id is not None:
+        query = query.filter(ResponseTimeRollup.user_id == user_id)
+    
+    counts = [0] * len(BUCKET_BOUNDS)
+    total_seconds = 0.0
+    for bucket, count, seconds in query.group_by(ResponseTimeRollup.bucket):
+        counts[bucket] = int(count or 0)
+        total_seconds += seconds or 0.0
+    
+    total = sum(counts)
+    if not total:
+        return {"count": 0, "avg_seconds": None, "p50_seconds": None, "p90_seconds": None}
+    return {
+        "count": total,
+        "avg_seconds": round(total_seconds / total, 1),
+        "p50_seconds": round(_percentile(counts, total, 0.5), 1),
+        "p90_seconds": round(_percentile(counts, total, 0.9), 1)
+    }
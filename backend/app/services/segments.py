@@ -0,0 +1,185 @@
+from datetime import datetime, timedelta
+from typing import List
+from sqlalchemy import select, and_, or_, not_, true, false
+
+from app.models.contact import Contact, ContactTag, ContactFieldValue
+from app.services.contacts import field_value
+from app.services.resource_calendar import to_naive_utc
+from app.utils.helpers import normalize_tag
+
+# Deepest group nesting and most conditions accepted in one segment
+MAX_DEPTH = 4
+MAX_CONDITIONS = 50
+
+CUSTOM_PREFIX = "custom."
+
+DATE_FIELDS = {
+    "created_at": Contact.created_at,
+    "last_contacted": Contact.last_contacted,
+}
+
+COLUMN_FIELDS = {
+    "source": Contact.source,
+    "unsubscribed": Contact.unsubscribed,
+    "is_active": Contact.is_active,
+}
+
+class SegmentError(ValueError):
+    """Raised for segment definitions that can't be compiled"""
+    pass
+
+def _parse_datetime(value) -> datetime:
+    try:
+        return to_naive_utc(datetime.fromisoformat(str(value)))
+    except ValueError:
+        raise SegmentError(f"Invalid date: {value}")
+
+def _parse_days(value) -> int:
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        raise SegmentError(f"Invalid number of days: {value}")
+    if days < 0:
+        raise SegmentError("Number of days must not be negative")
+    return days
+
+def _tag_condition(workspace_id: str, op: str, value):
+    tag = normalize_tag(value)
+    if not tag:
+        raise SegmentError("Tag conditions need a value")
+    tagged = Contact.id.in_(
+        select(ContactTag.contact_id).where(
+            ContactTag.workspace_id == workspace_id,
+            ContactTag.tag == tag
+        )
+    )
+    if op == "has":
+        return tagged
+    if op == "not_has":
+        return not_(tagged)
+    raise SegmentError(f"Unsupported operator for tag: {op}")
+
+def _date_condition(column, op: str, value):
+    now = datetime.utcnow()
+    if op == "before":
+        return column < _parse_datetime(value)
+    if op == "after":
+        return column > _parse_datetime(value)
+    if op == "within_days":
+        return column >= now - timedelta(days=_parse_days(value))
+    if op == "not_within_days":
+        # Never is also "not within"
+        return or_(column == None, column < now - timedelta(days=_parse_days(value)))
+    if op == "is_set":
+        return column != None
+    if op == "is_empty":
+        return column == None
+    raise SegmentError(f"Unsupported date operator: {op}")
+
+def _column_condition(column, op: str, value):
+    if op == "eq":
+        return column == value
+    if op == "neq":
+        return or_(column != value, column == None)
+    if op == "in":
+        if not isinstance(value, list):
+            raise SegmentError("The in operator needs a list")
+        return column.in_(value)
+    raise SegmentError(f"Unsupported operator: {op}")
+
+def _custom_condition(workspace_id: str, field: str, op: str, value):
+    field = normalize_tag(field)
+    if not field:
+        raise SegmentError("Custom field name is missing")
+    
+    def having(*conditions):
+        return Contact.id.in_(
+            select(ContactFieldValue.contact_id).where(
+                ContactFieldValue.workspace_id == workspace_id,
+                ContactFieldValue.field == field,
+                *conditions
+            )
+        )
+    
+    if op == "is_set":
+        return having()
+    if op == "is_empty":
+        return not_(having())
+    if op in ("eq", "neq"):
+        matched = having(ContactFieldValue.value_text == field_value(value)[0])
+        return matched if op == "eq" else not_(matched)
+    if op == "in":
+        if not isinstance(value, list) or not value:
+            raise SegmentError("The in operator needs a non-empty list")
+        return having(ContactFieldValue.value_text.in_([field_value(v)[0] for v in value]))
+    if op == "contains":
+        text = field_value(value)[0]
+        if not text:
+            raise SegmentError("contains needs a value")
+        return having(ContactFieldValue.value_text.contains(text, autoescape=True))
+    if op in ("gt", "gte", "lt", "lte"):
+        number = field_value(value)[1]
+        if number is None:
+            raise SegmentError(f"{op} needs a numeric value")
+        column = ContactFieldValue.value_number
+        comparison = {"gt": column > number, "gte": column >= number,
+                      "lt": column < number, "lte": column <= number}[op]
+        return having(comparison)
+    raise SegmentError(f"Unsupported operator for custom fields: {op}")
+
+def _compile_condition(workspace_id: str, condition: dict, depth: int, budget: List[int]):
+    if not isinstance(condition, dict):
+        raise SegmentError("Each condition must be an object")
+    if "conditions" in condition:
+        return _compile_group(workspace_id, condition, depth + 1, budget)
+    
+    budget[0] -= 1
+    if budget[0] < 0:
+        raise SegmentError(f"A segment can have at most {MAX_CONDITIONS} conditions")
+    
+    field = condition.get("field")
+    op = condition.get("op")
+    value = condition.get("value")
+    if not isinstance(field, str) or not isinstance(op, str):
+        raise SegmentError("Conditions need a field and an op")
+    
+    if field == "tag":
+        return _tag_condition(workspace_id, op, value)
+    if field in DATE_FIELDS:
+        return _date_condition(DATE_FIELDS[field], op, value)
+    if field in COLUMN_FIELDS:
+        return _column_condition(COLUMN_FIELDS[field], op, value)
+    if field.startswith(CUSTOM_PREFIX):
+        return _custom_condition(workspace_id, field[len(CUSTOM_PREFIX):], op, value)
+    raise SegmentError(f"Unknown field: {field}")
+
+def _compile_group(workspace_id: str, group: dict, depth: int, budget: List[int]):
+    if depth > MAX_DEPTH:
+        raise SegmentError(f"Segments can nest at most {MAX_DEPTH} levels")
+    
+    match = group.get("match", "all")
+    if match not in ("all", "any"):
+        raise SegmentError("match must be 'all' or 'any'")
+    conditions = group.get("conditions") or []
+    if not isinstance(conditions, list):
+        raise SegmentError("conditions must be a list")
+    
+    compiled = [_compile_condition(workspace_id, c, depth, budget) for c in conditions]
+    if not compiled:
+        # An empty "all" matches everyone, an empty "any" nobody
+        return true() if match == "all" else false()
+    return and_(*compiled) if match == "all" else or_(*compiled)
+
+def compile_segment(workspace_id: str, segment: dict):
+    """SQL condition on Contact for a segment definition.
+    
+    A segment is {"match": "all"|"any", "conditions": [...]}, where each
+    condition is {"field", "op", "value"} or a nested group. Fields are
+    "tag", created_at / last_contacted, source / unsubscribed / is_active
+    and "custom.<key>". Tags and custom fields are matched through the
+    indexed contact_tags / contact_field_values tables.
+    """
+    return and_(
+        Contact.workspace_id == workspace_id,
+        _compile_group(workspace_id, segment, 1, [MAX_CONDITIONS])
+    )
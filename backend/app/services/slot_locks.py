@@ -0,0 +1,284 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, DBAPIError
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking, BookingStatus
+from app.models.workspace import Service
+from app.models.resource import Resource, BookingResource
+from app.services.resource_calendar import (
+    resource_calendar, find_resource_conflict, IntervalIndex, to_naive_utc, days_spanned
+)
+
+logger = logging.getLogger(__name__)
+
+# Bookings in these states occupy their time slot
+ACTIVE_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.PENDING, BookingStatus.RESCHEDULED)
+
+EXCLUSION_CONSTRAINT = "bookings_no_overlap"
+RESOURCE_EXCLUSION_CONSTRAINT = "booking_resources_no_overlap"
+
+class SlotUnavailableError(Exception):
+    """Raised when a booking would overlap another active booking"""
+    pass
+
+def install_booking_constraints(engine):
+    """Add the Postgres exclusion constraints on overlapping bookings (idempotent).
+    
+    A constraint is skipped (and the overlapping rows logged) while the
+    table still holds overlaps from before it existed, so startup never
+    fails on them. Other databases rely on lock_service_slots() alone.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    
+    # SQLAlchemy stores enum member names, not values
+    statuses = ", ".join(f"'{s.name}'" for s in ACTIVE_STATUSES)
+    
+    # name -> (DDL, query for up to 20 overlapping pairs that would make it fail)
+    constraints = {
+        # Resource-scheduled bookings may share a service; their resources may not overlap
+        EXCLUSION_CONSTRAINT: (
+            f"ALTER TABLE bookings ADD CONSTRAINT {EXCLUSION_CONSTRAINT} "
+            f"EXCLUDE USING gist (service_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+            f"WHERE (status IN ({statuses}) AND NOT resource_scheduled)",
+            f"SELECT a.id, b.id FROM bookings a JOIN bookings b ON a.service_id = b.service_id AND a.id < b.id "
+            f"AND tstzrange(a.start_time, a.end_time, '[)') && tstzrange(b.start_time, b.end_time, '[)') "
+            f"WHERE a.status IN ({statuses}) AND NOT a.resource_scheduled "
+            f"AND b.status IN ({statuses}) AND NOT b.resource_scheduled LIMIT 20"
+        ),
+        RESOURCE_EXCLUSION_CONSTRAINT: (
+            f"ALTER TABLE booking_resources ADD CONSTRAINT {RESOURCE_EXCLUSION_CONSTRAINT} "
+            f"EXCLUDE USING gist (resource_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&) "
+            f"WHERE (is_active)",
+            f"SELECT a.booking_id, b.booking_id FROM booking_resources a JOIN booking_resources b "
+            f"ON a.resource_id = b.resource_id AND a.id < b.id "
+            f"AND tstzrange(a.start_time, a.end_time, '[)') && tstzrange(b.start_time, b.end_time, '[)') "
+            f"WHERE a.is_active AND b.is_active LIMIT 20"
+        ),
+    }
+    
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+    
+    for name, (ddl, overlaps_sql) in constraints.items():
+        try:
+            with engine.begin() as conn:
+                exists = conn.execute(
+                    text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+                    {"name": name}
+                ).first()
+                if exists:
+                    continue
+                overlaps = conn.execute(text(overlaps_sql)).all()
+                if overlaps:
+                    pairs = ", ".join(f"{a}/{b}" for a, b in overlaps)
+                    logger.warning(
+                        f"Not installing {name}: overlapping active bookings exist "
+                        f"(first {len(overlaps)} pairs: {pairs}); resolve them and restart"
+                    )
+                    continue
+                conn.execute(text(ddl))
+                logger.info(f"Installed exclusion constraint {name}")
+        except DBAPIError as e:
+            logger.error(f"Could not install exclusion constraint {name}: {str(e)}")
+
+def lock_service_slots(db: Session, service_id: str):
+    """Serialize bookings for one service until the current transaction ends.
+    
+    Postgres takes a transaction-scoped advisory lock keyed on the service.
+    SQLite has no row locks, so a no-op UPDATE grabs the database write lock
+    instead. Anything else falls back to SELECT ... FOR UPDATE on the service.
+    """
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "postgresql":
+        db.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+            {"key": f"service-slots:{service_id}"}
+        )
+    elif dialect == "sqlite":
+        db.execute(
+            text("UPDATE services SET id = id WHERE id = :service_id"),
+            {"service_id": service_id}
+        )
+    else:
+        db.query(Service.id).filter(Service.id == service_id).with_for_update().first()
+
+def lock_resource_slots(db: Session, resource_ids: List[str]):
+    """Same as lock_service_slots, for each resource (in a stable order)"""
+    dialect = db.get_bind().dialect.name
+    
+    for resource_id in sorted(resource_ids):
+        if dialect == "postgresql":
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext(:key))"),
+                {"key": f"resource-slots:{resource_id}"}
+            )
+        elif dialect == "sqlite":
+            db.execute(
+                text("UPDATE resources SET id = id WHERE id = :resource_id"),
+                {"resource_id": resource_id}
+            )
+        else:
+            db.query(Resource.id).filter(Resource.id == resource_id).with_for_update().first()
+
+def find_conflicting_booking(
+    db: Session,
+    workspace_id: str,
+    service_id: str,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_booking_id: Optional[str] = None
+) -> Optional[Booking]:
+    """First active booking of the service overlapping [start_time, end_time)"""
+    query = db.query(Booking).filter(
+        Booking.workspace_id == workspace_id,
+        Booking.service_id == service_id,
+        Booking.status.in_(ACTIVE_STATUSES),
+        Booking.resource_scheduled == False,
+        Booking.start_time < end_time,
+        Booking.end_time > start_time
+    )
+    
+    if exclude_booking_id:
+        query = query.filter(Booking.id != exclude_booking_id)
+    
+    return query.first()
+
+def reserve_slot(
+    db: Session,
+    workspace_id: str,
+    service: Service,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_booking_id: Optional[str] = None,
+    resource_ids: Optional[List[str]] = None
+) -> List[str]:
+    """Lock the calendar for the slot and make sure it is still free.
+    
+    Services without resources are checked against their own bookings.
+    Otherwise one free resource per type is picked (honouring resource_ids
+    as preferences) and the chosen ids are returned.
+    """
+    resources = [r for r in service.resources if r.is_active]
+    
+    if not resources:
+        lock_service_slots(db, service.id)
+        if find_conflicting_booking(
+            db, workspace_id, service.id, start_time, end_time, exclude_booking_id
+        ):
+            raise SlotUnavailableError()
+        return []
+    
+    chosen = resource_calendar.pick_free_resources(
+        db, resources, start_time, end_time,
+        preferred=resource_ids, exclude_booking_id=exclude_booking_id
+    )
+    if chosen is None:
+        raise SlotUnavailableError()
+    
+    # The cached calendar may be behind other workers; re-check under the lock
+    lock_resource_slots(db, chosen)
+    if find_resource_conflict(db, chosen, start_time, end_time, exclude_booking_id):
+        raise SlotUnavailableError()
+    
+    return chosen
+
+def reserve_series_slots(
+    db: Session,
+    workspace_id: str,
+    service: Service,
+    occurrences: List[Tuple[datetime, datetime]],
+    resource_ids: Optional[List[str]] = None
+) -> List[Optional[List[str]]]:
+    """reserve_slot() for every occurrence of a recurring series at once.
+    
+    Existing bookings across the whole series span are read in one range
+    query and checked in memory. Returns the chosen resource ids for each
+    occurrence, or None where that occurrence is taken (including by an
+    earlier occurrence of the same series).
+    """
+    if not occurrences:
+        return []
+    
+    span_start = min(to_naive_utc(start) for start, _ in occurrences)
+    span_end = max(to_naive_utc(end) for _, end in occurrences)
+    resources = [r for r in service.resources if r.is_active]
+    
+    if not resources:
+        lock_service_slots(db, service.id)
+        busy = IntervalIndex()
+        for booking_id, start, end in db.query(Booking.id, Booking.start_time, Booking.end_time).filter(
+            Booking.workspace_id == workspace_id,
+            Booking.service_id == service.id,
+            Booking.status.in_(ACTIVE_STATUSES),
+            Booking.resource_scheduled == False,
+            Booking.start_time < span_end,
+            Booking.end_time > span_start
+        ).order_by(Booking.start_time).all():
+            busy.add(to_naive_utc(start), to_naive_utc(end), booking_id)
+        
+        result = []
+        for position, (start, end) in enumerate(occurrences):
+            start, end = to_naive_utc(start), to_naive_utc(end)
+            if busy.overlaps(start, end):
+                result.append(None)
+            else:
+                busy.add(start, end, f"occurrence-{position}")
+                result.append([])
+        return result
+    
+    # Warm the calendar for every day of the series with a single query
+    days = sorted({
+        day
+        for start, end in occurrences
+        for day in days_spanned(to_naive_utc(start), to_naive_utc(end))
+    })
+    resource_calendar.load(db, [r.id for r in resources], days)
+    picks = [
+        resource_calendar.pick_free_resources(db, resources, start, end, preferred=resource_ids)
+        for start, end in occurrences
+    ]
+    chosen_ids = sorted({resource_id for pick in picks if pick for resource_id in pick})
+    if not chosen_ids:
+        return picks
+    
+    # The cached calendar may be behind other workers; re-check under the lock
+    lock_resource_slots(db, chosen_ids)
+    busy = {resource_id: IntervalIndex() for resource_id in chosen_ids}
+    for resource_id, booking_id, start, end in db.query(
+        BookingResource.resource_id,
+        BookingResource.booking_id,
+        BookingResource.start_time,
+        BookingResource.end_time
+    ).filter(
+        BookingResource.resource_id.in_(chosen_ids),
+        BookingResource.is_active == True,
+        BookingResource.start_time < span_end,
+        BookingResource.end_time > span_start
+    ).order_by(BookingResource.start_time).all():
+        busy[resource_id].add(to_naive_utc(start), to_naive_utc(end), booking_id)
+    
+    result = []
+    for position, ((start, end), pick) in enumerate(zip(occurrences, picks)):
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        if pick is None or any(busy[resource_id].overlaps(start, end) for resource_id in pick):
+            result.append(None)
+            continue
+        for resource_id in pick:
+            busy[resource_id].add(start, end, f"occurrence-{position}")
+        result.append(pick)
+    return result
+
+def commit_booking(db: Session):
+    """Commit, turning exclusion constraint violations into SlotUnavailableError"""
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if EXCLUSION_CONSTRAINT in str(e.orig) or RESOURCE_EXCLUSION_CONSTRAINT in str(e.orig):
+            raise SlotUnavailableError() from e
+        raise
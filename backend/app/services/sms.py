@@ -1,4 +1,5 @@
-from typing import Optional
+from typing import List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from app.config import settings
 from app.models.workspace import Workspace
@@ -64,4 +65,46 @@ async def send_twilio_sms(to: str, body: str, from_number: str, account_sid: str
         logger.warning("Twilio not installed. Using console logging.")
         logger.info(f"[TWILIO] To: {to} | From: {from_number} | Body: {body[:100]}...")
     except Exception as e:
-        logger.error(f"Twilio error: {str(e)}")
\ No newline at end of file
+        logger.error(f"Twilio error: {str(e)}")
+
+# Twilio requests in flight at once during a bulk send
+TWILIO_CONCURRENCY = 8
+
+def send_twilio_batch(
+    recipients: List[str],
+    body: str,
+    from_number: str,
+    account_sid: str,
+    auth_token: str,
+    before_send=None
+) -> Set[str]:
+    """Send one SMS to many numbers with a shared client and a small thread pool.
+    
+    Twilio has no multi-recipient send, so requests are made concurrently;
+    before_send() is called ahead of each one (rate limiting). Returns the
+    numbers that could not be sent.
+    """
+    try:
+        from twilio.rest import Client
+    except ImportError:
+        logger.warning("Twilio not installed. Using console logging.")
+        logger.info(f"[TWILIO] {len(recipients)} recipients | From: {from_number} | Body: {body[:100]}...")
+        return set()
+    
+    client = Client(account_sid, auth_token)
+    
+    def send(to: str) -> Optional[str]:
+        if before_send:
+            before_send()
+        try:
+            client.messages.create(body=body, from_=from_number, to=to)
+            return None
+        except Exception as e:
+            logger.error(f"Twilio error for {to}: {str(e)}")
+            return to
+    
+    with ThreadPoolExecutor(max_workers=TWILIO_CONCURRENCY) as pool:
+        failed = {to for to in pool.map(send, recipients) if to}
+    
+    logger.info(f"Twilio batch sent {len(recipients) - len(failed)}/{len(recipients)}")
+    return failed
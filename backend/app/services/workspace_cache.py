@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional, Tuple
+import copy
+import threading
+import time as _time
+import logging
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.models.workspace import Workspace, Service
+
+logger = logging.getLogger(__name__)
+
+# Entries are reloaded after this long, which bounds staleness when another
+# worker process changes a workspace.
+SNAPSHOT_TTL_SECONDS = 60
+
+class PublicWorkspaceCache:
+    """slug -> active workspace snapshot, and workspace -> active services.
+    
+    Snapshots are detached Workspace copies; they are merged into the
+    request's session without a query, so callers get a normal ORM object.
+    Unknown or inactive slugs are cached too, which keeps bots probing
+    random slugs off the database. Service lists are keyed by the
+    workspace's "services" cache version, so they never outlive a change.
+    """
+    
+    def __init__(self):
+        self._slugs: Dict[str, Tuple[Optional[Workspace], float]] = {}
+        self._services: Dict[str, Tuple[int, List[dict]]] = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _snapshot(workspace: Workspace) -> Workspace:
+        values = {
+            attr.key: copy.deepcopy(getattr(workspace, attr.key))
+            for attr in inspect(Workspace).column_attrs
+        }
+        snapshot = Workspace(**values)
+        make_transient_to_detached(snapshot)
+        return snapshot
+    
+    def get_workspace(self, db: Session, slug: str) -> Optional[Workspace]:
+        """Active workspace for a public slug, attached to db"""
+        now = _time.monotonic()
+        with self._lock:
+            cached = self._slugs.get(slug)
+        
+        if cached is None or now - cached[1] > SNAPSHOT_TTL_SECONDS:
+            workspace = db.query(Workspace).filter(
+                Workspace.slug == slug,
+                Workspace.is_active == True
+            ).first()
+            snapshot = self._snapshot(workspace) if workspace else None
+            with self._lock:
+                self._slugs[slug] = (snapshot, now)
+            return workspace
+        
+        snapshot = cached[0]
+        if snapshot is None:
+            return None
+        return db.merge(snapshot, load=False)
+    
+    def get_active_services(self, db: Session, workspace_id: str, version: int) -> List[dict]:
+        """Serialized active services of a workspace at a given services version"""
+        with self._lock:
+            cached = self._services.get(workspace_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        
+        services = [
+            service.to_dict()
+            for service in db.query(Service).filter(
+                Service.workspace_id == workspace_id,
+                Service.is_active == True
+            ).all()
+        ]
+        with self._lock:
+            self._services[workspace_id] = (version, services)
+        return services
+    
+    def invalidate_workspace(self, workspace_id: str, slug: Optional[str] = None):
+        """Drop a workspace's snapshots after it is edited or (de)activated"""
+        with self._lock:
+            stale = [
+                key for key, (snapshot, _) in self._slugs.items()
+                if snapshot is not None and snapshot.id == workspace_id
+            ]
+            for key in stale:
+                del self._slugs[key]
+            if slug:
+                self._slugs.pop(slug, None)
+            self._services.pop(workspace_id, None)
+    
+    def clear(self):
+        with self._lock:
+            self._slugs.clear()
+            self._services.clear()
+
+public_workspace_cache = PublicWorkspaceCache()
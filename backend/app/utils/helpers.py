@@ -0,0 +1,47 @@
+from typing import Iterator, Optional, Sequence
+import re
+
+# Keep IN (...) lists well under database parameter limits
+IN_CHUNK_SIZE = 500
+
+# Country code assumed for numbers written without one (NANP)
+DEFAULT_PHONE_COUNTRY_CODE = "1"
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Lowercased, trimmed email used for matching contacts"""
+    if not email:
+        return None
+    email = email.strip().lower()
+    return email or None
+
+def normalize_phone(phone: Optional[str], default_country_code: str = DEFAULT_PHONE_COUNTRY_CODE) -> Optional[str]:
+    """Best-effort E.164 form (+15551234567) used for matching contacts.
+    
+    Returns None when there are too few or too many digits to be a phone number.
+    """
+    if not phone:
+        return None
+    phone = phone.strip()
+    digits = re.sub(r"\D", "", phone)
+    
+    if not phone.startswith("+"):
+        if digits.startswith("00"):
+            digits = digits[2:]  # international dialing prefix
+        elif len(digits) == 10:
+            digits = default_country_code + digits  # national number
+    
+    if not 8 <= len(digits) <= 15:
+        return None
+    return f"+{digits}"
+
+def normalize_tag(tag: Optional[str]) -> Optional[str]:
+    """Case-insensitive tag key used for filtering"""
+    if tag is None:
+        return None
+    tag = str(tag).strip().lower()
+    return tag or None
+
+def chunks(items: Sequence, size: int = IN_CHUNK_SIZE) -> Iterator[Sequence]:
+    """items in consecutive slices of at most size"""
+    for position in range(0, len(items), size):
+        yield items[position:position + size]
@@ -0,0 +1,58 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Iterable, List, Optional
+import enum
+import json
+import uuid
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; the stdlib encoder is for dev setups without it
+    orjson = None
+
+def _default(value: Any):
+    """Types the stdlib encoder can't handle, rendered the way to_dict() does"""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (the stdlib encoder in dev setups without it).
+    
+    It accepts datetimes, enums and Row mappings' values directly, so
+    endpoints returning it skip both to_dict() and jsonable_encoder.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def rows_to_dicts(rows: Iterable) -> List[dict]:
+    """Plain dicts from a column-projected query, without hydrating ORM objects"""
+    return [dict(row._mapping) for row in rows]
+
+def parse_fields(fields: Optional[str], allowed: Iterable[str], always: Iterable[str] = ("id",)) -> Optional[List[str]]:
+    """Sparse fieldset from ?fields=a,b (plus `always`), or None for the full representation"""
+    names = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    if not names:
+        return None
+    allowed = list(allowed)
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(allowed)})"
+        )
+    return list(dict.fromkeys([*always, *names]))